@@ -0,0 +1,197 @@
+"""
+Warm recommendation daemon for the command-line interface.
+
+`run.py recommend` normally starts a fresh interpreter that imports pandas
+and the model backend and unpickles the model for a single answer. The
+daemon keeps all of that loaded and answers requests over a local Unix
+domain socket, so repeated CLI calls only pay for a small client.
+
+Protocol: one JSON object per line in each direction.
+
+    {"command": "recommend", "soil_data": {...}, "top_n": 3}
+    {"command": "ping"} | {"command": "reload"} | {"command": "shutdown"}
+
+Responses are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+
+The client half of this module (request_daemon) only uses the standard
+library so the CLI does not import the ML stack when a daemon is running.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import logging
+import threading
+import socketserver
+from typing import Any, Dict, Optional
+
+# Add the parent directory to the path to import from the config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+logger = logging.getLogger(__name__)
+
+# Typical reading used to warm up the model and pipeline after loading
+WARMUP_READING = {"pH": 6.5, "nitrogen": 50, "phosphorus": 30, "potassium": 150, "moisture": 60, "temperature": 25}
+
+def request_daemon(message: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to the daemon.
+
+    Args:
+        message: Request object (see the module docstring)
+        socket_path: Daemon socket, defaults to config.DAEMON_SOCKET
+        timeout: Seconds to wait for the response, defaults to config.DAEMON_TIMEOUT
+
+    Returns:
+        The daemon's response, or None if no daemon is reachable
+    """
+    socket_path = socket_path or config.DAEMON_SOCKET
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(config.DAEMON_TIMEOUT if timeout is None else timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(message).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except (FileNotFoundError, ConnectionRefusedError, PermissionError):
+        # Stale socket file or a daemon owned by another user
+        return None
+    except OSError as e:
+        logger.warning(f"Recommendation daemon did not respond ({e}), running in-process")
+        return None
+
+    if not line:
+        return None
+    return json.loads(line)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle newline-delimited JSON requests on one connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            message = {}
+            try:
+                message = json.loads(line)
+                response = self.server.daemon.handle(message)
+            except Exception as e:
+                logger.error(f"Error handling daemon request: {e}")
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+            self.wfile.flush()
+            if message.get("command") == "shutdown":
+                # shutdown() waits for serve_forever to return, so it cannot run on a handler thread
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class RecommendationDaemon:
+    """
+    Serves recommendations from a model kept in memory.
+
+    Requests are handled on one thread per connection; scikit-learn and the
+    boosting backends are safe to call concurrently for prediction.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or config.DAEMON_SOCKET
+        self.model = None
+        self.started_at = None
+        self.requests_served = 0
+        self._server: Optional[_UnixServer] = None
+
+    def load(self) -> None:
+        """Import the pipeline, load the model and run one warm-up prediction."""
+        import pandas as pd
+        from utils.model_utils import load_model
+        from utils.pipeline import recommend_readings
+
+        start_time = time.perf_counter()
+        self.model = load_model()
+        recommend_readings(self.model, pd.DataFrame([WARMUP_READING]))
+        logger.info(f"Model {config.MODEL_VERSION} loaded and warmed up in {time.perf_counter() - start_time:.2f}s")
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle one request.
+
+        Args:
+            message: Request object
+
+        Returns:
+            Response object
+        """
+        command = message.get("command")
+
+        if command == "recommend":
+            import pandas as pd
+            from utils.pipeline import recommend_readings
+
+            soil_df = pd.DataFrame([message["soil_data"]])
+            result = recommend_readings(self.model, soil_df, top_n=message.get("top_n", 3))[0]
+            if not result["recommendations"]:
+                return {"ok": False, "error": "No crop recommendations found for the given soil data"}
+            self.requests_served += 1
+            return {"ok": True, "result": result}
+
+        if command == "ping":
+            return {
+                "ok": True,
+                "result": {
+                    "pid": os.getpid(),
+                    "model_version": config.MODEL_VERSION,
+                    "uptime_s": round(time.time() - self.started_at, 1),
+                    "requests_served": self.requests_served
+                }
+            }
+
+        if command == "reload":
+            self.load()
+            return {"ok": True, "result": {"model_version": config.MODEL_VERSION}}
+
+        if command == "shutdown":
+            return {"ok": True, "result": {"pid": os.getpid()}}
+
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve requests until shutdown or SIGTERM/SIGINT."""
+        if request_daemon({"command": "ping"}, self.socket_path, timeout=2) is not None:
+            raise RuntimeError(f"A recommendation daemon is already listening on {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            # Left behind by a daemon that did not shut down cleanly
+            os.remove(self.socket_path)
+
+        self.load()
+
+        # Only the owner may talk to the daemon
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+        self.started_at = time.time()
+
+        def stop(signum, frame):
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        logger.info(f"Recommendation daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            logger.info(f"Recommendation daemon stopped after {self.requests_served} requests")
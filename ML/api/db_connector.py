@@ -7,16 +7,9 @@ from datetime import datetime, timedelta
 # Add the parent directory to the path to import from the config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from utils.tracing import traced
 
-# Set up logging
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format=config.LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(config.LOGS_DIR, "db_connector.log"))
-    ]
-)
+# Configure logging
 logger = logging.getLogger(__name__)
 
 class DatabaseConnector:
@@ -43,6 +36,7 @@ class DatabaseConnector:
         
         logger.info(f"Initializing database connector with URL: {self.db_url}")
     
+    @traced("db.connect")
     async def connect(self):
         """
         Connect to the database.
@@ -61,6 +55,7 @@ class DatabaseConnector:
             self.connected = False
             raise
     
+    @traced("db.disconnect")
     async def disconnect(self):
         """
         Disconnect from the database.
@@ -78,6 +73,7 @@ class DatabaseConnector:
             logger.error(f"Error disconnecting from database: {e}")
             raise
     
+    @traced("db.get_soil_data")
     async def get_soil_data(self, days: int = 30, farm_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get soil data from the database.
@@ -120,6 +116,7 @@ class DatabaseConnector:
             logger.error(f"Error getting soil data: {e}")
             return []
     
+    @traced("db.get_farms")
     async def get_farms(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get farms from the database.
@@ -151,6 +148,7 @@ class DatabaseConnector:
             logger.error(f"Error getting farms: {e}")
             return []
     
+    @traced("db.save_recommendation")
     async def save_recommendation(self, recommendation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Save a crop recommendation to the database.
@@ -179,6 +177,7 @@ class DatabaseConnector:
             logger.error(f"Error saving recommendation: {e}")
             return None
     
+    @traced("db.get_recommendations")
     async def get_recommendations(
         self, 
         farm_id: Optional[str] = None, 
@@ -0,0 +1,355 @@
+"""
+Request and response encodings for bulk scoring (POST /score).
+
+Readings are decoded into a float32 matrix with one row per reading and the
+columns in config.REQUIRED_FEATURES order; scores are encoded from the
+float32 matrix of class probabilities. Supported media types:
+
+    application/json                     [{"pH": 6.5, ...}, ...] (or rows of values)
+                                         -> {"classes": [...], "probabilities": [[...], ...]}
+    application/octet-stream             packed little-endian float32 rows
+                                         -> packed float32 rows, classes in the X-Model-Classes header
+    application/msgpack                  {"data": <bin float32 rows>} or {"readings": [{...}, ...]}
+                                         -> {"classes": [...], "shape": [n, k], "probabilities": <bin>}
+    application/vnd.apache.arrow.stream  Arrow IPC stream with one column per feature
+                                         -> Arrow IPC stream with one float32 column per class
+
+Packed float32 bodies are wrapped with np.frombuffer without copying, and
+Arrow columns are read straight from the request buffer; neither builds a
+Python object per value. msgpack and pyarrow are optional: requests using
+them get 415 (or 406 for the response type) when they are not installed.
+
+POST /score/stream reads NDJSON readings (application/x-ndjson) window by
+window with iter_ndjson_windows and writes NDJSON score lines with
+encode_score_lines.
+"""
+
+import os
+import sys
+import json
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+# Add the parent directory to the path to import from the config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from api.responses import dumps
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+JSON_MEDIA_TYPE = "application/json"
+FLOAT32_MEDIA_TYPE = "application/octet-stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Longest NDJSON line buffered while waiting for its newline
+MAX_NDJSON_LINE_BYTES = 64 * 1024
+
+MEDIA_TYPES = [JSON_MEDIA_TYPE, FLOAT32_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, ARROW_MEDIA_TYPE]
+
+# Other names clients use for the same encodings
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE
+}
+
+def _available(media_type: str) -> bool:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack is not None
+    if media_type == ARROW_MEDIA_TYPE:
+        return pyarrow is not None
+    return True
+
+def parse_media_type(header: Optional[str]) -> str:
+    """
+    Normalize a Content-Type header to one of MEDIA_TYPES.
+
+    Args:
+        header: Content-Type header value (JSON when missing)
+
+    Returns:
+        Supported media type
+
+    Raises:
+        HTTPException: 415 for unsupported media types or missing optional packages
+    """
+    media_type = (header or JSON_MEDIA_TYPE).split(";")[0].strip().lower()
+    media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+    if media_type not in MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type {media_type} (expected one of {', '.join(MEDIA_TYPES)})")
+    if not _available(media_type):
+        raise HTTPException(status_code=415, detail=f"{media_type} is not available on this server (missing optional package)")
+    return media_type
+
+def negotiate_media_type(accept: Optional[str], default: str) -> str:
+    """
+    Pick the response media type from an Accept header.
+
+    Args:
+        accept: Accept header value
+        default: Media type used when the header is missing or accepts anything
+
+    Returns:
+        Supported media type
+
+    Raises:
+        HTTPException: 406 when none of the accepted types can be produced
+    """
+    if not accept:
+        return default
+    for item in accept.split(","):
+        media_type = item.split(";")[0].strip().lower()
+        if media_type in ("*/*", "application/*"):
+            return default
+        media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        if media_type in MEDIA_TYPES and _available(media_type):
+            return media_type
+    raise HTTPException(status_code=406, detail=f"Cannot produce any of: {accept} (supported: {', '.join(MEDIA_TYPES)})")
+
+def _rows_from_records(records: list, columns: Sequence[str]) -> np.ndarray:
+    """Build the feature matrix from a list of reading objects (or rows of values)."""
+    if records and isinstance(records[0], dict):
+        try:
+            records = [[record[column] for column in columns] for record in records]
+        except KeyError as e:
+            raise HTTPException(status_code=422, detail=f"Reading without required feature {e.args[0]}")
+        except TypeError:
+            raise HTTPException(status_code=422, detail="Readings must all be objects or all be rows of values")
+    try:
+        features = np.array(records, dtype=np.float32)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Readings must be numeric: {e}")
+    return features.reshape(-1, len(columns)) if features.size == 0 else features
+
+def _packed_rows(buffer: bytes, columns: Sequence[str]) -> np.ndarray:
+    """Wrap packed little-endian float32 rows without copying."""
+    row_bytes = 4 * len(columns)
+    if len(buffer) % row_bytes:
+        raise HTTPException(status_code=400, detail=f"Packed float32 body must be a multiple of {row_bytes} bytes ({len(columns)} features per row)")
+    return np.frombuffer(buffer, dtype="<f4").reshape(-1, len(columns))
+
+def _checked(features: np.ndarray, columns: Sequence[str]) -> np.ndarray:
+    """Reject matrices with the wrong number of features or non-finite values."""
+    if features.ndim != 2 or features.shape[1] != len(columns):
+        raise HTTPException(status_code=422, detail=f"Each reading needs {len(columns)} features ({', '.join(columns)})")
+    if not np.isfinite(features).all():
+        raise HTTPException(status_code=422, detail="Readings must not contain NaN or infinite values")
+    return features
+
+def max_body_bytes(media_type: str, n_rows: int, columns: Optional[List[str]] = None) -> int:
+    """
+    Largest request body that can hold n_rows readings in an encoding.
+
+    Packed float32 rows have a fixed size; the other encodings are allowed
+    config.SCORE_MAX_BYTES_PER_ROW bytes per reading.
+    """
+    columns = columns or config.REQUIRED_FEATURES
+    if media_type == FLOAT32_MEDIA_TYPE:
+        return n_rows * 4 * len(columns)
+    return n_rows * config.SCORE_MAX_BYTES_PER_ROW
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read a request body, answering 413 as soon as it exceeds max_bytes.
+
+    A larger Content-Length is rejected before anything is read; chunked
+    bodies are counted while they arrive.
+    """
+    detail = f"Request body larger than {max_bytes} bytes (at most {config.SCORE_MAX_ROWS} readings per request)"
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=detail)
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=detail)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def decode_readings(body: bytes, media_type: str, columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Decode a /score request body into a feature matrix.
+
+    Args:
+        body: Raw request body
+        media_type: Media type returned by parse_media_type
+        columns: Feature order of the matrix, defaults to config.REQUIRED_FEATURES
+
+    Returns:
+        float32 array of shape (n_readings, n_features); read-only when it wraps the body
+
+    Raises:
+        HTTPException: 400 for malformed bodies, 422 for missing or non-finite values
+    """
+    columns = columns or config.REQUIRED_FEATURES
+
+    if media_type == FLOAT32_MEDIA_TYPE:
+        features = _packed_rows(body, columns)
+
+    elif media_type == MSGPACK_MEDIA_TYPE:
+        try:
+            payload = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {e}")
+        if isinstance(payload, dict) and isinstance(payload.get("data"), bytes):
+            features = _packed_rows(payload["data"], columns)
+        elif isinstance(payload, dict) and isinstance(payload.get("readings"), list):
+            features = _rows_from_records(payload["readings"], columns)
+        else:
+            raise HTTPException(status_code=400, detail='MessagePack body must be a map with "data" (packed float32 rows) or "readings"')
+
+    elif media_type == ARROW_MEDIA_TYPE:
+        try:
+            table = pyarrow.ipc.open_stream(pyarrow.py_buffer(body)).read_all()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid Arrow IPC stream: {e}")
+        missing = [column for column in columns if column not in table.column_names]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Arrow stream without required features: {', '.join(missing)}")
+        features = np.empty((table.num_rows, len(columns)), dtype=np.float32)
+        for j, column in enumerate(columns):
+            # Chunks are read in place; only the copy into the row-major matrix is made
+            features[:, j] = table.column(column).to_numpy()
+
+    else:
+        try:
+            payload = json.loads(body) if body else []
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if isinstance(payload, dict):
+            payload = payload.get("readings")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail='JSON body must be a list of readings or {"readings": [...]}')
+        features = _rows_from_records(payload, columns)
+
+    return _checked(features, columns)
+
+def encode_scores(classes: Sequence[str], probabilities: np.ndarray, media_type: str) -> Response:
+    """
+    Encode class probabilities as a /score response.
+
+    Args:
+        classes: Class label of each probability column (model.classes_)
+        probabilities: Array of shape (n_readings, n_classes)
+        media_type: Media type returned by negotiate_media_type
+
+    Returns:
+        Response with the encoded body
+    """
+    classes = [str(label) for label in classes]
+    probabilities = np.ascontiguousarray(probabilities, dtype="<f4")
+
+    if media_type == FLOAT32_MEDIA_TYPE:
+        return Response(
+            probabilities.tobytes(),
+            media_type=FLOAT32_MEDIA_TYPE,
+            headers={"X-Model-Classes": ",".join(classes), "X-Shape": f"{probabilities.shape[0]},{probabilities.shape[1]}"}
+        )
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb({
+            "classes": classes,
+            "shape": list(probabilities.shape),
+            "probabilities": probabilities.tobytes()
+        })
+        return Response(body, media_type=MSGPACK_MEDIA_TYPE)
+
+    if media_type == ARROW_MEDIA_TYPE:
+        table = pyarrow.table({label: probabilities[:, j] for j, label in enumerate(classes)})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    return Response(dumps({"classes": classes, "probabilities": probabilities}), media_type=JSON_MEDIA_TYPE)
+
+async def iter_ndjson_windows(
+    chunks: AsyncIterator[bytes],
+    window: int,
+    columns: Optional[List[str]] = None
+) -> AsyncIterator[Tuple[int, np.ndarray]]:
+    """
+    Decode a chunked NDJSON request body into fixed-size windows of readings.
+
+    Chunks are consumed as they arrive, so at most one window of readings
+    (plus one partial line) is held in memory whatever the body size.
+
+    Args:
+        chunks: Request body chunks (request.stream())
+        window: Number of readings per window
+        columns: Feature order of the matrices, defaults to config.REQUIRED_FEATURES
+
+    Yields:
+        (index of the first reading, float32 array of shape (n, n_features)) per window
+
+    Raises:
+        ValueError: For malformed lines, missing or non-finite features (with the line number)
+    """
+    columns = columns or config.REQUIRED_FEATURES
+    first_row = 0
+    records = []
+    pending = b""
+
+    def flush() -> np.ndarray:
+        try:
+            return _checked(_rows_from_records(records, columns), columns)
+        except HTTPException as e:
+            raise ValueError(f"Readings {first_row}-{first_row + len(records) - 1}: {e.detail}")
+
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        if len(pending) > MAX_NDJSON_LINE_BYTES:
+            raise ValueError(f"Reading {first_row + len(records)} is longer than {MAX_NDJSON_LINE_BYTES} bytes")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                raise ValueError(f"Reading {first_row + len(records)} is not valid JSON: {e}")
+            if len(records) == window:
+                yield first_row, flush()
+                first_row += len(records)
+                records = []
+
+    if pending.strip():
+        try:
+            records.append(json.loads(pending))
+        except ValueError as e:
+            raise ValueError(f"Reading {first_row + len(records)} is not valid JSON: {e}")
+    if records:
+        yield first_row, flush()
+
+def encode_score_lines(first_row: int, probabilities: np.ndarray) -> bytes:
+    """
+    Encode one window of class probabilities as NDJSON lines.
+
+    Args:
+        first_row: Index of the window's first reading in the request
+        probabilities: Array of shape (n_readings, n_classes)
+
+    Returns:
+        One {"row": ..., "probabilities": [...]} line per reading
+    """
+    probabilities = probabilities.astype(np.float32, copy=False)
+    return b"".join(
+        dumps({"row": first_row + offset, "probabilities": row}) + b"\n"
+        for offset, row in enumerate(probabilities)
+    )
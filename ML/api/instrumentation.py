@@ -0,0 +1,159 @@
+import os
+import sys
+import hmac
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+import anyio.to_thread
+
+# Add the parent directory to the path to import from the config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from utils.metrics import STAGE_LATENCY, REQUESTS_IN_FLIGHT, render_metrics
+from utils.profiling import profiler
+from utils.tracing import tracer
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that tracks in-flight requests and the stages around a handler.
+
+    It stamps the request with its arrival time so the handler can record
+    request parsing (body read, validation, dependencies) with
+    record_request_parsing(). If the handler then calls mark_handler_done(),
+    the time until the response headers are sent is recorded as
+    serialization.
+
+    It also starts the request's root trace span (continuing the trace from
+    an incoming traceparent header) and returns the trace id of sampled
+    requests in the X-Trace-Id response header. Monitoring and admin
+    endpoints are never traced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["metrics_start"] = time.perf_counter()
+
+        path = scope["path"]
+        if path == "/metrics" or path.startswith("/admin"):
+            root_span = None
+        else:
+            root_span = tracer.start_trace(f"{scope['method']} {path}", _header(scope, b"traceparent"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                handler_done = state.get("metrics_handler_done")
+                if handler_done is not None:
+                    STAGE_LATENCY.observe("serialization", time.perf_counter() - handler_done)
+                    tracer.record_span("serialization", handler_done)
+                if root_span is not None and root_span.trace_id is not None:
+                    root_span.set_attribute("http.status_code", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", root_span.trace_id.encode())]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            if root_span is None:
+                await self.app(scope, receive, send_wrapper)
+            else:
+                with root_span:
+                    await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+def _header(scope, name: bytes) -> Optional[str]:
+    """Return a request header from an ASGI scope, or None."""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def record_request_parsing(request: Request) -> None:
+    """Record the time from request arrival until the handler started."""
+    start_time = request.scope.get("state", {}).get("metrics_start")
+    if start_time is not None:
+        STAGE_LATENCY.observe("request_parsing", time.perf_counter() - start_time)
+        tracer.record_span("request_parsing", start_time)
+
+def mark_handler_done(request: Request) -> None:
+    """Mark the end of the handler so response serialization can be timed."""
+    request.scope.setdefault("state", {})["metrics_handler_done"] = time.perf_counter()
+
+router = APIRouter()
+
+@router.get("/metrics", tags=["Status"], response_class=PlainTextResponse)
+async def metrics():
+    """Serving metrics in the Prometheus text exposition format."""
+    # Sync endpoints run on AnyIO's worker threads; tasks waiting for a
+    # thread are the executor queue
+    limiter_stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    return render_metrics({
+        "executor_queue_depth": limiter_stats.tasks_waiting,
+        "executor_threads_busy": limiter_stats.borrowed_tokens,
+        "executor_threads_total": limiter_stats.total_tokens
+    })
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency that guards admin endpoints with config.ADMIN_TOKEN (disabled when it is unset)."""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ProfilingSettings(BaseModel):
+    enabled: Optional[bool] = Field(None, description="Turn request profiling on or off")
+    sample_rate: Optional[float] = Field(None, description="Fraction of requests to profile", ge=0, le=1)
+    slow_ms: Optional[float] = Field(None, description="Keep profiles of requests slower than this (0 = off)", ge=0)
+    interval_ms: Optional[float] = Field(None, description="Stack sampling interval in milliseconds", gt=0)
+    max_files: Optional[int] = Field(None, description="Number of profile files to keep", ge=1)
+
+@router.get("/admin/profiling", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_profiling():
+    """Current request profiling settings and the most recent profile files."""
+    return profiler.status()
+
+@router.post("/admin/profiling", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def update_profiling(settings: ProfilingSettings):
+    """Enable, disable or tune request profiling without restarting the server."""
+    profiler.configure(**settings.dict())
+    return profiler.status()
+
+class TracingSettings(BaseModel):
+    sample_rate: Optional[float] = Field(None, description="Fraction of requests traced (in addition to upstream-sampled ones)", ge=0, le=1)
+    buffer_size: Optional[int] = Field(None, description="Number of recent traces kept in memory", ge=1)
+
+@router.get("/admin/tracing", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_tracing():
+    """Current request tracing settings."""
+    return tracer.status()
+
+@router.post("/admin/tracing", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def update_tracing(settings: TracingSettings):
+    """Change the trace sample rate or buffer size without restarting the server."""
+    tracer.configure(**settings.dict())
+    return tracer.status()
+
+@router.get("/admin/traces", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_traces(
+    limit: int = Query(20, description="Maximum number of traces to return", ge=1, le=1000),
+    min_duration_ms: float = Query(0, description="Only return traces at least this slow", ge=0),
+    name: Optional[str] = Query(None, description="Only return traces with this root span name, e.g. 'POST /recommend'")
+):
+    """Most recent traces from the in-memory buffer, newest first."""
+    return {"traces": tracer.get_traces(limit=limit, min_duration_ms=min_duration_ms, name=name)}
+
+@router.get("/admin/traces/{trace_id}", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    """A single buffered trace with all of its spans."""
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (it may have been evicted from the buffer)")
+    return trace
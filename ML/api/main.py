@@ -1,10 +1,11 @@
 import os
 import sys
+import time
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from pydantic import BaseModel, Field
 
 # Add the parent directory to the path to import from the config
@@ -13,13 +14,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import config
 from utils.data_utils import normalize_features
 from api.predict import load_model, get_latest_model, generate_recommendation
+from utils.metrics import MODEL_LOAD_SECONDS, set_model_info
+from utils.profiling import profiler
+from utils.logging_utils import setup_logging
+from api.responses import FastJSONResponse, build_crop_recommendation_result
+from api.instrumentation import RequestMetricsMiddleware, record_request_parsing, mark_handler_done, router as instrumentation_router
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -28,6 +30,8 @@ app = FastAPI(
     description="API for getting crop recommendations based on soil data",
     version="1.0.0"
 )
+app.add_middleware(RequestMetricsMiddleware)
+app.include_router(instrumentation_router)
 
 # Define input model
 class SoilData(BaseModel):
@@ -59,7 +63,10 @@ def get_model():
         model_path = get_latest_model()
         if model_path is None:
             raise HTTPException(status_code=500, detail="No model found. Please train a model first.")
+        start_time = time.perf_counter()
         model = load_model(model_path)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start_time)
+        set_model_info(os.path.splitext(os.path.basename(model_path))[0], type(model).__name__)
     return model
 
 @app.get("/")
@@ -71,32 +78,36 @@ def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 @app.post("/recommend", response_model=CropRecommendation)
-def recommend_crop(soil_data: SoilData, model=Depends(get_model)):
-    try:
-        # Convert input to DataFrame
-        features = pd.DataFrame({
-            'ph': [soil_data.ph],
-            'temperature': [soil_data.temperature],
-            'humidity': [soil_data.humidity],
-            'n': [soil_data.nitrogen],
-            'p': [soil_data.phosphorus],
-            'k': [soil_data.potassium],
-            'organic_matter': [soil_data.organic_matter or 5.0],
-            'conductivity': [soil_data.conductivity or 1.0],
-            'salinity': [soil_data.salinity or 1.0]
-        })
-        
-        # Generate recommendation
-        recommendation = generate_recommendation(model, features)
-        
-        # Check for errors
-        if 'error' in recommendation:
-            raise HTTPException(status_code=500, detail=recommendation['error'])
+def recommend_crop(request: Request, soil_data: SoilData, model=Depends(get_model)):
+    record_request_parsing(request)
+    
+    with profiler.profile_request("recommend"):
+        try:
+            # Convert input to DataFrame
+            features = pd.DataFrame({
+                'ph': [soil_data.ph],
+                'temperature': [soil_data.temperature],
+                'humidity': [soil_data.humidity],
+                'n': [soil_data.nitrogen],
+                'p': [soil_data.phosphorus],
+                'k': [soil_data.potassium],
+                'organic_matter': [soil_data.organic_matter or 5.0],
+                'conductivity': [soil_data.conductivity or 1.0],
+                'salinity': [soil_data.salinity or 1.0]
+            })
             
-        return recommendation
-    except Exception as e:
-        logger.error(f"Error generating recommendation: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+            # Generate recommendation
+            recommendation = generate_recommendation(model, features)
+            
+            # Check for errors
+            if 'error' in recommendation:
+                raise HTTPException(status_code=500, detail=recommendation['error'])
+            
+            mark_handler_done(request)
+            return FastJSONResponse(build_crop_recommendation_result(recommendation))
+        except Exception as e:
+            logger.error(f"Error generating recommendation: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/model-info")
 def get_model_info(model=Depends(get_model)):
@@ -12,19 +12,26 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import config
 from utils.data_utils import normalize_features, generate_synthetic_data
+from utils.metrics import timed_stage
+from utils.cpu_budget import limit_inference_threads
+from utils.compact_forest import COMPACT_SUFFIX
+from utils.cascade import STUDENT_SUFFIX
+from utils.model_bundle import BUNDLE_EXTENSION, load_bundle
+from utils.logging_utils import setup_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
 logger = logging.getLogger(__name__)
 
+# Artifacts saved next to a trained model that are not served on their own
+COMPANION_SUFFIXES = (COMPACT_SUFFIX, STUDENT_SUFFIX)
+
 def load_model(model_path):
     """
     Load a trained model from disk.
     
+    Model bundles are loaded with load_bundle; bare .joblib files saved by
+    earlier versions are unpickled directly.
+    
     Args:
         model_path: Path to the saved model
         
@@ -36,9 +43,14 @@ def load_model(model_path):
             logger.error(f"Model file not found: {model_path}")
             raise FileNotFoundError(f"Model file not found: {model_path}")
             
-        model = joblib.load(model_path)
+        if model_path.endswith(BUNDLE_EXTENSION):
+            model, _ = load_bundle(model_path)
+        else:
+            model = joblib.load(model_path)
+        if not hasattr(model, "predict_proba"):
+            raise TypeError(f"{model_path} does not hold a model ({type(model).__name__})")
         logger.info(f"Model loaded from {model_path}")
-        return model
+        return limit_inference_threads(model)
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         raise
@@ -47,6 +59,9 @@ def get_latest_model(model_type=None):
     """
     Get the path to the latest trained model.
     
+    Companion artifacts written next to a model (COMPANION_SUFFIXES) are
+    skipped, even though they are newer than the model itself.
+    
     Args:
         model_type: Optional filter by model type
         
@@ -56,7 +71,7 @@ def get_latest_model(model_type=None):
     try:
         model_files = []
         for file in os.listdir(config.MODELS_DIR):
-            if file.endswith('.joblib'):
+            if file.endswith((BUNDLE_EXTENSION, '.joblib')) and not file.endswith(COMPANION_SUFFIXES):
                 if model_type is None or file.startswith(model_type):
                     model_files.append(os.path.join(config.MODELS_DIR, file))
                     
@@ -87,7 +102,7 @@ def generate_recommendation(model, features):
         # Get the feature names used during training (for random forest)
         if hasattr(model, 'feature_names_in_'):
             required_features = model.feature_names_in_
-            logger.info(f"Model requires these features: {required_features}")
+            logger.debug("Model requires these features: %s", required_features)
             
             # Check if we have all required features
             missing_features = [f for f in required_features if f not in features.columns]
@@ -101,36 +116,40 @@ def generate_recommendation(model, features):
             features = features[required_features]
         
         # Ensure features are normalized
-        normalized_features = normalize_features(features)
+        with timed_stage("normalize_features"):
+            normalized_features = normalize_features(features)
         
         # Get prediction probabilities
         if hasattr(model, 'predict_proba'):
-            probs = model.predict_proba(normalized_features)
-            predicted_crop = model.classes_[np.argmax(probs, axis=1)][0]
-            confidence = np.max(probs, axis=1)[0] * 100
-            
-            # Get top 3 recommendations
-            top_indices = np.argsort(probs[0])[::-1][:3]
-            top_crops = [model.classes_[i] for i in top_indices]
-            top_probabilities = [probs[0][i] * 100 for i in top_indices]
+            with timed_stage("predict_proba"):
+                probs = model.predict_proba(normalized_features)
             
-            recommendations = []
-            for i, (crop, prob) in enumerate(zip(top_crops, top_probabilities)):
-                recommendations.append({
-                    "crop": crop,
-                    "probability": round(prob, 2),
-                    "rank": i + 1
-                })
+            with timed_stage("top_n_reasoning"):
+                predicted_crop = model.classes_[np.argmax(probs, axis=1)][0]
+                confidence = np.max(probs, axis=1)[0] * 100
                 
-            result = {
-                "recommended_crop": predicted_crop,
-                "confidence": round(confidence, 2),
-                "alternatives": recommendations,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # Add advice based on the crop
-            result["advice"] = get_crop_advice(predicted_crop, features)
+                # Get top 3 recommendations
+                top_indices = np.argsort(probs[0])[::-1][:3]
+                top_crops = [model.classes_[i] for i in top_indices]
+                top_probabilities = [probs[0][i] * 100 for i in top_indices]
+                
+                recommendations = []
+                for i, (crop, prob) in enumerate(zip(top_crops, top_probabilities)):
+                    recommendations.append({
+                        "crop": crop,
+                        "probability": round(prob, 2),
+                        "rank": i + 1
+                    })
+                    
+                result = {
+                    "recommended_crop": predicted_crop,
+                    "confidence": round(confidence, 2),
+                    "alternatives": recommendations,
+                    "timestamp": datetime.now().isoformat()
+                }
+                
+                # Add advice based on the crop
+                result["advice"] = get_crop_advice(predicted_crop, features)
             
             return result
         else:
@@ -278,6 +297,8 @@ def main(args):
         raise
 
 if __name__ == "__main__":
+    setup_logging()
+    
     parser = argparse.ArgumentParser(description="Test crop recommendation model")
     parser.add_argument("--model-path", type=str, help="Path to the trained model")
     parser.add_argument("--model-type", type=str, default="random_forest", help="Model type to use (if not specifying a path)")
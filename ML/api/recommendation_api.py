@@ -1,29 +1,39 @@
 import os
 import sys
+import time
+import numpy as np
 import pandas as pd
 import logging
 from typing import Dict, List, Optional, Any
-from fastapi import FastAPI, HTTPException, Depends, Query, Body
+from fastapi import FastAPI, HTTPException, Depends, Query, Body, Request
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field, validator
 import uvicorn
 import json
+import anyio.to_thread
 
 # Add the parent directory to the path to import from the config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
-from utils.data_utils import preprocess_soil_data, normalize_features
-from utils.model_utils import load_model, predict_crops
-from utils.recommendation_utils import generate_comprehensive_recommendation
+from utils.data_utils import preprocess_soil_data, normalize_features, normalize_feature_matrix
+from utils.model_utils import load_model, read_model_header, predict_crops, rank_crops, predict_proba_matrix
+from utils.early_exit import supports_early_exit, early_exit_predict_proba
+from utils.cascade import CascadeModel
+from utils.cpu_budget import check_cpu_budget
+from utils.shm_pool import SharedMemoryInferencePool, InferencePoolError
+from utils.recommendation_utils import generate_comprehensive_recommendation, parse_fields
+from utils.metrics import timed_stage, MODEL_LOAD_SECONDS, EARLY_EXIT_TREES, set_model_info
+from utils.profiling import profiler
+from utils.logging_utils import setup_logging
+from api.responses import FastJSONResponse, DuplexStreamingResponse, build_recommendation_result
+from api.encodings import (
+    NDJSON_MEDIA_TYPE, parse_media_type, negotiate_media_type, decode_readings, encode_scores,
+    iter_ndjson_windows, encode_score_lines, max_body_bytes, read_body
+)
+from api.instrumentation import RequestMetricsMiddleware, record_request_parsing, mark_handler_done, router as instrumentation_router
 
 # Set up logging
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format=config.LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(config.LOGS_DIR, "api.log"))
-    ]
-)
+setup_logging("api.log")
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -32,6 +42,8 @@ app = FastAPI(
     description="API for crop recommendations based on soil data",
     version=config.MODEL_VERSION
 )
+app.add_middleware(RequestMetricsMiddleware)
+app.include_router(instrumentation_router)
 
 # Define Pydantic models for request and response
 class SoilDataInput(BaseModel):
@@ -110,18 +122,50 @@ class RecommendationResponse(BaseModel):
 
 # Global variable to store the loaded model
 model = None
+# Bundle header of the loaded model (None for models saved without a bundle)
+model_header = None
+# Shared-memory inference worker pool for /score (None when INFERENCE_PROCESSES is 0)
+inference_pool = None
+
+def _load_serving_model():
+    """Load the serving model and record its load time, version and bundle header."""
+    global model_header
+    start_time = time.perf_counter()
+    loaded_model = load_model()
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start_time)
+    set_model_info(config.MODEL_VERSION, type(loaded_model).__name__)
+    model_header = read_model_header()
+    return loaded_model
 
 @app.on_event("startup")
 async def startup_event():
-    """Load the model at startup."""
-    global model
+    """Load the model at startup, and start the inference workers when configured."""
+    global model, inference_pool
     try:
         logger.info("Loading model on startup")
-        model = load_model()
+        check_cpu_budget()
+        model = _load_serving_model()
         logger.info("Model loaded successfully")
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         # Continue without model - will try to load it again when needed
+        return
+    
+    if config.INFERENCE_PROCESSES > 0:
+        try:
+            inference_pool = await anyio.to_thread.run_sync(
+                lambda: SharedMemoryInferencePool(config.INFERENCE_PROCESSES, model.classes_, len(config.REQUIRED_FEATURES))
+            )
+        except Exception as e:
+            logger.error(f"Error starting inference workers, scoring in the API process: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference workers."""
+    global inference_pool
+    if inference_pool is not None:
+        inference_pool.close()
+        inference_pool = None
 
 def get_model():
     """Dependency to get the model."""
@@ -129,7 +173,7 @@ def get_model():
     if model is None:
         try:
             logger.info("Loading model on demand")
-            model = load_model()
+            model = _load_serving_model()
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
@@ -155,58 +199,207 @@ async def health_check():
         "model_loaded": model is not None
     }
 
+def _predict_crops_early_exit(model, normalized_df: pd.DataFrame, top_n: int):
+    """
+    Rank crops with early-exit inference (see utils/early_exit.py).
+
+    Returns:
+        Tuple of (recommendations as returned by predict_crops, response headers
+        reporting the trees evaluated and whether the ranking is exact)
+    """
+    with timed_stage("predict_proba"):
+        result = early_exit_predict_proba(model, normalized_df, top_n=top_n)
+    with timed_stage("top_n_reasoning"):
+        crop_recommendations = rank_crops(model.classes_, result.probabilities, normalized_df, top_n)
+
+    trees_evaluated = int(result.trees_evaluated[0])
+    ranking = "exact" if result.exact[0] else "approximate"
+    EARLY_EXIT_TREES.observe(ranking, trees_evaluated / result.n_trees)
+    headers = {
+        "X-Trees-Evaluated": str(trees_evaluated),
+        "X-Trees-Total": str(result.n_trees),
+        "X-Ranking": ranking
+    }
+    return crop_recommendations, headers
+
 @app.post("/recommend", response_model=RecommendationResponse, tags=["Recommendations"])
 async def recommend_crops(
+    request: Request,
     soil_data: SoilDataInput,
     model=Depends(get_model),
     top_n: int = Query(3, description="Number of top recommendations to return", ge=1, le=10),
-    include_comprehensive: bool = Query(True, description="Whether to include comprehensive recommendation for top crop")
+    include_comprehensive: bool = Query(True, description="Whether to include comprehensive recommendation for top crop"),
+    fields: Optional[str] = Query(None, description="Comma-separated sections of the comprehensive recommendation to compute and return, e.g. 'fertilizer.summary,yield_potential' (all by default)")
 ):
     """
     Get crop recommendations based on soil data.
     
     This endpoint accepts soil data parameters and returns crop recommendations
     with confidence scores and optionally detailed growing recommendations.
+    Sections of the comprehensive recommendation that are not listed in
+    `fields` are neither computed nor returned.
     """
+    record_request_parsing(request)
+    
     try:
-        logger.info(f"Received recommendation request with soil data: {soil_data.dict()}")
-        
-        # Convert input to DataFrame
-        soil_df = pd.DataFrame([soil_data.dict()])
-        
-        # Preprocess the data
-        processed_df = preprocess_soil_data(soil_df)
-        
-        # Extract features for the model
-        feature_df = processed_df[config.REQUIRED_FEATURES]
-        
-        # Normalize features
-        normalized_df = normalize_features(feature_df)
-        
-        # Get crop recommendations
-        crop_recommendations = predict_crops(model, normalized_df, top_n=top_n)
-        
-        # If no recommendations, return error
-        if not crop_recommendations or len(crop_recommendations) == 0 or len(crop_recommendations[0]) == 0:
-            raise HTTPException(status_code=404, detail="No crop recommendations found for the given soil data")
-        
-        # Prepare response
-        recommendations = crop_recommendations[0]  # Just the first sample's recommendations
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    with profiler.profile_request("recommend"):
+        try:
+            # Per-request logging stays at DEBUG with lazy formatting so the
+            # payload is only rendered when DEBUG is enabled
+            logger.debug("Received recommendation request with soil data: %s", soil_data)
+            
+            # Convert input to DataFrame
+            soil_df = pd.DataFrame([soil_data.dict()])
+            
+            # Preprocess the data
+            with timed_stage("preprocess_soil_data"):
+                imputation_defaults = model_header.get("imputation_defaults") if model_header else None
+                processed_df = preprocess_soil_data(soil_df, imputation_defaults)
+            
+            # Extract features for the model
+            feature_df = processed_df[config.REQUIRED_FEATURES]
+            
+            # Normalize features
+            with timed_stage("normalize_features"):
+                normalized_df = normalize_features(feature_df)
+            
+            # Get crop recommendations
+            early_exit_headers = None
+            if config.INFERENCE_EARLY_EXIT and supports_early_exit(model):
+                crop_recommendations, early_exit_headers = _predict_crops_early_exit(model, normalized_df, top_n)
+            else:
+                crop_recommendations = predict_crops(model, normalized_df, top_n=top_n, record_stages=True)
+            
+            # If no recommendations, return error
+            if not crop_recommendations or len(crop_recommendations) == 0 or len(crop_recommendations[0]) == 0:
+                raise HTTPException(status_code=404, detail="No crop recommendations found for the given soil data")
+            
+            # Prepare response
+            recommendations = crop_recommendations[0]  # Just the first sample's recommendations
+            
+            # Generate comprehensive recommendation for top crop if requested
+            comprehensive_rec = None
+            if include_comprehensive and len(recommendations) > 0:
+                top_crop = recommendations[0]["crop"]
+                with timed_stage("comprehensive_recommendation"):
+                    comprehensive_rec = generate_comprehensive_recommendation(top_crop, soil_df.iloc[0], fields=selected_fields)
+            
+            mark_handler_done(request)
+            # Returned as a Response so FastAPI does not re-validate the nested
+            # dicts against RecommendationResponse (kept for the schema)
+            return FastJSONResponse(build_recommendation_result(recommendations, comprehensive_rec), headers=early_exit_headers)
         
-        # Generate comprehensive recommendation for top crop if requested
-        comprehensive_rec = None
-        if include_comprehensive and len(recommendations) > 0:
-            top_crop = recommendations[0]["crop"]
-            comprehensive_rec = generate_comprehensive_recommendation(top_crop, soil_df.iloc[0])
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {e}")
+            raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+
+@app.post("/score", tags=["Recommendations"])
+async def score_readings(request: Request, model=Depends(get_model)):
+    """
+    Score many soil readings in one request.
+    
+    Returns the class probabilities of every reading, without the per-reading
+    ranking and recommendation text of /recommend. Readings can be sent as
+    JSON, packed little-endian float32 rows (application/octet-stream),
+    MessagePack or an Arrow IPC stream; binary bodies are decoded into a
+    float32 matrix without building Python objects per value. The response
+    uses the request's encoding unless the Accept header asks for another one
+    (see api/encodings.py). Bodies that cannot fit within SCORE_MAX_ROWS
+    readings are rejected with 413 before they are read; decoding, scoring
+    and encoding run on a worker thread.
+    """
+    media_type = parse_media_type(request.headers.get("content-type"))
+    response_type = negotiate_media_type(request.headers.get("accept"), media_type)
+    body = await read_body(request, max_body_bytes(media_type, config.SCORE_MAX_ROWS))
+    record_request_parsing(request)
+    
+    response = await anyio.to_thread.run_sync(_score_body, model, body, media_type, response_type)
+    mark_handler_done(request)
+    return response
+
+def _score_body(model, body: bytes, media_type: str, response_type: str):
+    """Decode, score and encode the readings of one /score request."""
+    features = decode_readings(body, media_type)
+    if len(features) > config.SCORE_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {config.SCORE_MAX_ROWS} readings per request")
+    
+    with profiler.profile_request("score"):
+        try:
+            logger.debug("Scoring %d readings (%s -> %s)", len(features), media_type, response_type)
+            
+            # Separate stage names keep bulk timings out of the /recommend histograms
+            with timed_stage("score_normalize_features"):
+                normalized = normalize_feature_matrix(features)
+            
+            with timed_stage("score_predict_proba"):
+                if not len(normalized):
+                    probabilities = np.empty((0, len(model.classes_)), dtype=np.float32)
+                elif inference_pool is not None:
+                    probabilities = inference_pool.predict_proba(normalized, config.SHM_POOL_TIMEOUT)
+                else:
+                    probabilities = predict_proba_matrix(model, normalized)
+            
+            return encode_scores(model.classes_, probabilities, response_type)
         
-        return {
-            "recommendations": recommendations,
-            "comprehensive_recommendation": comprehensive_rec
-        }
+        except (TimeoutError, InferencePoolError) as e:
+            logger.error(f"Inference workers unavailable: {e}")
+            raise HTTPException(status_code=503, detail=f"Inference workers unavailable: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error scoring readings: {e}")
+            raise HTTPException(status_code=500, detail=f"Error scoring readings: {str(e)}")
+
+def _score_window(model, features: np.ndarray) -> np.ndarray:
+    """Normalize and score one window of readings."""
+    with timed_stage("score_normalize_features"):
+        normalized = normalize_feature_matrix(features)
+    with timed_stage("score_predict_proba"):
+        if inference_pool is not None:
+            return inference_pool.predict_proba(normalized, config.SHM_POOL_TIMEOUT)
+        return predict_proba_matrix(model, normalized)
+
+@app.post("/score/stream", tags=["Recommendations"])
+async def score_readings_stream(
+    request: Request,
+    model=Depends(get_model),
+    window: int = Query(config.SCORE_STREAM_WINDOW, description="Number of readings scored together", ge=1, le=100000)
+):
+    """
+    Score an NDJSON stream of soil readings of any size.
     
-    except Exception as e:
-        logger.error(f"Error generating recommendations: {e}")
-        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    The request body (one reading object per line, usually sent with chunked
+    transfer encoding) is read window by window while the upload is still in
+    progress; each window is scored in a worker thread and its results are
+    streamed back at once as NDJSON lines `{"row": ..., "probabilities": [...]}`
+    with the classes in the X-Model-Classes header. Memory use is bounded
+    by the window size, not by the payload. A malformed reading ends the
+    stream with an `{"error": ...}` line.
+    """
+    record_request_parsing(request)
+    classes = [str(label) for label in model.classes_]
+    
+    async def results():
+        n_rows = 0
+        try:
+            async for first_row, features in iter_ndjson_windows(request.stream(), window):
+                probabilities = await anyio.to_thread.run_sync(_score_window, model, features)
+                n_rows = first_row + len(features)
+                yield encode_score_lines(first_row, probabilities)
+        except ClientDisconnect:
+            logger.info(f"Client disconnected from scoring stream after {n_rows} readings")
+            return
+        except ValueError as e:
+            logger.warning(f"Stopped scoring stream after {n_rows} readings: {e}")
+            yield json.dumps({"error": str(e), "row": n_rows}).encode() + b"\n"
+        except Exception as e:
+            logger.error(f"Error scoring stream after {n_rows} readings: {e}")
+            yield json.dumps({"error": f"Error scoring readings: {str(e)}", "row": n_rows}).encode() + b"\n"
+        logger.debug("Scored stream of %d readings", n_rows)
+    
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE, headers={"X-Model-Classes": ",".join(classes)})
 
 @app.get("/crops", tags=["Information"])
 async def get_available_crops():
@@ -217,32 +410,47 @@ async def get_available_crops():
 
 @app.get("/model-info", tags=["Information"])
 async def get_model_info():
-    """Get information about the currently loaded model."""
-    global model
-    model_loaded = model is not None
-    
-    if not model_loaded:
-        try:
-            model = load_model()
-            model_loaded = True
-        except:
-            pass
+    """
+    Get information about the served model.
     
+    The details come from the model bundle's header, so this never loads
+    (or waits for) the model itself.
+    """
     info = {
         "model_version": config.MODEL_VERSION,
-        "model_loaded": model_loaded,
+        "model_loaded": model is not None,
+        "inference_backend": config.INFERENCE_BACKEND,
         "required_features": config.REQUIRED_FEATURES,
         "all_features": config.SOIL_FEATURES
     }
     
-    if model_loaded:
+    try:
+        header = read_model_header()
+    except Exception as e:
+        logger.error(f"Error reading model bundle header: {e}")
+        header = None
+    
+    if header is not None:
+        info["model_type"] = header["estimator"].rsplit(".", 1)[-1]
+        info["model_family"] = header.get("model_type")
+        info["supported_crops"] = header["classes"]
+        info["features"] = header["features"]
+        info["metrics"] = header.get("metrics", {})
+        info["timings"] = header.get("timings", {})
+        info["trained_at"] = header.get("created_at")
+        info["bundle_format_version"] = header["format_version"]
+    elif model is not None:
+        # Models saved before bundles only describe themselves once loaded
         try:
             info["model_type"] = type(model).__name__
             if hasattr(model, "classes_"):
-                info["supported_crops"] = model.classes_.tolist()
+                info["supported_crops"] = [str(label) for label in model.classes_]
         except Exception as e:
             logger.error(f"Error getting model details: {e}")
     
+    if isinstance(model, CascadeModel):
+        info["cascade"] = model.stats()
+    
     return info
 
 if __name__ == "__main__":
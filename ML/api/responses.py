@@ -0,0 +1,141 @@
+"""
+Typed response objects and a fast JSON response for the recommendation APIs.
+
+When a path operation returns a plain dict, FastAPI validates it against the
+declared response_model and re-encodes the result before dumping it with the
+standard library json module. For the recommendation responses that means
+walking the deep, untyped `Dict[str, Any]` structures twice per request.
+
+The endpoints instead build the slotted dataclasses below and return them in
+a FastJSONResponse, which FastAPI sends as is. orjson serializes dataclasses
+and numpy scalars natively; when it is not installed the standard library is
+used with the same output format. The bytes match what the validated path
+produced (compact separators, UTF-8), and the response_model declarations
+are kept for the OpenAPI schema. Unlike the validated path, numpy float32
+values from the boosting backends are serialized instead of failing.
+"""
+
+import json
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@dataclass(slots=True)
+class CropScore:
+    """One ranked crop of a /recommend response (api/recommendation_api.py)."""
+    crop: str
+    confidence: float
+    confidence_level: str
+    reasoning: str
+
+@dataclass(slots=True)
+class RecommendationResult:
+    """Body of a /recommend response (api/recommendation_api.py)."""
+    recommendations: List[CropScore]
+    comprehensive_recommendation: Optional[Dict[str, Any]] = None
+
+@dataclass(slots=True)
+class CropRecommendationResult:
+    """Body of a /recommend response (api/main.py)."""
+    recommended_crop: str
+    confidence: float
+    alternatives: List[Dict[str, Any]]
+    advice: Dict[str, str]
+    timestamp: str
+
+def build_recommendation_result(
+    recommendations: List[Dict[str, Any]],
+    comprehensive_rec: Optional[Dict[str, Any]] = None
+) -> RecommendationResult:
+    """
+    Build the typed /recommend result from predict_crops output.
+
+    Args:
+        recommendations: Ranked crops for one reading, as returned by predict_crops
+        comprehensive_rec: Comprehensive recommendation for the top crop, if any
+
+    Returns:
+        RecommendationResult ready for FastJSONResponse
+    """
+    return RecommendationResult(
+        recommendations=[
+            CropScore(rec["crop"], rec["confidence"], rec["confidence_level"], rec["reasoning"])
+            for rec in recommendations
+        ],
+        comprehensive_recommendation=comprehensive_rec
+    )
+
+def build_crop_recommendation_result(recommendation: Dict[str, Any]) -> CropRecommendationResult:
+    """
+    Build the typed api/main.py /recommend result from generate_recommendation output.
+
+    Args:
+        recommendation: Dictionary returned by api.predict.generate_recommendation
+
+    Returns:
+        CropRecommendationResult ready for FastJSONResponse
+    """
+    return CropRecommendationResult(
+        recommended_crop=str(recommendation["recommended_crop"]),
+        confidence=recommendation["confidence"],
+        alternatives=recommendation["alternatives"],
+        advice=recommendation["advice"],
+        timestamp=recommendation["timestamp"]
+    )
+
+def _default(obj: Any) -> Any:
+    """Convert the values neither encoder handles natively."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if dataclasses.is_dataclass(obj):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize a response body to compact UTF-8 JSON.
+
+    Args:
+        content: Dataclasses, dicts, lists and scalars (numpy scalars included)
+
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSON response that serializes its content with dumps() and skips response_model validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose body iterator may still be reading the request body.
+
+    StreamingResponse listens for client disconnects by calling receive()
+    while it streams (for ASGI servers older than spec 2.4, uvicorn included),
+    which would swallow request body chunks. Here only the body iterator
+    receives; a disconnect surfaces as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,2 @@
+# ML benchmarks package
+# Benchmark scripts are run directly, e.g. python benchmarks/bench_pipeline.py
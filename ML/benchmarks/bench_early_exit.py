@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark of early-exit inference for random forests.
+
+A random forest is trained on synthetic readings and every held-out reading
+is ranked both by the full forest and by utils/early_exit.py. For each top_n
+and confidence bound the script reports:
+
+    mean_trees        mean number of trees evaluated per reading
+    exact_fraction    fraction of readings whose ranking is reported as exact
+    ranking_agreement fraction of readings with the same top_n crops (in order)
+                      as the full forest
+
+and the single-row latency (p50/p95, as served by /recommend) of both. The
+script exits with status 1 when a ranking reported as exact differs from the
+full forest's.
+
+Usage:
+    python benchmarks/bench_early_exit.py
+    python benchmarks/bench_early_exit.py --top-n 1 3 --deltas 0 0.01 0.05 --chunk-trees 10 --output early_exit.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params
+from utils.early_exit import early_exit_predict_proba
+from utils.logging_utils import setup_logging
+from benchmarks.bench_pipeline import make_readings
+
+logger = logging.getLogger(__name__)
+
+def _single_row_latency(predict: Callable[[Any], Any], rows: List[Any]) -> List[float]:
+    """Time one call per row, in milliseconds."""
+    for row in rows[:3]:
+        predict(row)
+    times = []
+    for row in rows:
+        start_time = time.perf_counter()
+        predict(row)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return times
+
+def _top(probabilities: np.ndarray, top_n: int) -> np.ndarray:
+    return np.argsort(-probabilities, axis=1, kind="stable")[:, :top_n]
+
+def benchmark_setting(model: Any, X_eval: Any, full: np.ndarray, top_n: int, delta: float, chunk_trees: int, n_repeats: int) -> Dict[str, Any]:
+    """
+    Compare early-exit and full inference for one top_n and confidence bound.
+
+    Returns:
+        Dictionary with trees evaluated, ranking agreement and single-row latencies
+    """
+    result = early_exit_predict_proba(model, X_eval, top_n=top_n, chunk_trees=chunk_trees, delta=delta)
+    agreement = (_top(full, top_n) == _top(result.probabilities, top_n)).all(axis=1)
+
+    rows = [X_eval.iloc[[i % len(X_eval)]] for i in range(n_repeats)]
+    early_exit_times = _single_row_latency(lambda row: early_exit_predict_proba(model, row, top_n=top_n, chunk_trees=chunk_trees, delta=delta), rows)
+    full_times = _single_row_latency(model.predict_proba, rows)
+
+    setting = {
+        "top_n": top_n,
+        "delta": delta,
+        "n_trees": result.n_trees,
+        "mean_trees": float(result.trees_evaluated.mean()),
+        "exact_fraction": float(result.exact.mean()),
+        "ranking_agreement": float(agreement.mean()),
+        "exact_ranking_mismatches": int((~agreement & result.exact).sum()),
+        "full_single_p50_ms": float(np.percentile(full_times, 50)),
+        "full_single_p95_ms": float(np.percentile(full_times, 95)),
+        "early_exit_single_p50_ms": float(np.percentile(early_exit_times, 50)),
+        "early_exit_single_p95_ms": float(np.percentile(early_exit_times, 95))
+    }
+    logger.info(
+        f"top_n={top_n} delta={delta:<5} trees={setting['mean_trees']:6.1f}/{result.n_trees} "
+        f"exact={setting['exact_fraction']:.3f} agreement={setting['ranking_agreement']:.4f}  "
+        f"single p50 full={setting['full_single_p50_ms']:.3f}ms early-exit={setting['early_exit_single_p50_ms']:.3f}ms"
+    )
+    return setting
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the early-exit benchmark."""
+    parser = argparse.ArgumentParser(description="Measure trees evaluated, ranking agreement and latency of early-exit forest inference")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic readings to train the forest on")
+    parser.add_argument("--n-eval", type=int, default=2000, help="Number of held-out readings to rank")
+    parser.add_argument("--top-n", type=int, nargs="+", default=[1, 3], help="Ranking depths to check")
+    parser.add_argument("--deltas", type=float, nargs="+", default=[0.0, 0.05], help="Confidence bounds to try (0 stops on exact rankings only)")
+    parser.add_argument("--chunk-trees", type=int, default=config.EARLY_EXIT_CHUNK_TREES, help="Trees evaluated between checks")
+    parser.add_argument("--repeats", type=int, default=200, help="Number of timed single-row calls")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logging.getLogger("utils").setLevel(logging.WARNING)
+
+    readings, labels = make_readings(args.n_samples + args.n_eval)
+    X = normalize_features(readings[config.REQUIRED_FEATURES])
+    model = _create_and_train_model("random_forest", get_default_model_params("random_forest"), X.iloc[:args.n_samples], labels.iloc[:args.n_samples])
+    X_eval = X.iloc[args.n_samples:]
+    full = model.predict_proba(X_eval)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "chunk_trees": args.chunk_trees,
+        "results": [
+            benchmark_setting(model, X_eval, full, top_n, delta, args.chunk_trees, args.repeats)
+            for top_n in args.top_n
+            for delta in args.deltas
+        ]
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    mismatches = sum(setting["exact_ranking_mismatches"] for setting in report["results"])
+    if mismatches:
+        logger.error(f"{mismatches} rankings reported as exact differ from the full forest")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
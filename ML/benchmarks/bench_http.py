@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP latency benchmark for the recommendation API apps.
+
+Both FastAPI apps are driven in-process over httpx's ASGI transport, so the
+numbers include routing, request validation, the recommendation pipeline
+and response serialization but no network. For every model backend a small
+model is trained on synthetic data and injected into both apps, then each
+endpoint is swept over several concurrency levels:
+
+    recommendation_api  POST /recommend?include_comprehensive=true
+    recommendation_api  POST /recommend?include_comprehensive=false
+    recommendation_api  POST /recommend?fields=fertilizer.summary
+    main                POST /recommend
+
+Throughput, p50/p95/p99 latency and the mean response size are reported per
+backend, endpoint and concurrency level and can be written as JSON.
+
+Usage:
+    python benchmarks/bench_http.py
+    python benchmarks/bench_http.py --model-types random_forest lightgbm --concurrency 1 8 32 --output http.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import httpx
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import generate_synthetic_data, normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params
+from utils.logging_utils import setup_logging
+from api import recommendation_api
+from api import main as main_api
+from benchmarks.bench_pipeline import make_readings
+
+logger = logging.getLogger(__name__)
+
+def train_backend_models(model_type: str, n_samples: int) -> Dict[str, Any]:
+    """
+    Train one model per API app for a backend.
+
+    recommendation_api feeds the model normalized config.REQUIRED_FEATURES,
+    while api/main.py feeds the short synthetic column names, so each app
+    gets a model trained on the features it will actually send.
+
+    Returns:
+        Dictionary mapping app name to trained model
+    """
+    params = get_default_model_params(model_type)
+
+    readings, labels = make_readings(n_samples)
+    recommendation_model = _create_and_train_model(
+        model_type, params, normalize_features(readings[config.REQUIRED_FEATURES]), labels
+    )
+
+    features, labels = generate_synthetic_data(n_samples=n_samples)
+    main_model = _create_and_train_model(model_type, params, normalize_features(features), labels)
+
+    return {"recommendation_api": recommendation_model, "main": main_model}
+
+def make_payloads(n_payloads: int, random_state: int = 7) -> Dict[str, List[Dict[str, float]]]:
+    """
+    Build realistic request bodies for both API schemas.
+
+    Returns:
+        Dictionary mapping app name to a list of JSON request bodies
+    """
+    rng = np.random.default_rng(random_state)
+    recommendation_payloads = []
+    main_payloads = []
+    for _ in range(n_payloads):
+        reading = {
+            "pH": round(float(rng.uniform(4.5, 8.5)), 1),
+            "nitrogen": round(float(rng.uniform(10, 150)), 1),
+            "phosphorus": round(float(rng.uniform(5, 100)), 1),
+            "potassium": round(float(rng.uniform(10, 200)), 1),
+            "moisture": round(float(rng.uniform(20, 80)), 1),
+            "temperature": round(float(rng.uniform(12, 35)), 1),
+            "organicMatter": round(float(rng.uniform(1, 10)), 1),
+            "conductivity": round(float(rng.uniform(0.1, 2.0)), 2),
+            "salinity": round(float(rng.uniform(0.1, 1.5)), 2)
+        }
+        recommendation_payloads.append(reading)
+        main_payloads.append({
+            "ph": reading["pH"],
+            "temperature": reading["temperature"],
+            "humidity": reading["moisture"],
+            "nitrogen": reading["nitrogen"],
+            "phosphorus": reading["phosphorus"],
+            "potassium": reading["potassium"],
+            "organic_matter": reading["organicMatter"],
+            "conductivity": reading["conductivity"],
+            "salinity": reading["salinity"]
+        })
+    return {"recommendation_api": recommendation_payloads, "main": main_payloads}
+
+async def run_load(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Dict[str, Any],
+    payloads: List[Dict[str, float]],
+    n_requests: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """
+    Issue n_requests POSTs with a fixed number of concurrent clients.
+
+    Returns:
+        Throughput and latency percentiles in milliseconds
+    """
+    latencies = []
+    response_bytes = 0
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request, errors, response_bytes
+        while next_request < n_requests:
+            payload = payloads[next_request % len(payloads)]
+            next_request += 1
+            start_time = time.perf_counter()
+            response = await client.post(path, params=params, json=payload)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            response_bytes += len(response.content)
+            if response.status_code != 200:
+                errors += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "throughput_rps": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(np.max(latencies)),
+        "mean_response_bytes": response_bytes / n_requests
+    }
+
+async def benchmark_backend(
+    model_type: str,
+    concurrency_levels: List[int],
+    n_requests: int,
+    n_samples: int
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Benchmark every endpoint scenario for one model backend.
+
+    Returns:
+        Dictionary mapping scenario to concurrency level to load statistics
+    """
+    models = train_backend_models(model_type, n_samples)
+    recommendation_api.model = models["recommendation_api"]
+    main_api.model = models["main"]
+
+    payloads = make_payloads(min(n_requests, 500))
+    scenarios = [
+        ("recommendation_api /recommend comprehensive=on", recommendation_api.app, {"include_comprehensive": "true"}, "recommendation_api"),
+        ("recommendation_api /recommend comprehensive=off", recommendation_api.app, {"include_comprehensive": "false"}, "recommendation_api"),
+        ("recommendation_api /recommend fields=fertilizer.summary", recommendation_api.app, {"fields": "fertilizer.summary"}, "recommendation_api"),
+        ("main /recommend", main_api.app, {}, "main")
+    ]
+
+    results = {}
+    for name, app, params, app_name in scenarios:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm up the route, the model and any lazily created thread pools
+            await run_load(client, "/recommend", params, payloads[app_name], 20, 1)
+
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                stats = await run_load(client, "/recommend", params, payloads[app_name], n_requests, concurrency)
+                results[name][str(concurrency)] = stats
+                logger.info(
+                    f"{model_type:<17} {name:<56} c={concurrency:<3} "
+                    f"{stats['throughput_rps']:8.1f} req/s  p50={stats['p50_ms']:7.2f}ms  "
+                    f"p95={stats['p95_ms']:7.2f}ms  p99={stats['p99_ms']:7.2f}ms  "
+                    f"{stats['mean_response_bytes']:7.0f} B/response  errors={stats['errors']}"
+                )
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the HTTP benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation API apps over an in-process ASGI transport")
+    parser.add_argument("--model-types", type=str, nargs="+", default=config.MODEL_TYPES, choices=config.MODEL_TYPES, help="Model backends to benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrency levels to sweep")
+    parser.add_argument("--requests", type=int, default=300, help="Number of requests per concurrency level")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic samples to train each model on")
+    parser.add_argument("--app-log-level", type=str, help="Override the apps' log level (by default the configured logging is part of the measurement)")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logger.setLevel(logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.app_log_level:
+        logging.getLogger().setLevel(args.app_log_level)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "cpu_count": os.cpu_count(),
+        "requests_per_level": args.requests,
+        "results": {}
+    }
+    for model_type in args.model_types:
+        try:
+            report["results"][model_type] = asyncio.run(
+                benchmark_backend(model_type, args.concurrency, args.requests, args.n_samples)
+            )
+        except Exception as e:
+            logger.error(f"Error benchmarking {model_type}: {e}")
+            report["results"][model_type] = {"error": str(e)}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
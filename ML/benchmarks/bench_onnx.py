@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Parity and latency benchmark of the ONNX inference backend.
+
+For every model backend a model is trained on synthetic readings, exported
+with utils/onnx_backend.py and loaded into an onnxruntime session. On a
+held-out set of readings the exported graph is checked against the original
+model:
+
+    max_abs_diff     largest absolute difference of any class probability
+    top1_agreement   fraction of readings with the same top crop
+    top3_agreement   fraction of readings with the same top-3 crops (in order)
+
+and predict_proba latency of both is reported for single rows (p50/p95, as
+served by /recommend) and for batches (per-row cost, as served by /score).
+The script exits with status 1 when a backend's probabilities differ by more
+than --tolerance.
+
+Usage:
+    python benchmarks/bench_onnx.py
+    python benchmarks/bench_onnx.py --model-types random_forest lightgbm --batch-sizes 100 10000 --output onnx.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params
+from utils.onnx_backend import export_onnx, load_onnx_model, onnx_path_for
+from utils.logging_utils import setup_logging
+from benchmarks.bench_pipeline import make_readings
+
+logger = logging.getLogger(__name__)
+
+def _latency(predict_proba: Callable[[Any], Any], X: Any, n_repeats: int) -> List[float]:
+    """Time repeated predict_proba calls on the same input, in milliseconds."""
+    for _ in range(3):
+        predict_proba(X)
+    times = []
+    for _ in range(n_repeats):
+        start_time = time.perf_counter()
+        predict_proba(X)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return times
+
+def check_parity(expected: np.ndarray, actual: np.ndarray) -> Dict[str, float]:
+    """
+    Compare two probability matrices with the same class order.
+
+    Returns:
+        Dictionary with the largest difference and top-1/top-3 agreement
+    """
+    expected_top = np.argsort(-expected, axis=1, kind="stable")[:, :3]
+    actual_top = np.argsort(-actual, axis=1, kind="stable")[:, :3]
+    return {
+        "max_abs_diff": float(np.abs(actual - expected).max()),
+        "top1_agreement": float(np.mean(expected_top[:, 0] == actual_top[:, 0])),
+        "top3_agreement": float(np.mean((expected_top == actual_top).all(axis=1)))
+    }
+
+def benchmark_backend(model_type: str, n_samples: int, n_eval: int, batch_sizes: List[int], n_repeats: int, model_dir: str) -> Dict[str, Any]:
+    """
+    Train, export and compare one model backend.
+
+    Returns:
+        Dictionary with parity statistics and native/ONNX latencies
+    """
+    readings, labels = make_readings(n_samples + n_eval)
+    X = normalize_features(readings[config.REQUIRED_FEATURES])
+    X_train, y_train, X_eval = X.iloc[:n_samples], labels.iloc[:n_samples], X.iloc[n_samples:]
+
+    model = _create_and_train_model(model_type, get_default_model_params(model_type), X_train, y_train)
+    model_path = os.path.join(model_dir, f"{model_type}.joblib")
+    export = export_onnx(model, model_path, X_train.iloc[:200])
+    predictor = load_onnx_model(onnx_path_for(model_path))
+
+    if list(predictor.classes_) != [str(label) for label in model.classes_]:
+        raise ValueError(f"{model_type}: ONNX class order differs from the model")
+
+    result = {"onnx_bytes": export["onnx_bytes"]}
+    result.update(check_parity(model.predict_proba(X_eval), predictor.predict_proba(X_eval)))
+
+    # Single rows are passed as one-row DataFrames, like predict_crops does
+    single_row = X_eval.iloc[[0]]
+    for name, predict_proba in (("native", model.predict_proba), ("onnx", predictor.predict_proba)):
+        times = _latency(predict_proba, single_row, n_repeats)
+        result[f"{name}_single_p50_ms"] = float(np.percentile(times, 50))
+        result[f"{name}_single_p95_ms"] = float(np.percentile(times, 95))
+
+    result["batches"] = {}
+    for batch_size in batch_sizes:
+        batch = X_eval.iloc[np.arange(batch_size) % len(X_eval)]
+        batch_result = {}
+        for name, predict_proba in (("native", model.predict_proba), ("onnx", predictor.predict_proba)):
+            batch_ms = float(np.median(_latency(predict_proba, batch, 5)))
+            batch_result[f"{name}_per_row_us"] = batch_ms * 1000 / batch_size
+        result["batches"][batch_size] = batch_result
+
+    logger.info(
+        f"{model_type:<17} max|diff|={result['max_abs_diff']:.2e} top1={result['top1_agreement']:.4f} "
+        f"top3={result['top3_agreement']:.4f}  single p50 native={result['native_single_p50_ms']:.3f}ms "
+        f"onnx={result['onnx_single_p50_ms']:.3f}ms"
+    )
+    for batch_size, batch_result in result["batches"].items():
+        logger.info(
+            f"{'':<17} batch {batch_size:>6}: native={batch_result['native_per_row_us']:8.2f}us/row "
+            f"onnx={batch_result['onnx_per_row_us']:8.2f}us/row"
+        )
+    return result
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the ONNX backend benchmark."""
+    parser = argparse.ArgumentParser(description="Check parity and compare latency of the ONNX inference backend")
+    parser.add_argument("--model-types", type=str, nargs="+", default=config.MODEL_TYPES, choices=config.MODEL_TYPES, help="Model backends to export")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic readings to train each model on")
+    parser.add_argument("--n-eval", type=int, default=2000, help="Number of held-out readings for the parity check")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000], help="Batch sizes to time")
+    parser.add_argument("--repeats", type=int, default=200, help="Number of timed single-row calls")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Largest allowed probability difference")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logging.getLogger("utils").setLevel(logging.WARNING)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "tolerance": args.tolerance,
+        "results": {}
+    }
+    failed = []
+    with tempfile.TemporaryDirectory() as model_dir:
+        for model_type in args.model_types:
+            result = benchmark_backend(model_type, args.n_samples, args.n_eval, args.batch_sizes, args.repeats, model_dir)
+            report["results"][model_type] = result
+            if result["max_abs_diff"] > args.tolerance:
+                failed.append(model_type)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    if failed:
+        logger.error(f"ONNX probabilities differ by more than {args.tolerance} for: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Training and inference benchmarks for the crop recommendation pipeline.
+
+Every stage of the pipeline is timed against synthetic data from
+generate_synthetic_data at several dataset sizes:
+
+    preprocess     preprocess_soil_data
+    normalize      normalize_features
+    fit            model training for the selected backend
+    predict_proba  model.predict_proba
+    top_n          predict_crops (top-N ranking and reasoning)
+    comprehensive  generate_comprehensive_recommendation for every reading
+    comprehensive_batch
+                   generate_comprehensive_recommendations for all readings at once
+
+Timings are the median of --repeat runs. Peak memory is measured with
+tracemalloc in a separate pass so it does not distort the timings. Results
+are written as JSON and, when a baseline is given, compared stage by stage;
+the script exits with status 1 when any stage is slower than the baseline by
+more than --threshold.
+
+Usage:
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baselines/pipeline.json
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --output results.json
+    python benchmarks/bench_pipeline.py --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import generate_synthetic_data, preprocess_soil_data, normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params, predict_crops
+from utils.recommendation_utils import generate_comprehensive_recommendation, generate_comprehensive_recommendations
+from utils.logging_utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "pipeline.json")
+
+STAGES = ["preprocess", "normalize", "fit", "predict_proba", "top_n", "comprehensive", "comprehensive_batch"]
+
+# generate_synthetic_data uses short lowercase column names; the serving
+# pipeline expects the names from config.SOIL_FEATURES
+SYNTHETIC_COLUMN_MAPPING = {
+    "ph": "pH",
+    "n": "nitrogen",
+    "p": "phosphorus",
+    "k": "potassium",
+    "humidity": "moisture",
+    "temperature": "temperature",
+    "organic_matter": "organicMatter",
+    "conductivity": "conductivity",
+    "salinity": "salinity"
+}
+
+def make_readings(n_samples: int, random_state: int = 42):
+    """
+    Generate synthetic soil readings with the column names used for serving.
+
+    Args:
+        n_samples: Number of readings to generate
+        random_state: Random seed for reproducibility
+
+    Returns:
+        Tuple of (readings DataFrame, crop labels Series)
+    """
+    features, labels = generate_synthetic_data(n_samples=n_samples, random_state=random_state)
+    return features.rename(columns=SYNTHETIC_COLUMN_MAPPING), labels
+
+def _time_stage(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run a stage repeat times and return its timing statistics in seconds."""
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return {
+        "median_s": float(np.median(times)),
+        "min_s": float(np.min(times)),
+        "max_s": float(np.max(times))
+    }
+
+def _peak_memory(func: Callable[[], Any]) -> int:
+    """Run a stage once under tracemalloc and return its peak allocation in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return int(peak)
+
+def benchmark_size(n_samples: int, model_type: str, repeat: int, top_n: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmark every pipeline stage for one dataset size.
+
+    Args:
+        n_samples: Number of synthetic readings
+        model_type: Model backend to fit and predict with
+        repeat: Number of timed runs per stage
+        top_n: Number of crops ranked by predict_crops
+
+    Returns:
+        Dictionary mapping stage name to timing and memory statistics
+    """
+    readings, labels = make_readings(n_samples)
+    processed = preprocess_soil_data(readings)
+    features = processed[config.REQUIRED_FEATURES]
+    normalized = normalize_features(features)
+
+    params = get_default_model_params(model_type)
+    model = _create_and_train_model(model_type, params, normalized, labels)
+    top_crops = [recs[0]["crop"] for recs in predict_crops(model, normalized, top_n=1)]
+
+    def comprehensive():
+        for crop, (_, reading) in zip(top_crops, readings.iterrows()):
+            generate_comprehensive_recommendation(crop, reading)
+
+    stage_funcs = {
+        "preprocess": lambda: preprocess_soil_data(readings),
+        "normalize": lambda: normalize_features(features),
+        "fit": lambda: _create_and_train_model(model_type, params, normalized, labels),
+        "predict_proba": lambda: model.predict_proba(normalized),
+        "top_n": lambda: predict_crops(model, normalized, top_n=top_n),
+        "comprehensive": comprehensive,
+        "comprehensive_batch": lambda: generate_comprehensive_recommendations(top_crops, readings)
+    }
+
+    results = {}
+    for stage in STAGES:
+        stats = _time_stage(stage_funcs[stage], repeat)
+        stats["peak_memory_bytes"] = _peak_memory(stage_funcs[stage])
+        stats["per_row_us"] = stats["median_s"] * 1e6 / n_samples
+        results[stage] = stats
+        logger.info(
+            f"n={n_samples:>6} {stage:<14} median={stats['median_s'] * 1000:9.2f}ms "
+            f"({stats['per_row_us']:8.2f}us/row) peak={stats['peak_memory_bytes'] / 1024:9.1f}KiB"
+        )
+
+    return results
+
+def run_benchmarks(sizes: List[int], model_type: str, repeat: int) -> Dict[str, Any]:
+    """
+    Benchmark all stages for every dataset size.
+
+    Returns:
+        Benchmark report with environment information and per-size results
+    """
+    import sklearn
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "model_type": model_type,
+        "repeat": repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__
+        },
+        "results": {}
+    }
+    for n_samples in sizes:
+        report["results"][str(n_samples)] = benchmark_size(n_samples, model_type, repeat)
+    return report
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare a benchmark report against a stored baseline.
+
+    Args:
+        report: Current benchmark report
+        baseline: Baseline benchmark report
+        threshold: Allowed relative slowdown (0.25 = 25% slower)
+
+    Returns:
+        List of stages that regressed by more than the threshold
+    """
+    regressions = []
+    for size, stages in report["results"].items():
+        baseline_stages = baseline.get("results", {}).get(size)
+        if baseline_stages is None:
+            logger.warning(f"No baseline for size {size}, skipping comparison")
+            continue
+
+        for stage, stats in stages.items():
+            if stage not in baseline_stages:
+                logger.warning(f"No baseline for stage {stage} at size {size}, skipping comparison (run with --update-baseline)")
+                continue
+            baseline_s = baseline_stages[stage]["median_s"]
+            ratio = stats["median_s"] / baseline_s if baseline_s > 0 else 1.0
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "size": int(size),
+                    "stage": stage,
+                    "baseline_s": baseline_s,
+                    "current_s": stats["median_s"],
+                    "ratio": round(ratio, 3)
+                })
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the pipeline benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the crop recommendation pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Dataset sizes to benchmark")
+    parser.add_argument("--model-type", type=str, default="random_forest", choices=config.MODEL_TYPES, help="Model backend to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per stage")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown per stage before failing")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    # Per-call INFO logs from the pipeline would dominate the timings
+    for name in ("utils.data_utils", "utils.model_utils", "utils.recommendation_utils"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = run_benchmarks(args.sizes, args.model_type, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning(f"Baseline file not found: {args.baseline} (run with --update-baseline to create it)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("model_type") != args.model_type:
+        logger.warning(f"Baseline was recorded with {baseline.get('model_type')}, not {args.model_type}")
+
+    regressions = compare_to_baseline(report, baseline, args.threshold)
+    if regressions:
+        logger.error(f"{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            logger.error(
+                f"  n={regression['size']} {regression['stage']}: "
+                f"{regression['baseline_s'] * 1000:.2f}ms -> {regression['current_s'] * 1000:.2f}ms "
+                f"(x{regression['ratio']})"
+            )
+        return 1
+
+    logger.info(f"No stage regressed by more than {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
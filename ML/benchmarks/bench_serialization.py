@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark for the recommendation API apps.
+
+Realistic /recommend response bodies are generated with small models trained
+on synthetic data, then serialized in two ways:
+
+    validated  what FastAPI does for a returned dict: validate it against
+               the route's response_model (fastapi.routing.serialize_response)
+               and render it with JSONResponse
+    fast       build the slotted result objects from api/responses.py and
+               serialize them with api.responses.dumps (FastJSONResponse)
+
+For every body the two outputs are compared byte for byte, and the CPU time
+per response of each path is reported for:
+
+    recommendation_api  /recommend with the comprehensive recommendation
+    recommendation_api  /recommend without it
+    main                /recommend
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --model-types random_forest xgboost --responses 2000 --output serialization.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import preprocess_soil_data, normalize_features
+from utils.model_utils import predict_crops
+from utils.recommendation_utils import generate_comprehensive_recommendation
+from utils.logging_utils import setup_logging
+from api import recommendation_api
+from api import main as main_api
+from api.predict import generate_recommendation
+from api.responses import dumps, build_recommendation_result, build_crop_recommendation_result
+from benchmarks.bench_http import train_backend_models, make_payloads
+
+logger = logging.getLogger(__name__)
+
+def make_bodies(model_type: str, n_responses: int, n_samples: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generate /recommend response bodies as the handlers build them.
+
+    Returns:
+        Dictionary mapping scenario name to a list of response dictionaries
+    """
+    models = train_backend_models(model_type, n_samples)
+    payloads = make_payloads(n_responses)
+
+    soil_df = pd.DataFrame(payloads["recommendation_api"])
+    processed = preprocess_soil_data(soil_df)
+    crop_recommendations = predict_crops(
+        models["recommendation_api"], normalize_features(processed[config.REQUIRED_FEATURES]), top_n=3
+    )
+    comprehensive = []
+    without_comprehensive = []
+    for i, recommendations in enumerate(crop_recommendations):
+        comprehensive.append({
+            "recommendations": recommendations,
+            "comprehensive_recommendation": generate_comprehensive_recommendation(recommendations[0]["crop"], soil_df.iloc[i])
+        })
+        without_comprehensive.append({"recommendations": recommendations, "comprehensive_recommendation": None})
+
+    main_bodies = []
+    for payload in payloads["main"]:
+        features = pd.DataFrame({
+            "ph": [payload["ph"]],
+            "temperature": [payload["temperature"]],
+            "humidity": [payload["humidity"]],
+            "n": [payload["nitrogen"]],
+            "p": [payload["phosphorus"]],
+            "k": [payload["potassium"]],
+            "organic_matter": [payload["organic_matter"]],
+            "conductivity": [payload["conductivity"]],
+            "salinity": [payload["salinity"]]
+        })
+        main_bodies.append(generate_recommendation(models["main"], features))
+
+    return {
+        "recommendation_api comprehensive=on": comprehensive,
+        "recommendation_api comprehensive=off": without_comprehensive,
+        "main": main_bodies
+    }
+
+def _response_field(app: Any, path: str) -> Any:
+    """Response model field FastAPI validates a route's return value against."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "POST" in route.methods:
+            return route.response_field
+    raise ValueError(f"No POST route {path}")
+
+async def _validated_path(field: Any, bodies: List[Dict[str, Any]]) -> List[Any]:
+    """Serialize every body like FastAPI does for a returned dict, timing each one."""
+    outputs = []
+    for body in bodies:
+        start_time = time.process_time()
+        try:
+            content = await serialize_response(field=field, response_content=body)
+            rendered = JSONResponse(content).body
+        except Exception as e:
+            rendered = e
+        outputs.append((time.process_time() - start_time, rendered))
+    return outputs
+
+def _fast_path(build: Callable[[Dict[str, Any]], Any], bodies: List[Dict[str, Any]]) -> List[Any]:
+    """Serialize every body through the typed result objects, timing each one."""
+    outputs = []
+    for body in bodies:
+        start_time = time.process_time()
+        rendered = dumps(build(body))
+        outputs.append((time.process_time() - start_time, rendered))
+    return outputs
+
+def benchmark_serialization(model_type: str, n_responses: int, n_samples: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare the validated and fast serialization paths for one model backend.
+
+    Returns:
+        Dictionary mapping scenario to CPU time per response and output comparison
+    """
+    bodies = make_bodies(model_type, n_responses, n_samples)
+    recommendation_field = _response_field(recommendation_api.app, "/recommend")
+    main_field = _response_field(main_api.app, "/recommend")
+
+    scenarios = {
+        "recommendation_api comprehensive=on": (recommendation_field, lambda body: build_recommendation_result(body["recommendations"], body["comprehensive_recommendation"])),
+        "recommendation_api comprehensive=off": (recommendation_field, lambda body: build_recommendation_result(body["recommendations"], body["comprehensive_recommendation"])),
+        "main": (main_field, build_crop_recommendation_result)
+    }
+
+    results = {}
+    for name, (field, build) in scenarios.items():
+        validated_times = []
+        fast_times = []
+        for _ in range(repeat):
+            validated = asyncio.run(_validated_path(field, bodies[name]))
+            fast = _fast_path(build, bodies[name])
+            validated_times.append(np.median([elapsed for elapsed, _ in validated]))
+            fast_times.append(np.median([elapsed for elapsed, _ in fast]))
+
+        failed = sum(1 for _, rendered in validated if isinstance(rendered, Exception))
+        identical = sum(1 for (_, old), (_, new) in zip(validated, fast) if old == new)
+        validated_us = float(np.median(validated_times)) * 1e6
+        fast_us = float(np.median(fast_times)) * 1e6
+
+        results[name] = {
+            "responses": len(bodies[name]),
+            "validated_us": validated_us,
+            "fast_us": fast_us,
+            "speedup": validated_us / fast_us if fast_us > 0 else None,
+            "identical": identical,
+            "validated_failed": failed,
+            "mean_response_bytes": float(np.mean([len(rendered) for _, rendered in fast]))
+        }
+        logger.info(
+            f"{model_type:<17} {name:<38} validated={validated_us:8.1f}us fast={fast_us:8.1f}us "
+            f"(x{results[name]['speedup']:.1f})  identical={identical}/{len(bodies[name])}  validated_failed={failed}"
+        )
+        if identical + failed < len(bodies[name]):
+            logger.warning(f"{len(bodies[name]) - identical - failed} {name} responses differ between the two paths")
+
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the serialization benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark response serialization of the recommendation API apps")
+    parser.add_argument("--model-types", type=str, nargs="+", default=["random_forest", "lightgbm"], choices=config.MODEL_TYPES, help="Model backends to generate responses with")
+    parser.add_argument("--responses", type=int, default=1000, help="Number of response bodies per scenario")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic samples to train each model on")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes over the bodies")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    # Per-call INFO logs from the pipeline are not part of serialization
+    for name in ("utils", "api"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "responses": args.responses,
+        "results": {}
+    }
+    for model_type in args.model_types:
+        report["results"][model_type] = benchmark_serialization(model_type, args.responses, args.n_samples, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
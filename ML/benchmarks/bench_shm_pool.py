@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Shared-memory versus pickled IPC for inference worker processes.
+
+A model is trained on synthetic readings and served by two worker pools of
+the same size, whose workers each load the model once:
+
+    pickled   concurrent.futures.ProcessPoolExecutor; the feature matrix is
+              pickled to a worker and the probability matrix pickled back
+    shm       utils/shm_pool.SharedMemoryInferencePool; rows are copied into
+              and out of preallocated shared memory slots and only slot
+              indices are queued
+
+For every batch size the p50/p95 round-trip latency (including the worker's
+predict_proba) is reported, with the in-process predict_proba time for
+reference, so the IPC overhead of each pool is the difference. With
+--transport-only the workers serve a stub whose predict_proba returns
+preallocated probabilities, which isolates the cost of the handoff itself.
+Results can be written as JSON.
+
+Usage:
+    python benchmarks/bench_shm_pool.py
+    python benchmarks/bench_shm_pool.py --model-type random_forest --workers 2 --batch-sizes 1 100 10000 --output shm.json
+    python benchmarks/bench_shm_pool.py --transport-only
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import functools
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params, predict_proba_matrix
+from utils.shm_pool import SharedMemoryInferencePool
+from utils.logging_utils import setup_logging
+from benchmarks.bench_pipeline import make_readings
+
+logger = logging.getLogger(__name__)
+
+# Model of a pickled IPC worker process
+_worker_model = None
+
+class TransportStub:
+    """Stand-in model whose predict_proba costs next to nothing, for measuring IPC alone."""
+
+    def __init__(self, classes: np.ndarray, max_rows: int):
+        self.classes_ = classes
+        self._probabilities = np.full((max_rows, len(classes)), 1 / len(classes), dtype=np.float32)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self._probabilities[:len(X)]
+
+def _load_limited(model_path: str) -> Any:
+    """Load a model held to config.INFERENCE_THREADS, like load_model does."""
+    from utils.cpu_budget import limit_inference_threads
+    return limit_inference_threads(joblib.load(model_path))
+
+def _init_pickled_worker(model_path: str) -> None:
+    global _worker_model
+    _worker_model = _load_limited(model_path)
+
+def _pickled_predict(features: np.ndarray) -> np.ndarray:
+    return predict_proba_matrix(_worker_model, features).astype(np.float32)
+
+def _latency(call: Callable[[np.ndarray], Any], batch: np.ndarray, n_repeats: int) -> List[float]:
+    """Time repeated calls on the same batch, in milliseconds."""
+    for _ in range(3):
+        call(batch)
+    times = []
+    for _ in range(n_repeats):
+        start_time = time.perf_counter()
+        call(batch)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return times
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the shared-memory pool benchmark."""
+    parser = argparse.ArgumentParser(description="Compare shared-memory and pickled IPC for inference worker processes")
+    parser.add_argument("--model-type", type=str, default="lightgbm", choices=config.MODEL_TYPES, help="Model backend to serve")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic readings to train the model on")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes per pool")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000], help="Batch sizes to time")
+    parser.add_argument("--repeats", type=int, default=50, help="Number of timed calls per batch size")
+    parser.add_argument("--transport-only", action="store_true", help="Serve a stub model to measure the handoff cost alone")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logging.getLogger("utils").setLevel(logging.WARNING)
+
+    readings, labels = make_readings(args.n_samples)
+    X = normalize_features(readings[config.REQUIRED_FEATURES])
+    model = _create_and_train_model(args.model_type, get_default_model_params(args.model_type), X, labels)
+    if args.transport_only:
+        model = TransportStub(model.classes_, max(args.batch_sizes))
+    features = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "model_type": "transport_stub" if args.transport_only else args.model_type,
+        "workers": args.workers,
+        "results": {}
+    }
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_path = os.path.join(model_dir, "model.joblib")
+        joblib.dump(model, model_path)
+        _load_limited(model_path)
+
+        context = multiprocessing.get_context("spawn")
+        pickled_pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=_init_pickled_worker, initargs=(model_path,))
+        shm_pool = SharedMemoryInferencePool(
+            args.workers,
+            classes=model.classes_,
+            n_features=features.shape[1],
+            slot_rows=max(args.batch_sizes),
+            load=functools.partial(_load_limited, model_path)
+        )
+
+        try:
+            calls = {
+                "in_process": lambda batch: predict_proba_matrix(model, batch),
+                "pickled": lambda batch: pickled_pool.submit(_pickled_predict, batch).result(),
+                "shm": shm_pool.predict_proba
+            }
+            for batch_size in args.batch_sizes:
+                batch = features[np.arange(batch_size) % len(features)]
+                expected = calls["in_process"](batch)
+                result = {}
+                for name, call in calls.items():
+                    if name != "in_process" and np.abs(call(batch) - expected).max() > 1e-5:
+                        raise ValueError(f"{name} pool returned different probabilities")
+                    times = _latency(call, batch, args.repeats)
+                    result[f"{name}_p50_ms"] = float(np.percentile(times, 50))
+                    result[f"{name}_p95_ms"] = float(np.percentile(times, 95))
+                report["results"][batch_size] = result
+                logger.info(
+                    f"batch {batch_size:>6}: in-process={result['in_process_p50_ms']:8.3f}ms "
+                    f"pickled={result['pickled_p50_ms']:8.3f}ms shm={result['shm_p50_ms']:8.3f}ms (p50)"
+                )
+        finally:
+            pickled_pool.shutdown()
+            shm_pool.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
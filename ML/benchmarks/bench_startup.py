@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the CLI and the recommendation API.
+
+Cold starts are measured in fresh interpreter processes:
+
+    import         python -X importtime -c "import <module>" for run.py,
+                   api.recommendation_api and api.main, with the import time
+                   broken down by top-level package
+    cli_recommend  wall time of `python run.py recommend ...` until it exits
+    api_first_response
+                   time from launching uvicorn with api.recommendation_api
+                   until the first POST /recommend returns 200
+
+A small RandomForest is trained on synthetic data and saved under a
+temporary model version (served through the MODEL_VERSION environment
+variable) so the benchmark does not touch the real model. Timings are the
+median of --repeat runs and are compared against a stored baseline like
+bench_pipeline.py; the script exits with status 1 when a measurement exceeds
+its baseline by more than --threshold.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json
+    python benchmarks/bench_startup.py --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import httpx
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.logging_utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "startup.json")
+
+# Temporary model version used while benchmarking
+BENCH_MODEL_VERSION = "startup-bench"
+
+IMPORT_TARGETS = {
+    "run.py": "run",
+    "api.recommendation_api": "api.recommendation_api",
+    "api.main": "api.main"
+}
+
+RECOMMEND_ARGS = [
+    "--ph", "6.5", "--nitrogen", "60", "--phosphorus", "40", "--potassium", "80",
+    "--moisture", "55", "--temperature", "24"
+]
+
+API_PAYLOAD = {"pH": 6.5, "nitrogen": 60, "phosphorus": 40, "potassium": 80, "moisture": 55, "temperature": 24}
+
+def _bench_env() -> Dict[str, str]:
+    """Environment for benchmark subprocesses: the benchmark model, quiet logs, no MLflow."""
+    env = dict(os.environ)
+    env.update({
+        "MODEL_VERSION": BENCH_MODEL_VERSION,
+        "LOG_LEVEL": "WARNING",
+        "SKIP_MLFLOW": "true",
+        "PYTHONDONTWRITEBYTECODE": "1"
+    })
+    return env
+
+def train_bench_model(n_samples: int = 1000) -> str:
+    """
+    Train a small RandomForest on synthetic data and save it as the benchmark model version.
+
+    Returns:
+        Path to the saved model
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from utils.data_utils import normalize_features
+    from utils.model_utils import save_model
+    from benchmarks.bench_pipeline import make_readings
+
+    readings, labels = make_readings(n_samples)
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(normalize_features(readings[config.REQUIRED_FEATURES]), labels)
+    return save_model(model, version=BENCH_MODEL_VERSION)
+
+def parse_importtime(stderr: str) -> Dict[str, Any]:
+    """
+    Parse `python -X importtime` output.
+
+    Returns:
+        Total import time and self time per top-level package, in milliseconds
+    """
+    packages = defaultdict(float)
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] += int(self_us) / 1000
+        # Top-level imports are not indented
+        if not name.startswith("  ", 1):
+            total_us += int(cumulative_us)
+    return {"total_ms": total_us / 1000, "packages_ms": dict(packages)}
+
+def measure_imports(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter with -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ML_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+def measure_cli_recommend(env: Dict[str, str]) -> float:
+    """Wall time in seconds of a one-off `run.py recommend`."""
+    start_time = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "run.py", "recommend", *RECOMMEND_ARGS],
+        cwd=ML_DIR, env=env, capture_output=True, check=True
+    )
+    return time.perf_counter() - start_time
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_api_first_response(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """Seconds from launching the API server until the first successful POST /recommend."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/recommend"
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.recommendation_api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ML_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            while time.perf_counter() - start_time < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"API server exited with status {process.returncode}")
+                try:
+                    response = client.post(url, json=API_PAYLOAD)
+                    if response.status_code == 200:
+                        return time.perf_counter() - start_time
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise TimeoutError(f"API did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def run_benchmarks(repeat: int) -> Dict[str, Any]:
+    """
+    Measure every startup scenario repeat times.
+
+    Returns:
+        Benchmark report with median timings in milliseconds
+    """
+    env = _bench_env()
+    model_path = train_bench_model()
+    try:
+        report = {
+            "created_at": datetime.now().isoformat(),
+            "repeat": repeat,
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "results": {},
+            "import_breakdown": {}
+        }
+
+        for name, module in IMPORT_TARGETS.items():
+            runs = [measure_imports(module, env) for _ in range(repeat)]
+            report["results"][f"import {name}"] = float(np.median([run["total_ms"] for run in runs]))
+            packages = runs[-1]["packages_ms"]
+            report["import_breakdown"][name] = dict(sorted(packages.items(), key=lambda item: -item[1])[:15])
+
+        report["results"]["cli_recommend"] = float(np.median([measure_cli_recommend(env) for _ in range(repeat)])) * 1000
+        report["results"]["api_first_response"] = float(np.median([measure_api_first_response(env) for _ in range(repeat)])) * 1000
+    finally:
+        os.remove(model_path)
+
+    for name, value in report["results"].items():
+        logger.info(f"{name:<32} {value:9.1f}ms")
+    for name, packages in report["import_breakdown"].items():
+        logger.info(f"Slowest packages imported by {name}: " + ", ".join(f"{package} {ms:.0f}ms" for package, ms in list(packages.items())[:8]))
+
+    return report
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare startup timings against a stored baseline.
+
+    Args:
+        report: Current benchmark report
+        baseline: Baseline benchmark report
+        threshold: Allowed relative slowdown (0.25 = 25% slower)
+
+    Returns:
+        List of measurements that regressed by more than the threshold
+    """
+    regressions = []
+    for name, current_ms in report["results"].items():
+        baseline_ms = baseline.get("results", {}).get(name)
+        if baseline_ms is None:
+            logger.warning(f"No baseline for {name}, skipping comparison")
+            continue
+        ratio = current_ms / baseline_ms if baseline_ms > 0 else 1.0
+        if ratio > 1 + threshold:
+            regressions.append({
+                "name": name,
+                "baseline_ms": baseline_ms,
+                "current_ms": current_ms,
+                "ratio": round(ratio, 3)
+            })
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the startup benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark CLI and API startup time")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of cold starts per measurement")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown per measurement before failing")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = run_benchmarks(args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning(f"Baseline file not found: {args.baseline} (run with --update-baseline to create it)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(report, baseline, args.threshold)
+    if regressions:
+        logger.error(f"{len(regressions)} startup measurement(s) regressed by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            logger.error(
+                f"  {regression['name']}: {regression['baseline_ms']:.1f}ms -> {regression['current_ms']:.1f}ms "
+                f"(x{regression['ratio']})"
+            )
+        return 1
+
+    logger.info(f"No startup measurement regressed by more than {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tail latency of concurrent inference with and without the CPU thread budget.
+
+For every model backend a model is trained on synthetic readings and saved
+to a temporary file. Serving is then simulated by --workers worker processes
+(like several API workers on one host), each running --concurrency threads
+(like concurrent requests on AnyIO's worker threads) that call predict_proba
+on single readings back to back. Two configurations are compared:
+
+    default   the backends' own threading (XGBoost and LightGBM use every
+              core per call, OpenMP/BLAS pools are not limited)
+    budget    utils/cpu_budget.limit_inference_threads with
+              config.INFERENCE_THREADS threads per call
+
+Each configuration runs in fresh processes so their thread pools do not
+affect each other. p50/p95/p99 latency and throughput are reported per
+backend and configuration, and can be written as JSON. The effect grows with
+the number of cores: on a single-core host both configurations use one
+thread.
+
+Usage:
+    python benchmarks/bench_threads.py
+    python benchmarks/bench_threads.py --model-types xgboost lightgbm --workers 2 --concurrency 8 --output threads.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+# Add the parent directory to the path to import from the config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from utils.data_utils import normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params
+from utils.logging_utils import setup_logging
+from benchmarks.bench_pipeline import make_readings
+
+logger = logging.getLogger(__name__)
+
+CONFIGURATIONS = ["default", "budget"]
+
+def _run_worker(model_path: str, rows_path: str, configuration: str, concurrency: int, n_requests: int) -> Tuple[List[float], float]:
+    """
+    Serve n_requests single-row predictions from concurrency threads in this process.
+
+    Returns:
+        Tuple of (latency of every request in milliseconds, serving wall time in seconds)
+    """
+    from utils.cpu_budget import limit_inference_threads
+
+    model = joblib.load(model_path)
+    rows = joblib.load(rows_path)
+    if configuration == "budget":
+        limit_inference_threads(model)
+
+    # Warm up the thread pools before timing
+    for i in range(5):
+        model.predict_proba(rows[i])
+
+    def request(i: int) -> float:
+        start_time = time.perf_counter()
+        model.predict_proba(rows[i % len(rows)])
+        return (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(request, range(n_requests)))
+    return latencies, time.perf_counter() - start_time
+
+def benchmark_configuration(model_path: str, rows_path: str, configuration: str, workers: int, concurrency: int, n_requests: int) -> Dict[str, float]:
+    """
+    Run one configuration in fresh worker processes.
+
+    Returns:
+        Dictionary with throughput and latency percentiles
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(_run_worker, model_path, rows_path, configuration, concurrency, n_requests) for _ in range(workers)]
+        results = [future.result() for future in futures]
+    latencies = np.concatenate([worker_latencies for worker_latencies, _ in results])
+    wall_time = max(serve_seconds for _, serve_seconds in results)
+
+    return {
+        "requests": int(latencies.size),
+        "throughput_rps": float(latencies.size / wall_time),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the thread budget benchmark."""
+    parser = argparse.ArgumentParser(description="Compare tail latency of concurrent inference with and without the CPU thread budget")
+    parser.add_argument("--model-types", type=str, nargs="+", default=config.MODEL_TYPES, choices=config.MODEL_TYPES, help="Model backends to benchmark")
+    parser.add_argument("--n-samples", type=int, default=1500, help="Number of synthetic readings to train each model on")
+    parser.add_argument("--workers", type=int, default=config.SERVING_WORKERS, help="Worker processes serving concurrently")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests per worker")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per worker")
+    parser.add_argument("--output", type=str, help="File to write the benchmark results to (JSON format)")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+    logging.getLogger("utils").setLevel(logging.WARNING)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "cpu_cores": config.CPU_CORES,
+        "inference_threads": config.INFERENCE_THREADS,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "results": {}
+    }
+    logger.info(
+        f"{args.workers} worker(s) x {args.concurrency} concurrent request(s) on {config.CPU_CORES} core(s), "
+        f"budget of {config.INFERENCE_THREADS} thread(s) per call"
+    )
+
+    readings, labels = make_readings(args.n_samples + 200)
+    X = normalize_features(readings[config.REQUIRED_FEATURES])
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        rows_path = os.path.join(work_dir, "rows.joblib")
+        joblib.dump([X.iloc[[i]] for i in range(args.n_samples, len(X))], rows_path)
+
+        for model_type in args.model_types:
+            model = _create_and_train_model(model_type, get_default_model_params(model_type), X.iloc[:args.n_samples], labels.iloc[:args.n_samples])
+            model_path = os.path.join(work_dir, f"{model_type}.joblib")
+            joblib.dump(model, model_path)
+
+            results = {}
+            for configuration in CONFIGURATIONS:
+                results[configuration] = benchmark_configuration(model_path, rows_path, configuration, args.workers, args.concurrency, args.requests)
+                logger.info(
+                    f"{model_type:<17} {configuration:<8} p50={results[configuration]['p50_ms']:8.3f}ms "
+                    f"p95={results[configuration]['p95_ms']:8.3f}ms p99={results[configuration]['p99_ms']:8.3f}ms "
+                    f"throughput={results[configuration]['throughput_rps']:8.1f} req/s"
+                )
+            report["results"][model_type] = results
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
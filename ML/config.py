@@ -1,9 +1,5 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent
@@ -11,19 +7,85 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 MODELS_DIR = os.path.join(BASE_DIR, "models")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
 
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(MODELS_DIR, exist_ok=True)
-os.makedirs(LOGS_DIR, exist_ok=True)
+def _load_dotenv():
+    """
+    Load environment variables from the nearest .env file, if there is one.
+
+    Searches this directory and its parents like load_dotenv() does, but
+    only imports python-dotenv when a file is actually found.
+    """
+    for directory in (BASE_DIR, *BASE_DIR.parents):
+        env_file = directory / ".env"
+        if env_file.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(env_file)
+            return
+
+# Load environment variables
+_load_dotenv()
+
+def ensure_dir(path: str) -> str:
+    """
+    Create a directory if it does not exist yet.
+
+    Output directories are created by the code that writes to them rather
+    than when config is imported.
+
+    Args:
+        path: Directory path (e.g. MODELS_DIR)
+
+    Returns:
+        The same path
+    """
+    os.makedirs(path, exist_ok=True)
+    return path
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
 # Model parameters
-MODEL_VERSION = "1.0.0"
+MODEL_VERSION = os.getenv("MODEL_VERSION", "1.0.0")  # Version of the model that is served
 MODEL_FILENAME = f"crop_recommendation_model_v{MODEL_VERSION}.joblib"
 MODEL_PATH = os.path.join(MODELS_DIR, MODEL_FILENAME)
 
+# Model backends that can be trained
+MODEL_TYPES = ["xgboost", "lightgbm", "random_forest", "gradient_boosting"]
+
+# Latency ceiling (single-row predict_proba p50) for promoting a model when
+# several backends are trained and compared
+MAX_INFERENCE_LATENCY_MS = float(os.getenv("MAX_INFERENCE_LATENCY_MS", 50))
+
+# CPU budget shared by serving and training. CPU_CORES is the number of cores
+# this host gives us (all cores available to the process by default).
+# SERVING_WORKERS API worker processes share them, and each predict_proba call
+# uses INFERENCE_THREADS threads: concurrent requests already keep the cores
+# busy, so the default of one thread per call avoids the per-call OpenMP/BLAS
+# pools of several requests or workers competing for the same cores. Raise it
+# for few, large /score batches, keeping SERVING_WORKERS * INFERENCE_THREADS
+# within CPU_CORES. Training uses all CPU_CORES (split between parallel jobs).
+_available_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+CPU_CORES = int(os.getenv("CPU_CORES", _available_cores))
+SERVING_WORKERS = int(os.getenv("SERVING_WORKERS", 1))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", 1))
+
+# Inference backend used when serving: "native" loads the joblib estimator,
+# "onnx" loads the ONNX graph exported next to it (train with --export-onnx)
+# and "compact" the compacted forest saved next to it (train with --compact)
+INFERENCE_BACKENDS = ["native", "onnx", "compact"]
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "native")
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", 0))  # 0 uses INFERENCE_THREADS
+
+# Largest validation accuracy loss accepted when quantizing the leaves of a compacted forest
+COMPACT_MAX_ACCURACY_DROP = float(os.getenv("COMPACT_MAX_ACCURACY_DROP", 0.0))
+
+# Early-exit inference for random forests on /recommend: trees are evaluated
+# EARLY_EXIT_CHUNK_TREES at a time and evaluation stops once the top-N ranking
+# cannot change. With EARLY_EXIT_DELTA > 0 it also stops once the ranking holds
+# with probability 1 - EARLY_EXIT_DELTA (reported as approximate)
+INFERENCE_EARLY_EXIT = os.getenv("INFERENCE_EARLY_EXIT", "false").lower() == "true"
+EARLY_EXIT_CHUNK_TREES = int(os.getenv("EARLY_EXIT_CHUNK_TREES", 10))
+EARLY_EXIT_DELTA = float(os.getenv("EARLY_EXIT_DELTA", 0.0))
+
 # Feature definitions
 SOIL_FEATURES = [
     "pH", 
@@ -70,10 +132,46 @@ CROP_OPTIMAL_CONDITIONS = {
 # API settings
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", 8000))
+SCORE_MAX_ROWS = int(os.getenv("SCORE_MAX_ROWS", 1_000_000))  # Readings accepted by one POST /score
+SCORE_MAX_BYTES_PER_ROW = int(os.getenv("SCORE_MAX_BYTES_PER_ROW", 256))  # Body size allowed per reading in JSON, MessagePack and Arrow
+SCORE_STREAM_WINDOW = int(os.getenv("SCORE_STREAM_WINDOW", 1000))  # Readings scored together by POST /score/stream
+
+# Inference worker processes for /score and /score/stream (0 scores in the API
+# process). Batches reach them through shared memory slots (utils/shm_pool.py)
+INFERENCE_PROCESSES = int(os.getenv("INFERENCE_PROCESSES", 0))
+SHM_POOL_SLOTS_PER_WORKER = int(os.getenv("SHM_POOL_SLOTS_PER_WORKER", 4))
+SHM_POOL_SLOT_ROWS = int(os.getenv("SHM_POOL_SLOT_ROWS", 10000))  # Larger batches are split over several slots
+SHM_POOL_START_TIMEOUT = float(os.getenv("SHM_POOL_START_TIMEOUT", 120))  # Seconds allowed for workers to load the model
+SHM_POOL_TIMEOUT = float(os.getenv("SHM_POOL_TIMEOUT", 60))  # Seconds a /score call waits for the workers before answering 503
 
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() == "true"  # Write structured JSON log lines
+# Per-logger fraction of DEBUG/INFO records kept, e.g. "utils.data_utils=0.01,api=0.1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Warm recommendation daemon used by `run.py recommend` (Unix domain socket)
+# (kept short: socket paths are limited to about 100 characters)
+DAEMON_SOCKET = os.getenv("DAEMON_SOCKET", "/tmp/soilguardian_recommend.sock")
+DAEMON_TIMEOUT = float(os.getenv("DAEMON_TIMEOUT", 30))  # Seconds to wait for a daemon response
+
+# Token required in the X-Admin-Token header by the /admin endpoints
+# (admin endpoints are disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Request profiling (sampled statistical profiler for /recommend)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01))  # Fraction of requests profiled
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))  # Also keep profiles of requests slower than this (0 = off)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))  # Stack sampling interval
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))  # Profiles kept in LOGS_DIR/profiles
+
+# Request tracing (spans for each /recommend stage; requests whose traceparent
+# header has the sampled flag set are always traced)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))  # Fraction of other requests traced
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 200))  # Recent traces kept for /admin/traces
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")  # Also append traces to this JSONL file
 
 # MLflow settings
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
@@ -84,5 +182,14 @@ HIGH_CONFIDENCE = 80  # 80% and above
 MEDIUM_CONFIDENCE = 60  # 60-79%
 # Below 60% is considered low confidence
 
+# Cascade serving: a shallow student distilled from the served model (train
+# with --student) answers first, and readings where its confidence is below
+# CASCADE_CONFIDENCE_THRESHOLD percent go to the full model. A fraction
+# CASCADE_SHADOW_RATE of the student's answers are checked against the full model
+INFERENCE_CASCADE = os.getenv("INFERENCE_CASCADE", "false").lower() == "true"
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", HIGH_CONFIDENCE))
+CASCADE_STUDENT_MAX_DEPTH = int(os.getenv("CASCADE_STUDENT_MAX_DEPTH", 8))
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", 0.01))
+
 # Recommendation settings
 MAX_RECOMMENDATIONS = 5  # Maximum number of crops to recommend 
\ No newline at end of file
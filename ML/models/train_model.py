@@ -6,7 +6,7 @@ import logging
 import argparse
 import json
 from datetime import datetime
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 import joblib
 
 # Add the parent directory to the path to import from the config
@@ -20,21 +20,21 @@ from utils.data_utils import (
     save_to_csv,
     load_data,
     preprocess_data,
-    generate_synthetic_data
+    generate_synthetic_data,
+    compute_imputation_defaults
 )
 from utils.model_utils import (
     train_model, 
     evaluate_model, 
     save_model,
+    search_model_params,
+    train_all_models,
+    write_model_manifest,
     initialize_mlflow
 )
+from utils.logging_utils import setup_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
 logger = logging.getLogger(__name__)
 
 def create_synthetic_dataset(n_samples=1000, random_state=42):
@@ -123,6 +123,216 @@ def create_synthetic_dataset(n_samples=1000, random_state=42):
     
     return df
 
+def save_trained_model(args, model, model_type, features, metrics, extra=None, labels=None, random_state=42, imputation_defaults=None):
+    """
+    Save a trained model as a bundle with its manifest to the models directory.
+    
+    The model is written to models/<model_type>_<timestamp>.bundle with the
+    same header as the promoted serving model (see save_model), so its
+    metadata and imputation defaults can be read without unpickling it.
+    
+    Args:
+        args: Parsed command-line arguments
+        model: Trained model object
+        model_type: Type of the trained model
+        features: Feature DataFrame the model was trained on
+        metrics: Validation metrics for the model
+        extra: Additional manifest sections (search results, comparison, ...)
+        labels: Target Series the model was trained on (needed for --compact and --student)
+        random_state: Seed of the 80/20 training split (train_model uses 42)
+        imputation_defaults: Raw means of the optional readings (see compute_imputation_defaults)
+    
+    Returns:
+        Path to the saved model
+    """
+    from utils.model_bundle import BUNDLE_EXTENSION, build_bundle_header, write_bundle
+    
+    output_path = os.path.join(config.ensure_dir(config.MODELS_DIR), f"{model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{BUNDLE_EXTENSION}")
+    write_bundle(output_path, model, build_bundle_header(model, args.model_version, {
+        "model_type": model_type,
+        "metrics": metrics,
+        "imputation_defaults": imputation_defaults or {},
+        "n_samples": len(features),
+        "params": model.get_params()
+    }))
+    logger.info(f"Model saved to {output_path}")
+    
+    # Record how the model was produced next to the artifact
+    manifest = {
+        "model_type": model_type,
+        "model_path": output_path,
+        "model_version": args.model_version,
+        "created_at": datetime.now().isoformat(),
+        "n_samples": len(features),
+        "features": list(features.columns),
+        "params": model.get_params(),
+        "metrics": metrics
+    }
+    manifest.update(extra or {})
+    if args.export_onnx:
+        manifest["onnx"] = export_onnx_artifact(model, output_path, features)
+    if args.compact:
+        manifest["compact"] = compact_artifact(model, output_path, features, labels, random_state)
+    if args.student:
+        manifest["student"] = student_artifact(model, output_path, features, labels, random_state)
+    write_model_manifest(output_path, manifest)
+    
+    return output_path
+
+def export_onnx_artifact(model, model_path, features):
+    """
+    Export a trained model as ONNX next to its model artifact.
+    
+    A failed export is logged and recorded but does not fail training.
+    
+    Args:
+        model: Trained model object
+        model_path: Path of the model artifact
+        features: Feature DataFrame the model was trained on (a sample is used for the parity check)
+    
+    Returns:
+        Export summary for the manifest
+    """
+    from utils.onnx_backend import export_onnx
+    
+    try:
+        return export_onnx(model, model_path, features.iloc[:500])
+    except Exception as e:
+        logger.warning(f"ONNX export failed (the model is unaffected): {e}")
+        return {"error": str(e)}
+
+def compact_artifact(model, model_path, features, labels, random_state=42):
+    """
+    Save a compacted copy of a random forest next to its model artifact.
+    
+    Accuracy before and after is measured on the 80/20 holdout split used
+    for training (with --cv-folds the model has also seen those rows). Other
+    model types are skipped, and a failed compaction does not fail training.
+    
+    Args:
+        model: Trained model object
+        model_path: Path of the model artifact
+        features: Feature DataFrame the model was trained on
+        labels: Target Series the model was trained on
+        random_state: Seed of the training split, so the holdout rows match it
+    
+    Returns:
+        Compaction report for the manifest
+    """
+    from utils.compact_forest import SUPPORTED_MODELS, compact_model, compact_path_for
+    
+    if type(model).__name__ not in SUPPORTED_MODELS:
+        logger.info(f"Skipping compaction: {type(model).__name__} is not supported")
+        return {"skipped": f"{type(model).__name__} is not supported"}
+    
+    try:
+        _, X_val, _, y_val = train_test_split(features, labels, test_size=0.2, random_state=random_state)
+        compact, report = compact_model(model, X_val, y_val)
+        report["compact_path"] = compact_path_for(model_path)
+        joblib.dump(compact, report["compact_path"])
+        logger.info(f"Compact model saved to {report['compact_path']}")
+        return report
+    except Exception as e:
+        logger.warning(f"Compaction failed (the model is unaffected): {e}")
+        return {"error": str(e)}
+
+def student_artifact(model, model_path, features, labels, random_state=42):
+    """
+    Distill a shallow student from a trained model and save it next to its artifact.
+    
+    The student is fitted on the model's probabilities for the 80/20 training
+    split of train_model and evaluated on the holdout rows, alone and as the
+    first stage of a cascade. A failed distillation does not fail training.
+    
+    Args:
+        model: Trained model object
+        model_path: Path of the model artifact
+        features: Feature DataFrame the model was trained on
+        labels: Target Series the model was trained on
+        random_state: Seed of the training split, so the holdout rows match it
+    
+    Returns:
+        Distillation report for the manifest
+    """
+    from utils.cascade import distill_student, student_path_for
+    
+    try:
+        X_train, X_val, _, y_val = train_test_split(features, labels, test_size=0.2, random_state=random_state)
+        student, report = distill_student(model, X_train, X_val, y_val)
+        report["student_path"] = student_path_for(model_path)
+        joblib.dump({"student": student, "report": report}, report["student_path"])
+        logger.info(f"Student model saved to {report['student_path']}")
+        return report
+    except Exception as e:
+        logger.warning(f"Student distillation failed (the model is unaffected): {e}")
+        return {"error": str(e)}
+
+def train_all(args, features, labels, imputation_defaults=None):
+    """
+    Train every model type concurrently and promote the best one.
+    
+    The comparison table is kept as models/model_comparison_<timestamp>.json.
+    The selected model is saved like a single-type run and also promoted to
+    the versioned serving model loaded by the recommendation API, with
+    imputation_defaults (see compute_imputation_defaults) in its bundle header.
+    """
+    best_model_type, models, comparison = train_all_models(
+        X=features,
+        y=labels,
+        n_workers=args.jobs,
+        threads_per_job=args.threads_per_job,
+        max_latency_ms=args.max_latency_ms,
+        search=args.search,
+        random_state=args.random_seed
+    )
+    
+    comparison_path = os.path.join(config.ensure_dir(config.MODELS_DIR), f"model_comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(comparison_path, "w") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "max_latency_ms": args.max_latency_ms or config.MAX_INFERENCE_LATENCY_MS,
+            "selected": best_model_type,
+            "results": comparison
+        }, f, indent=2, default=str)
+    logger.info(f"Model comparison saved to {comparison_path}")
+    
+    logger.info("Model Comparison:")
+    for row in comparison:
+        if "error" in row:
+            logger.info(f"  {row['model_type']}: failed ({row['error']})")
+        else:
+            logger.info(
+                f"  {row['model_type']}: accuracy={row['accuracy']:.4f} "
+                f"single-row p50={row['single_row_p50_ms']:.2f}ms "
+                f"batch={row['batch_per_row_us']:.1f}us/row"
+                f"{' (selected)' if row['selected'] else ''}"
+            )
+    
+    if best_model_type is None:
+        raise RuntimeError("No model type met the latency ceiling; nothing was promoted")
+    
+    best_row = next(row for row in comparison if row["selected"])
+    metrics = {name: best_row[name] for name in ("accuracy", "precision", "recall", "f1")}
+    model = models[best_model_type]
+    save_trained_model(
+        args, model, best_model_type, features, metrics, {"comparison": comparison_path},
+        labels=labels, random_state=args.random_seed, imputation_defaults=imputation_defaults
+    )
+    model_path = save_model(model, version=args.model_version, metadata={
+        "model_type": best_model_type,
+        "metrics": metrics,
+        "timings": {name: best_row[name] for name in ("fit_seconds", "single_row_p50_ms", "single_row_p95_ms", "batch_per_row_us") if name in best_row},
+        "imputation_defaults": imputation_defaults or {},
+        "n_samples": len(features),
+        "params": model.get_params()
+    })
+    if args.export_onnx:
+        export_onnx_artifact(model, model_path, features)
+    if args.compact:
+        compact_artifact(model, model_path, features, labels, args.random_seed)
+    if args.student:
+        student_artifact(model, model_path, features, labels, args.random_seed)
+
 def main(args):
     """Main function for model training."""
     # Set environment variable to skip MLflow for local testing
@@ -140,37 +350,64 @@ def main(args):
             # Generate synthetic data for testing
             logger.info(f"Generating synthetic data with {args.n_samples} samples")
             features, labels = generate_synthetic_data(n_samples=args.n_samples)
+            raw_data = features
         else:
             # Load real data from configured path
             data_path = os.path.join(config.DATA_DIR, args.data_file if args.data_file else "soil_data.csv")
             logger.info(f"Loading data from {data_path}")
             data = load_data(data_path)
             features, labels = preprocess_data(data)
+            raw_data = data
+        
+        # Serving fills missing optional readings before normalizing, so
+        # the defaults are raw means keyed by the serving feature names
+        imputation_defaults = compute_imputation_defaults(raw_data)
+        
+        if args.model_type == "all":
+            train_all(args, features, labels, imputation_defaults)
+            return
+        
+        # Optionally tune hyperparameters before the final fit
+        params = None
+        search_summary = None
+        if args.search:
+            logger.info(f"Running hyperparameter search for {args.model_type}")
+            params, search_summary = search_model_params(
+                X=features,
+                y=labels,
+                model_type=args.model_type,
+                n_jobs=args.search_jobs,
+                random_state=args.random_seed
+            )
         
         # Train the model
         logger.info(f"Training model with algorithm: {args.model_type}")
         model, metrics = train_model(
             X=features,
             y=labels,
-            model_type=args.model_type
+            model_type=args.model_type,
+            params=params,
+            cv_folds=args.cv_folds,
+            n_jobs=args.cv_jobs
         )
         
         # Save the model
-        os.makedirs(config.MODELS_DIR, exist_ok=True)
-        output_path = os.path.join(config.MODELS_DIR, f"{args.model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib")
-        joblib.dump(model, output_path)
-        logger.info(f"Model saved to {output_path}")
+        extra = {"search": search_summary} if search_summary is not None else {}
+        save_trained_model(args, model, args.model_type, features, metrics, extra, labels=labels, imputation_defaults=imputation_defaults)
         
         # Print metrics
         logger.info("Model Performance Metrics:")
         for metric_name, metric_value in metrics.items():
-            logger.info(f"  {metric_name}: {metric_value:.4f}")
+            if isinstance(metric_value, (int, float)):
+                logger.info(f"  {metric_name}: {metric_value:.4f}")
             
     except Exception as e:
         logger.error(f"Error in model training: {str(e)}")
         raise
 
 if __name__ == "__main__":
+    setup_logging()
+    
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Train a crop recommendation model")
     
@@ -182,10 +419,20 @@ if __name__ == "__main__":
     # Other arguments
     parser.add_argument("--days", type=int, default=365, help="Number of days to look back for data when fetching from database")
     parser.add_argument("--n-samples", type=int, default=1500, help="Number of samples to generate for synthetic data")
-    parser.add_argument("--model-type", type=str, default="xgboost", choices=["xgboost", "lightgbm", "random_forest", "gradient_boosting"], help="Type of model to train")
+    parser.add_argument("--model-type", type=str, default="xgboost", choices=config.MODEL_TYPES + ["all"], help="Type of model to train ('all' trains every type and promotes the best)")
     parser.add_argument("--model-version", type=str, default=config.MODEL_VERSION, help="Version for the saved model")
     parser.add_argument("--random-seed", type=int, default=42, help="Random seed for reproducibility")
     parser.add_argument("--skip-mlflow", action="store_true", help="Skip MLflow for local testing")
+    parser.add_argument("--search", action="store_true", help="Tune hyperparameters with a parallel successive-halving search before training")
+    parser.add_argument("--search-jobs", type=int, default=-1, help="Number of parallel jobs for the hyperparameter search (-1 uses all cores)")
+    parser.add_argument("--cv-folds", type=int, help="Evaluate with stratified k-fold cross-validation instead of a single 80/20 split")
+    parser.add_argument("--cv-jobs", type=int, help="Number of worker processes for cross-validation folds")
+    parser.add_argument("--jobs", type=int, help="Number of model types trained concurrently with --model-type all")
+    parser.add_argument("--threads-per-job", type=int, help="CPU threads per training job with --model-type all")
+    parser.add_argument("--max-latency-ms", type=float, help="Single-row latency ceiling for promoting a model with --model-type all")
+    parser.add_argument("--export-onnx", action="store_true", help="Also export the trained model as an ONNX graph next to the model artifact")
+    parser.add_argument("--compact", action="store_true", help="Also save a compacted copy of a random forest (float32 thresholds, narrow indices, quantized leaves) next to the model artifact")
+    parser.add_argument("--student", action="store_true", help="Also distill a shallow student model for cascade serving and save it next to the model")
     
     args = parser.parse_args()
     
@@ -13,23 +13,22 @@ import argparse
 import logging
 import importlib.util
 import subprocess
+import json
 from typing import List, Optional, Dict, Any
 
 # Add the current directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import config
+from utils.logging_utils import setup_logging
+from utils.cpu_budget import thread_env
 
 # Set up logging
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format=config.LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(config.LOGS_DIR, "run.log"))
-    ]
-)
+setup_logging("run.log")
 logger = logging.getLogger(__name__)
 
+# Readings `run.py recommend` needs unless it reads them from --input
+REQUIRED_READING_ARGS = ["ph", "nitrogen", "phosphorus", "potassium", "moisture", "temperature"]
+
 def run_train(args: List[str]) -> int:
     """
     Run the model training script with the given arguments.
@@ -60,9 +59,20 @@ def run_train(args: List[str]) -> int:
         # Other arguments
         parser.add_argument("--days", type=int, default=365, help="Number of days to look back for data when fetching from database")
         parser.add_argument("--n-samples", type=int, default=1500, help="Number of samples to generate for synthetic data")
-        parser.add_argument("--model-type", type=str, default="xgboost", choices=["xgboost", "lightgbm", "random_forest", "gradient_boosting"], help="Type of model to train")
+        parser.add_argument("--model-type", type=str, default="xgboost", choices=config.MODEL_TYPES + ["all"], help="Type of model to train ('all' trains every type and promotes the best)")
         parser.add_argument("--model-version", type=str, default=config.MODEL_VERSION, help="Version for the saved model")
         parser.add_argument("--random-seed", type=int, default=42, help="Random seed for reproducibility")
+        parser.add_argument("--skip-mlflow", action="store_true", help="Skip MLflow for local testing")
+        parser.add_argument("--search", action="store_true", help="Tune hyperparameters with a parallel successive-halving search before training")
+        parser.add_argument("--search-jobs", type=int, default=-1, help="Number of parallel jobs for the hyperparameter search (-1 uses all cores)")
+        parser.add_argument("--cv-folds", type=int, help="Evaluate with stratified k-fold cross-validation instead of a single 80/20 split")
+        parser.add_argument("--cv-jobs", type=int, help="Number of worker processes for cross-validation folds")
+        parser.add_argument("--jobs", type=int, help="Number of model types trained concurrently with --model-type all")
+        parser.add_argument("--threads-per-job", type=int, help="CPU threads per training job with --model-type all")
+        parser.add_argument("--max-latency-ms", type=float, help="Single-row latency ceiling for promoting a model with --model-type all")
+        parser.add_argument("--export-onnx", action="store_true", help="Also export the trained model as an ONNX graph next to the model artifact")
+        parser.add_argument("--compact", action="store_true", help="Also save a compacted copy of a random forest (float32 thresholds, narrow indices, quantized leaves) next to the model artifact")
+        parser.add_argument("--student", action="store_true", help="Also distill a shallow student model for cascade serving and save it next to the model")
         
         train_args = parser.parse_args(args)
         
@@ -94,6 +104,8 @@ def run_api(args: List[str]) -> int:
         parser.add_argument("--host", type=str, default=config.API_HOST, help="Host to bind the server to")
         parser.add_argument("--port", type=int, default=config.API_PORT, help="Port to bind the server to")
         parser.add_argument("--reload", action="store_true", help="Enable auto-reload for development")
+        parser.add_argument("--inference-backend", type=str, default=config.INFERENCE_BACKEND, choices=config.INFERENCE_BACKENDS, help="Serve the joblib model or its exported ONNX graph")
+        parser.add_argument("--cascade", action="store_true", default=config.INFERENCE_CASCADE, help="Answer from the distilled student model first and use the full model only for low-confidence readings")
         
         api_args = parser.parse_args(args)
         
@@ -108,6 +120,9 @@ def run_api(args: List[str]) -> int:
         env = os.environ.copy()
         env["HOST"] = api_args.host
         env["PORT"] = str(api_args.port)
+        env["INFERENCE_BACKEND"] = api_args.inference_backend
+        env["INFERENCE_CASCADE"] = "true" if api_args.cascade else "false"
+        env.update(thread_env())
         
         # Run the API server as a subprocess
         logger.info(f"Running command: {' '.join(command)}")
@@ -138,28 +153,45 @@ def run_recommend(args: List[str]) -> int:
     try:
         # Parse the arguments for the recommendation
         parser = argparse.ArgumentParser(description="Generate a crop recommendation")
-        parser.add_argument("--ph", type=float, required=True, help="Soil pH level (0-14)")
-        parser.add_argument("--nitrogen", type=float, required=True, help="Nitrogen content in ppm")
-        parser.add_argument("--phosphorus", type=float, required=True, help="Phosphorus content in ppm")
-        parser.add_argument("--potassium", type=float, required=True, help="Potassium content in ppm")
-        parser.add_argument("--moisture", type=float, required=True, help="Soil moisture percentage")
-        parser.add_argument("--temperature", type=float, required=True, help="Soil temperature in Celsius")
+        parser.add_argument("--ph", type=float, help="Soil pH level (0-14)")
+        parser.add_argument("--nitrogen", type=float, help="Nitrogen content in ppm")
+        parser.add_argument("--phosphorus", type=float, help="Phosphorus content in ppm")
+        parser.add_argument("--potassium", type=float, help="Potassium content in ppm")
+        parser.add_argument("--moisture", type=float, help="Soil moisture percentage")
+        parser.add_argument("--temperature", type=float, help="Soil temperature in Celsius")
         parser.add_argument("--organic-matter", type=float, help="Organic matter percentage")
         parser.add_argument("--conductivity", type=float, help="Electrical conductivity in dS/m")
         parser.add_argument("--salinity", type=float, help="Salinity in ppt")
         parser.add_argument("--top-n", type=int, default=3, help="Number of top recommendations to return")
-        parser.add_argument("--output", type=str, help="File to save the recommendation to (JSON format)")
+        parser.add_argument("--output", type=str, help="File to save the recommendation to (JSON format, NDJSON with --input)")
+        parser.add_argument("--input", type=str, help="CSV or NDJSON file of soil readings to recommend for in batch")
+        parser.add_argument("--input-format", type=str, choices=["csv", "ndjson"], help="Format of --input (detected from the extension by default)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Readings per vectorized inference with --input")
+        parser.add_argument("--jobs", type=int, default=1, help="Worker processes for chunks with --input")
+        parser.add_argument("--no-daemon", action="store_true", help="Always run in-process, even if the recommendation daemon is running")
+        parser.add_argument("--socket", type=str, default=config.DAEMON_SOCKET, help="Socket of the recommendation daemon")
         
         rec_args = parser.parse_args(args)
         
-        # Import necessary modules
-        import pandas as pd
-        from utils.data_utils import preprocess_soil_data, normalize_features
-        from utils.model_utils import load_model, predict_crops
-        from utils.recommendation_utils import generate_comprehensive_recommendation
-        import json
+        # Batch mode: stream a whole file of readings
+        if rec_args.input:
+            from utils.batch import run_batch
+            
+            if rec_args.output:
+                with open(rec_args.output, "w") as f:
+                    run_batch(rec_args.input, f, rec_args.input_format, rec_args.chunk_size, rec_args.jobs, rec_args.top_n)
+                logger.info(f"Recommendations saved to {rec_args.output}")
+            else:
+                run_batch(rec_args.input, sys.stdout, rec_args.input_format, rec_args.chunk_size, rec_args.jobs, rec_args.top_n)
+            return 0
+        
+        missing = [name for name in REQUIRED_READING_ARGS if getattr(rec_args, name) is None]
+        if missing:
+            parser.error("the following arguments are required without --input: " + ", ".join(f"--{name}" for name in missing))
         
-        # Create a DataFrame from the arguments
+        from api.daemon import request_daemon
+        
+        # Collect the soil readings from the arguments
         soil_data = {
             "pH": rec_args.ph,
             "nitrogen": rec_args.nitrogen,
@@ -175,43 +207,29 @@ def run_recommend(args: List[str]) -> int:
         # Remove None values
         soil_data = {k: v for k, v in soil_data.items() if v is not None}
         
-        # Convert to DataFrame
-        soil_df = pd.DataFrame([soil_data])
-        
-        # Preprocess the data
-        processed_df = preprocess_soil_data(soil_df)
-        
-        # Extract features for the model
-        feature_df = processed_df[config.REQUIRED_FEATURES]
-        
-        # Normalize features
-        normalized_df = normalize_features(feature_df)
-        
-        # Load the model
-        model = load_model()
-        
-        # Get crop recommendations
-        crop_recommendations = predict_crops(model, normalized_df, top_n=rec_args.top_n)
+        # Use the warm daemon when it is running
+        response = None
+        if not rec_args.no_daemon:
+            response = request_daemon({"command": "recommend", "soil_data": soil_data, "top_n": rec_args.top_n}, rec_args.socket)
         
-        # If no recommendations, return error
-        if not crop_recommendations or len(crop_recommendations) == 0 or len(crop_recommendations[0]) == 0:
-            logger.error("No crop recommendations found for the given soil data")
-            return 1
-        
-        # Prepare response
-        recommendations = crop_recommendations[0]  # Just the first sample's recommendations
-        
-        # Generate comprehensive recommendation for top crop
-        comprehensive_rec = None
-        if len(recommendations) > 0:
-            top_crop = recommendations[0]["crop"]
-            comprehensive_rec = generate_comprehensive_recommendation(top_crop, soil_df.iloc[0])
-        
-        # Create the final recommendation
-        final_recommendation = {
-            "recommendations": recommendations,
-            "comprehensive_recommendation": comprehensive_rec
-        }
+        if response is not None:
+            if not response.get("ok"):
+                logger.error(f"Recommendation daemon error: {response.get('error')}")
+                return 1
+            final_recommendation = response["result"]
+        else:
+            # No daemon: load the pipeline and the model in this process
+            import pandas as pd
+            from utils.model_utils import load_model
+            from utils.pipeline import recommend_readings
+            
+            model = load_model()
+            final_recommendation = recommend_readings(model, pd.DataFrame([soil_data]), top_n=rec_args.top_n)[0]
+            
+            # If no recommendations, return error
+            if not final_recommendation["recommendations"]:
+                logger.error("No crop recommendations found for the given soil data")
+                return 1
         
         # Output the recommendation
         if rec_args.output:
@@ -227,6 +245,44 @@ def run_recommend(args: List[str]) -> int:
         logger.error(f"Error generating recommendation: {e}")
         return 1
 
+def run_daemon(args: List[str]) -> int:
+    """
+    Run, query or stop the warm recommendation daemon.
+    
+    Args:
+        args: List of command-line arguments for the daemon
+    
+    Returns:
+        Exit code
+    """
+    try:
+        parser = argparse.ArgumentParser(description="Keep the model loaded and serve `run.py recommend` over a Unix socket")
+        parser.add_argument("--socket", type=str, default=config.DAEMON_SOCKET, help="Socket path to listen on")
+        action_group = parser.add_mutually_exclusive_group()
+        action_group.add_argument("--status", action="store_true", help="Show whether a daemon is running")
+        action_group.add_argument("--stop", action="store_true", help="Stop the running daemon")
+        action_group.add_argument("--reload", action="store_true", help="Make the running daemon reload the model")
+        
+        daemon_args = parser.parse_args(args)
+        
+        from api.daemon import RecommendationDaemon, request_daemon
+        
+        if daemon_args.status or daemon_args.stop or daemon_args.reload:
+            command = "ping" if daemon_args.status else "shutdown" if daemon_args.stop else "reload"
+            response = request_daemon({"command": command}, daemon_args.socket)
+            if response is None:
+                logger.info(f"No recommendation daemon is running on {daemon_args.socket}")
+                return 1
+            print(json.dumps(response, indent=2))
+            return 0 if response.get("ok") else 1
+        
+        RecommendationDaemon(daemon_args.socket).serve_forever()
+        return 0
+    
+    except Exception as e:
+        logger.error(f"Error running recommendation daemon: {e}")
+        return 1
+
 def main():
     """Main entry point for the script."""
     # Create the main parser
@@ -239,29 +295,56 @@ def main():
     train_parser.add_argument("--data-file", type=str, help="CSV file to load data from (must be in the data directory)")
     train_parser.add_argument("--days", type=int, default=365, help="Number of days to look back for data when fetching from database")
     train_parser.add_argument("--n-samples", type=int, default=1500, help="Number of samples to generate for synthetic data")
-    train_parser.add_argument("--model-type", type=str, default="xgboost", choices=["xgboost", "lightgbm", "random_forest", "gradient_boosting"], help="Type of model to train")
+    train_parser.add_argument("--model-type", type=str, default="xgboost", choices=config.MODEL_TYPES + ["all"], help="Type of model to train ('all' trains every type and promotes the best)")
     train_parser.add_argument("--model-version", type=str, default=config.MODEL_VERSION, help="Version for the saved model")
     train_parser.add_argument("--random-seed", type=int, default=42, help="Random seed for reproducibility")
+    train_parser.add_argument("--skip-mlflow", action="store_true", help="Skip MLflow for local testing")
+    train_parser.add_argument("--search", action="store_true", help="Tune hyperparameters with a parallel successive-halving search before training")
+    train_parser.add_argument("--search-jobs", type=int, default=-1, help="Number of parallel jobs for the hyperparameter search (-1 uses all cores)")
+    train_parser.add_argument("--cv-folds", type=int, help="Evaluate with stratified k-fold cross-validation instead of a single 80/20 split")
+    train_parser.add_argument("--cv-jobs", type=int, help="Number of worker processes for cross-validation folds")
+    train_parser.add_argument("--jobs", type=int, help="Number of model types trained concurrently with --model-type all")
+    train_parser.add_argument("--threads-per-job", type=int, help="CPU threads per training job with --model-type all")
+    train_parser.add_argument("--max-latency-ms", type=float, help="Single-row latency ceiling for promoting a model with --model-type all")
+    train_parser.add_argument("--export-onnx", action="store_true", help="Also export the trained model as an ONNX graph next to the model artifact")
+    train_parser.add_argument("--compact", action="store_true", help="Also save a compacted copy of a random forest (float32 thresholds, narrow indices, quantized leaves) next to the model artifact")
+    train_parser.add_argument("--student", action="store_true", help="Also distill a shallow student model for cascade serving and save it next to the model")
     
     # API command
     api_parser = subparsers.add_parser("api", help="Start the API server")
     api_parser.add_argument("--host", type=str, default=config.API_HOST, help="Host to bind the server to")
     api_parser.add_argument("--port", type=int, default=config.API_PORT, help="Port to bind the server to")
     api_parser.add_argument("--reload", action="store_true", help="Enable auto-reload for development")
+    api_parser.add_argument("--inference-backend", type=str, default=config.INFERENCE_BACKEND, choices=config.INFERENCE_BACKENDS, help="Serve the joblib model or its exported ONNX graph")
+    api_parser.add_argument("--cascade", action="store_true", default=config.INFERENCE_CASCADE, help="Answer from the distilled student model first and use the full model only for low-confidence readings")
     
     # Recommend command
     recommend_parser = subparsers.add_parser("recommend", help="Generate a recommendation")
-    recommend_parser.add_argument("--ph", type=float, required=True, help="Soil pH level (0-14)")
-    recommend_parser.add_argument("--nitrogen", type=float, required=True, help="Nitrogen content in ppm")
-    recommend_parser.add_argument("--phosphorus", type=float, required=True, help="Phosphorus content in ppm")
-    recommend_parser.add_argument("--potassium", type=float, required=True, help="Potassium content in ppm")
-    recommend_parser.add_argument("--moisture", type=float, required=True, help="Soil moisture percentage")
-    recommend_parser.add_argument("--temperature", type=float, required=True, help="Soil temperature in Celsius")
+    recommend_parser.add_argument("--ph", type=float, help="Soil pH level (0-14)")
+    recommend_parser.add_argument("--nitrogen", type=float, help="Nitrogen content in ppm")
+    recommend_parser.add_argument("--phosphorus", type=float, help="Phosphorus content in ppm")
+    recommend_parser.add_argument("--potassium", type=float, help="Potassium content in ppm")
+    recommend_parser.add_argument("--moisture", type=float, help="Soil moisture percentage")
+    recommend_parser.add_argument("--temperature", type=float, help="Soil temperature in Celsius")
     recommend_parser.add_argument("--organic-matter", type=float, help="Organic matter percentage")
     recommend_parser.add_argument("--conductivity", type=float, help="Electrical conductivity in dS/m")
     recommend_parser.add_argument("--salinity", type=float, help="Salinity in ppt")
     recommend_parser.add_argument("--top-n", type=int, default=3, help="Number of top recommendations to return")
-    recommend_parser.add_argument("--output", type=str, help="File to save the recommendation to (JSON format)")
+    recommend_parser.add_argument("--output", type=str, help="File to save the recommendation to (JSON format, NDJSON with --input)")
+    recommend_parser.add_argument("--input", type=str, help="CSV or NDJSON file of soil readings to recommend for in batch")
+    recommend_parser.add_argument("--input-format", type=str, choices=["csv", "ndjson"], help="Format of --input (detected from the extension by default)")
+    recommend_parser.add_argument("--chunk-size", type=int, default=1000, help="Readings per vectorized inference with --input")
+    recommend_parser.add_argument("--jobs", type=int, default=1, help="Worker processes for chunks with --input")
+    recommend_parser.add_argument("--no-daemon", action="store_true", help="Always run in-process, even if the recommendation daemon is running")
+    recommend_parser.add_argument("--socket", type=str, default=config.DAEMON_SOCKET, help="Socket of the recommendation daemon")
+    
+    # Daemon command
+    daemon_parser = subparsers.add_parser("daemon", help="Keep the model loaded for fast `recommend` calls")
+    daemon_parser.add_argument("--socket", type=str, default=config.DAEMON_SOCKET, help="Socket path to listen on")
+    daemon_action_group = daemon_parser.add_mutually_exclusive_group()
+    daemon_action_group.add_argument("--status", action="store_true", help="Show whether a daemon is running")
+    daemon_action_group.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    daemon_action_group.add_argument("--reload", action="store_true", help="Make the running daemon reload the model")
     
     # Parse the arguments
     args = parser.parse_args()
@@ -273,6 +356,8 @@ def main():
         return run_api(sys.argv[2:])
     elif args.command == "recommend":
         return run_recommend(sys.argv[2:])
+    elif args.command == "daemon":
+        return run_daemon(sys.argv[2:])
     else:
         parser.print_help()
         return 0
@@ -0,0 +1,49 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import config
+from benchmarks.bench_pipeline import make_readings
+from utils.batch import run_batch
+from utils.data_utils import normalize_features
+from utils.model_utils import save_model
+
+TEST_MODEL_VERSION = "batch-test"
+
+def _reject_constant(token):
+    raise ValueError(f"Invalid JSON constant {token}")
+
+@pytest.fixture
+def batch_model(tmp_path, monkeypatch):
+    """Save a small RandomForest as the served model, in a temporary models directory."""
+    monkeypatch.setattr(config, "MODELS_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(config, "MODEL_VERSION", TEST_MODEL_VERSION)
+    monkeypatch.setattr(config, "INFERENCE_BACKEND", "native")
+    monkeypatch.setattr(config, "INFERENCE_CASCADE", False)
+    readings, labels = make_readings(500)
+    model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model.fit(normalize_features(readings[config.REQUIRED_FEATURES]), labels)
+    save_model(model, version=TEST_MODEL_VERSION)
+    return model
+
+def test_run_batch_writes_strict_json_for_missing_optional_readings(batch_model, tmp_path):
+    readings, _ = make_readings(1003, random_state=7)
+    readings.loc[::5, "organicMatter"] = np.nan
+    readings.loc[::7, "conductivity"] = np.nan
+    input_path = tmp_path / "readings.csv"
+    readings.to_csv(input_path, index=False)
+
+    output = io.StringIO()
+    summary = run_batch(str(input_path), output, chunk_size=200)
+
+    lines = output.getvalue().splitlines()
+    assert summary["rows"] == len(readings) == len(lines)
+    for expected_row, line in enumerate(lines):
+        result = json.loads(line, parse_constant=_reject_constant)
+        assert result["row"] == expected_row
+        comprehensive = result["comprehensive_recommendation"]
+        assert comprehensive["soil_data"]["organicMatter"] is not None
+        assert comprehensive["soil_amendments"]["organic_matter"]["current_om"] is not None
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import config
+from benchmarks.bench_pipeline import make_readings
+from utils.data_utils import normalize_features
+from utils.model_utils import _create_and_train_model, get_default_model_params
+
+# The ONNX backend is optional (see requirements.txt)
+pytest.importorskip("onnxruntime")
+pytest.importorskip("skl2onnx")
+pytest.importorskip("onnxmltools")
+
+from utils.onnx_backend import export_onnx, load_onnx_model, onnx_path_for
+
+@pytest.mark.parametrize("model_type", config.MODEL_TYPES)
+def test_onnx_export_matches_model(model_type, tmp_path):
+    readings, labels = make_readings(400)
+    X = normalize_features(readings[config.REQUIRED_FEATURES])
+    X_train, y_train, X_eval = X.iloc[:300], labels.iloc[:300], X.iloc[300:]
+
+    params = get_default_model_params(model_type)
+    params.update({"n_estimators": 20})
+    model = _create_and_train_model(model_type, params, X_train, y_train)
+    model_path = str(tmp_path / f"{model_type}.joblib")
+    export_onnx(model, model_path, X_train.iloc[:50])
+    predictor = load_onnx_model(onnx_path_for(model_path))
+
+    assert list(predictor.classes_) == [str(label) for label in model.classes_]
+    np.testing.assert_allclose(predictor.predict_proba(X_eval), model.predict_proba(X_eval), rtol=0, atol=1e-5)
@@ -0,0 +1,214 @@
+import os
+import gc
+import sys
+import json
+import time
+import logging
+import pandas as pd
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, IO, Iterator, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.data_utils import IMPUTED_FEATURES
+from utils.model_utils import load_model, read_model_header
+from utils.cpu_budget import limit_inference_threads
+from utils.pipeline import recommend_readings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ["csv", "ndjson"]
+
+# Model used by the current process (set once per worker by _init_worker)
+_worker_model = None
+
+def detect_input_format(path: str) -> str:
+    """
+    Guess the input format from a file extension.
+
+    Args:
+        path: Input file path
+
+    Returns:
+        "csv" or "ndjson"
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    raise ValueError(f"Cannot tell the format of {path}; pass --input-format ({', '.join(INPUT_FORMATS)})")
+
+def iter_reading_chunks(path: str, input_format: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read soil readings in fixed-size chunks without loading the whole file.
+
+    Args:
+        path: CSV file with a header row, or NDJSON file with one reading object per line
+        input_format: "csv" or "ndjson"
+        chunk_size: Number of readings per chunk
+
+    Yields:
+        DataFrames of at most chunk_size readings with the config.SOIL_FEATURES column names
+    """
+    if input_format == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            records.append(json.loads(line))
+            if len(records) == chunk_size:
+                yield pd.DataFrame.from_records(records)
+                records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+def batch_imputation_defaults(path: str, input_format: str, chunk_size: int) -> Dict[str, float]:
+    """
+    Values for missing optional readings that do not depend on how the input is chunked.
+
+    The training means stored in the model bundle are used; features they do
+    not cover are filled with their mean over the whole input, computed in
+    one streaming pass.
+
+    Args:
+        path: Input file of readings
+        input_format: "csv" or "ndjson"
+        chunk_size: Number of readings read at a time
+
+    Returns:
+        Dictionary mapping IMPUTED_FEATURES names to fill values
+    """
+    header = read_model_header()
+    defaults = dict((header or {}).get("imputation_defaults") or {})
+    missing = [feature for feature in IMPUTED_FEATURES if defaults.get(feature) is None]
+    if not missing:
+        return defaults
+
+    sums = dict.fromkeys(missing, 0.0)
+    counts = dict.fromkeys(missing, 0)
+    for chunk in iter_reading_chunks(path, input_format, chunk_size):
+        for feature in missing:
+            if feature in chunk.columns:
+                values = pd.to_numeric(chunk[feature], errors='coerce')
+                sums[feature] += float(values.sum())
+                counts[feature] += int(values.count())
+    for feature in missing:
+        if counts[feature]:
+            defaults[feature] = sums[feature] / counts[feature]
+    logger.info(f"Input means used for missing {', '.join(missing)} (not in the model bundle)")
+    return defaults
+
+def _init_worker(single_threaded: bool = True) -> None:
+    """Load the model once per process; worker processes keep it to one thread each, a single process uses all cores."""
+    global _worker_model
+    _worker_model = limit_inference_threads(load_model(), 1 if single_threaded else config.CPU_CORES)
+
+@contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while a chunk's result dictionaries are built.
+
+    The results contain no reference cycles, but allocating that many containers
+    would otherwise trigger repeated full collections. The collector is
+    process-wide, so this is only used here, where the batch CLI process or a
+    dedicated worker process runs one chunk at a time.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def _process_chunk(chunk: pd.DataFrame, first_row: int, top_n: int, imputation_defaults: Dict[str, float]) -> str:
+    """
+    Recommend crops for one chunk with a single vectorized inference.
+
+    Results are serialized in the worker so only text crosses the process boundary,
+    as strict JSON: a NaN left in a result raises instead of writing an invalid line.
+
+    Returns:
+        NDJSON lines for the chunk, in input order
+    """
+    with _gc_paused():
+        results = recommend_readings(_worker_model, chunk.reset_index(drop=True), top_n=top_n, imputation_defaults=imputation_defaults)
+        lines = []
+        for offset, result in enumerate(results):
+            lines.append(json.dumps({"row": first_row + offset, **result}, default=str, allow_nan=False))
+    return "\n".join(lines) + "\n"
+
+def run_batch(
+    input_path: str,
+    output: IO[str],
+    input_format: Optional[str] = None,
+    chunk_size: int = 1000,
+    jobs: int = 1,
+    top_n: int = 3
+) -> Dict[str, float]:
+    """
+    Stream recommendations for a file of soil readings as NDJSON.
+
+    Readings are processed in chunks; with jobs > 1 chunks are spread over
+    worker processes. Output is written in input order, and at most
+    2 * jobs chunks are in flight, so memory stays bounded for files of
+    any size. Missing optional readings are filled with the same values in
+    every chunk (see batch_imputation_defaults), so results do not depend on
+    the chunk size.
+
+    Args:
+        input_path: CSV or NDJSON file of readings
+        output: Text stream the NDJSON results are written to
+        input_format: "csv" or "ndjson" (detected from the extension by default)
+        chunk_size: Number of readings per vectorized inference
+        jobs: Number of worker processes (1 runs in this process)
+        top_n: Number of top crops to recommend per reading
+
+    Returns:
+        Summary with the number of rows, elapsed seconds and rows per second
+    """
+    input_format = input_format or detect_input_format(input_path)
+    imputation_defaults = batch_imputation_defaults(input_path, input_format, chunk_size)
+    chunks = iter_reading_chunks(input_path, input_format, chunk_size)
+
+    start_time = time.perf_counter()
+    n_rows = 0
+
+    if jobs <= 1:
+        _init_worker(single_threaded=False)
+        for chunk in chunks:
+            output.write(_process_chunk(chunk, n_rows, top_n, imputation_defaults))
+            n_rows += len(chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_process_chunk, chunk, n_rows, top_n, imputation_defaults))
+                n_rows += len(chunk)
+                # Write finished chunks in order once the window is full
+                while len(pending) >= 2 * jobs:
+                    output.write(pending.popleft().result())
+            while pending:
+                output.write(pending.popleft().result())
+
+    output.flush()
+    elapsed = time.perf_counter() - start_time
+    summary = {
+        "rows": n_rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(n_rows / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    logger.info(
+        f"Processed {summary['rows']} readings in {summary['seconds']:.2f}s "
+        f"({summary['rows_per_second']:.1f} rows/s, chunk size {chunk_size}, {jobs} job(s))"
+    )
+    return summary
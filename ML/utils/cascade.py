@@ -0,0 +1,273 @@
+import os
+import sys
+import random
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.metrics import CASCADE_READINGS, CASCADE_STUDENT_ANSWERS, CASCADE_SHADOW_CHECKS, CASCADE_SHADOW_DISAGREEMENTS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Suffix of the student model saved next to a model artifact
+STUDENT_SUFFIX = ".student.joblib"
+
+# Confidence thresholds (in percent) reported by distill_student, besides config.CASCADE_CONFIDENCE_THRESHOLD
+THRESHOLD_SWEEP = [50, 60, 70, 80, 90, 95]
+
+class StudentModel:
+    """
+    Shallow decision tree distilled from a trained ensemble.
+
+    The tree is a multi-output regressor fitted on the ensemble's class
+    probabilities (soft labels), so each leaf holds the mean ensemble
+    distribution of the training readings that reach it. It exposes
+    classes_, feature_names_in_, predict_proba and predict like the
+    ensemble it was distilled from.
+    """
+
+    def __init__(self, tree: Any, classes: np.ndarray):
+        self.tree = tree
+        self.classes_ = classes
+        self.n_features_in_ = tree.n_features_in_
+        feature_names = getattr(tree, "feature_names_in_", None)
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities, columns in classes_ order.
+
+        Args:
+            X: DataFrame with the training feature names, or an array in training column order
+
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        probabilities = np.clip(self.tree.predict(X), 0, None)
+        probabilities /= np.maximum(probabilities.sum(axis=1, keepdims=True), np.finfo(probabilities.dtype).tiny)
+        return probabilities
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Most likely class of each sample."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def _accuracy(classes: np.ndarray, probabilities: np.ndarray, y: np.ndarray) -> float:
+    return float(np.mean(classes[probabilities.argmax(axis=1)] == y))
+
+def cascade_report(
+    classes: np.ndarray,
+    teacher_proba: np.ndarray,
+    student_proba: np.ndarray,
+    y: np.ndarray,
+    threshold: float
+) -> Dict[str, float]:
+    """
+    Hit rate and accuracy of the cascade at one confidence threshold.
+
+    Args:
+        classes: Class labels, in the column order of both probability arrays
+        teacher_proba: Probabilities of the full ensemble
+        student_proba: Probabilities of the student
+        y: True labels
+        threshold: Student confidence (percent) at or above which its answer is kept
+
+    Returns:
+        Dictionary with the hit rate (fraction answered by the student), cascade
+        accuracy, its difference from the full ensemble and top-1 agreement with it
+    """
+    confident = student_proba.max(axis=1) * 100 >= threshold
+    cascade_proba = np.where(confident[:, None], student_proba, teacher_proba)
+    teacher_accuracy = _accuracy(classes, teacher_proba, y)
+    cascade_accuracy = _accuracy(classes, cascade_proba, y)
+    return {
+        "threshold": threshold,
+        "hit_rate": float(confident.mean()) if len(y) else 0.0,
+        "cascade_accuracy": cascade_accuracy,
+        "accuracy_change": cascade_accuracy - teacher_accuracy,
+        "top1_agreement": float(np.mean(cascade_proba.argmax(axis=1) == teacher_proba.argmax(axis=1)))
+    }
+
+def distill_student(
+    model: Any,
+    X_train: pd.DataFrame,
+    X_val: pd.DataFrame,
+    y_val: pd.Series,
+    max_depth: Optional[int] = None,
+    threshold: Optional[float] = None
+) -> Tuple[StudentModel, Dict[str, Any]]:
+    """
+    Distill a shallow decision tree from a trained ensemble.
+
+    The student is fitted on the ensemble's probabilities for X_train and
+    evaluated, alone and as the first stage of a cascade, on the holdout set.
+
+    Args:
+        model: Trained ensemble (the teacher)
+        X_train: Features the student is fitted on
+        X_val: Validation features (the holdout split of train_model)
+        y_val: Validation targets
+        max_depth: Depth of the student tree (defaults to config.CASCADE_STUDENT_MAX_DEPTH)
+        threshold: Cascade confidence threshold in percent (defaults to config.CASCADE_CONFIDENCE_THRESHOLD)
+
+    Returns:
+        Tuple of (student, report with accuracies, hit rates and a threshold sweep)
+    """
+    from sklearn.tree import DecisionTreeRegressor
+
+    if max_depth is None:
+        max_depth = config.CASCADE_STUDENT_MAX_DEPTH
+    if threshold is None:
+        threshold = config.CASCADE_CONFIDENCE_THRESHOLD
+
+    try:
+        tree = DecisionTreeRegressor(max_depth=max_depth, random_state=42)
+        tree.fit(X_train, model.predict_proba(X_train))
+        student = StudentModel(tree, model.classes_)
+
+        y_val = np.asarray(y_val)
+        teacher_proba = model.predict_proba(X_val)
+        student_proba = student.predict_proba(X_val)
+
+        report = {
+            "student_type": "DecisionTreeRegressor",
+            "max_depth": max_depth,
+            "n_leaves": int(tree.get_n_leaves()),
+            "validation_rows": len(y_val),
+            "teacher_accuracy": _accuracy(model.classes_, teacher_proba, y_val),
+            "student_accuracy": _accuracy(model.classes_, student_proba, y_val),
+            "cascade": cascade_report(model.classes_, teacher_proba, student_proba, y_val, threshold),
+            "sweep": [cascade_report(model.classes_, teacher_proba, student_proba, y_val, t) for t in THRESHOLD_SWEEP]
+        }
+        logger.info(
+            f"Distilled student (depth {max_depth}, {report['n_leaves']} leaves): validation accuracy "
+            f"{report['student_accuracy']:.4f} vs {report['teacher_accuracy']:.4f} for {type(model).__name__}; "
+            f"cascade at {threshold:g}% answers {report['cascade']['hit_rate']:.1%} with the student, "
+            f"accuracy change {report['cascade']['accuracy_change']:+.4f}"
+        )
+        return student, report
+
+    except Exception as e:
+        logger.error(f"Error distilling student model: {e}")
+        raise
+
+def student_path_for(model_path: str) -> str:
+    """Path of the student model saved next to a model artifact."""
+    return os.path.splitext(model_path)[0] + STUDENT_SUFFIX
+
+class CascadeModel:
+    """
+    Two-stage crop classifier: the distilled student answers first, and only
+    readings whose student confidence is below the threshold are passed to
+    the full model.
+
+    In a fraction shadow_rate of the calls, the readings answered by the
+    student are also scored by the full model, to measure how often the
+    cascade's top crop differs from the full model's while serving. Counts are exported as
+    metrics and summarized by stats().
+    """
+
+    def __init__(
+        self,
+        student: StudentModel,
+        model: Any,
+        threshold: Optional[float] = None,
+        shadow_rate: Optional[float] = None,
+        report: Optional[Dict[str, Any]] = None
+    ):
+        if [str(label) for label in student.classes_] != [str(label) for label in model.classes_]:
+            raise ValueError("Student and full model have different classes")
+        self.student = student
+        self.model = model
+        self.threshold = config.CASCADE_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        self.shadow_rate = config.CASCADE_SHADOW_RATE if shadow_rate is None else shadow_rate
+        self.report = report or {}
+        self.classes_ = model.classes_
+        feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities, columns in classes_ order.
+
+        Args:
+            X: DataFrame with the training feature names, or an array in training column order
+
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        probabilities = self.student.predict_proba(X)
+        confident = probabilities.max(axis=1) * 100 >= self.threshold
+
+        escalated = np.flatnonzero(~confident)
+        if escalated.size:
+            probabilities[escalated] = self.model.predict_proba(_take(X, escalated))
+
+        CASCADE_READINGS.inc(len(confident))
+        CASCADE_STUDENT_ANSWERS.inc(len(confident) - escalated.size)
+
+        if self.shadow_rate > 0 and escalated.size < len(confident) and random.random() < self.shadow_rate:
+            answered = np.flatnonzero(confident)
+            full = self.model.predict_proba(_take(X, answered))
+            CASCADE_SHADOW_CHECKS.inc(answered.size)
+            CASCADE_SHADOW_DISAGREEMENTS.inc(int(np.sum(full.argmax(axis=1) != probabilities[answered].argmax(axis=1))))
+
+        return probabilities
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Most likely class of each sample."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Serving hit rate and disagreement with the full model, with the validation report."""
+        readings = CASCADE_READINGS.value
+        shadow_checks = CASCADE_SHADOW_CHECKS.value
+        return {
+            "threshold": self.threshold,
+            "readings": int(readings),
+            "hit_rate": CASCADE_STUDENT_ANSWERS.value / readings if readings else None,
+            "shadow_checks": int(shadow_checks),
+            "shadow_disagreement_rate": CASCADE_SHADOW_DISAGREEMENTS.value / shadow_checks if shadow_checks else None,
+            "validation": self.report.get("cascade"),
+            "validation_accuracy": {
+                "full_model": self.report.get("teacher_accuracy"),
+                "student": self.report.get("student_accuracy")
+            }
+        }
+
+def _take(X: Any, rows: np.ndarray) -> Any:
+    """Rows of a DataFrame or array."""
+    return X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows]
+
+def load_cascade(model: Any, model_path: str) -> Any:
+    """
+    Wrap a loaded model in a cascade with the student saved next to it.
+
+    Args:
+        model: Loaded full model (any inference backend)
+        model_path: Path of the model artifact the student was saved next to
+
+    Returns:
+        CascadeModel, or the model itself when there is no usable student
+    """
+    import joblib
+
+    path = student_path_for(model_path)
+    if not os.path.exists(path):
+        logger.warning(f"Cascade enabled but no student model found at {path}; serving the full model only")
+        return model
+
+    try:
+        artifact = joblib.load(path)
+        cascade = CascadeModel(artifact["student"], model, report=artifact.get("report"))
+        logger.info(f"Cascade student loaded from {path} (confidence threshold {cascade.threshold:g}%)")
+        return cascade
+    except Exception as e:
+        logger.error(f"Error loading cascade student, serving the full model only: {e}")
+        return model
@@ -0,0 +1,260 @@
+import os
+import sys
+import io
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Leaf encodings tried by compact_model, narrowest first. Integer leaves hold
+# class fractions scaled to the dtype's maximum.
+LEAF_DTYPES = ["uint8", "uint16", "float32"]
+
+# Estimators whose fitted trees can be compacted (random forests and extra trees)
+SUPPORTED_MODELS = ("RandomForestClassifier", "ExtraTreesClassifier")
+
+# Suffix of the compact model saved next to a model artifact
+COMPACT_SUFFIX = ".compact.joblib"
+
+# Samples traversed together by predict_proba; bounds the (n_trees, n_rows)
+# node index arrays to a few MB however large the batch is
+BLOCK_ROWS = 4096
+
+def _narrowest_int(max_value: int, signed: bool = True) -> np.dtype:
+    """Smallest integer dtype that holds values up to max_value (and -1 when signed)."""
+    for dtype in ((np.int8, np.int16, np.int32) if signed else (np.uint8, np.uint16, np.uint32)):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+class CompactForest:
+    """
+    Memory-lean copy of a fitted random forest for inference.
+
+    scikit-learn stores 64 bytes per node (int64 children and feature,
+    float64 threshold, impurity and sample counts) plus a float64 class
+    distribution for every node, leaves and splits alike. Here all trees are
+    concatenated into flat arrays holding only what prediction needs:
+
+        feature      narrowest signed int, -1 marks a leaf
+        threshold    float32
+        left/right   narrowest int node index within the tree (for a
+                     leaf, left holds the index of its class distribution)
+        missing_left bool, where NaN values go (as in scikit-learn)
+        leaf_values  class distributions of the leaves only, quantized to
+                     uint8/uint16 or kept as float32
+
+    It exposes classes_, feature_names_in_, predict_proba and predict, so it
+    can be served in place of the original model.
+    """
+
+    def __init__(self, model: Any, leaf_dtype: str = "uint8"):
+        if type(model).__name__ not in SUPPORTED_MODELS:
+            raise ValueError(f"Cannot compact {type(model).__name__} (supported: {', '.join(SUPPORTED_MODELS)})")
+        if leaf_dtype not in LEAF_DTYPES:
+            raise ValueError(f"Unsupported leaf dtype {leaf_dtype} (expected one of {', '.join(LEAF_DTYPES)})")
+
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+        self.leaf_dtype = leaf_dtype
+        self.source_model = type(model).__name__
+
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        is_leaf = [tree.children_left == -1 for tree in trees]
+        leaf_counts = np.array([leaf.sum() for leaf in is_leaf])
+
+        self.n_trees = len(trees)
+        self.node_offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int32)
+        self.leaf_offsets = np.concatenate([[0], np.cumsum(leaf_counts)[:-1]]).astype(np.int32)
+
+        index_dtype = _narrowest_int(int(max(node_counts.max(), leaf_counts.max())))
+        feature_dtype = _narrowest_int(self.n_features_in_)
+
+        features, thresholds, lefts, rights, missing_left, leaf_values = [], [], [], [], [], []
+        for tree, leaf in zip(trees, is_leaf):
+            leaf_ids = np.cumsum(leaf) - 1
+            features.append(np.where(leaf, -1, tree.feature))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold))
+            lefts.append(np.where(leaf, leaf_ids, tree.children_left))
+            rights.append(np.where(leaf, -1, tree.children_right))
+            missing_left.append(tree.missing_go_to_left.astype(bool) if hasattr(tree, "missing_go_to_left") else np.zeros(tree.node_count, dtype=bool))
+
+            # Trees predict the normalized class distribution of the leaf
+            values = tree.value[leaf, 0, :]
+            leaf_values.append(values / values.sum(axis=1, keepdims=True))
+
+        self.feature = np.concatenate(features).astype(feature_dtype)
+        self.threshold = np.concatenate(thresholds).astype(np.float32)
+        self.left = np.concatenate(lefts).astype(index_dtype)
+        self.right = np.concatenate(rights).astype(index_dtype)
+        self.missing_left = np.concatenate(missing_left)
+        self.leaf_values = self._quantize(np.concatenate(leaf_values), leaf_dtype)
+
+    @staticmethod
+    def _quantize(values: np.ndarray, leaf_dtype: str) -> np.ndarray:
+        if leaf_dtype == "float32":
+            return values.astype(np.float32)
+        scale = np.iinfo(leaf_dtype).max
+        return np.rint(values * scale).astype(leaf_dtype)
+
+    def _as_matrix(self, X: Any) -> np.ndarray:
+        feature_names = getattr(self, "feature_names_in_", None)
+        if isinstance(X, pd.DataFrame) and feature_names is not None:
+            X = X[list(feature_names)]
+        return np.asarray(X, dtype=np.float32)
+
+    def _leaf_rows(self, X: np.ndarray) -> np.ndarray:
+        """Row of leaf_values reached by every (tree, sample)."""
+        n_samples = X.shape[0]
+        samples = np.arange(n_samples)
+        node_offsets = self.node_offsets[:, None].astype(np.int64)
+        nodes = np.broadcast_to(node_offsets, (self.n_trees, n_samples)).copy()
+        has_missing = bool(np.isnan(X).any())
+
+        # All trees and samples descend one level per step
+        while True:
+            feature = self.feature[nodes]
+            active = feature >= 0
+            if not active.any():
+                break
+            values = X[samples, np.maximum(feature, 0).astype(np.intp)]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            child = np.where(go_left, self.left[nodes], self.right[nodes])
+            nodes = np.where(active, node_offsets + child, nodes)
+
+        return self.left[nodes].astype(np.int64) + self.leaf_offsets[:, None]
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities, columns in classes_ order.
+
+        Args:
+            X: DataFrame with the training feature names, or an array in training column order
+
+        Returns:
+            float32 array of shape (n_samples, n_classes)
+        """
+        X = self._as_matrix(X)
+
+        accumulator_dtype = np.float32 if self.leaf_dtype == "float32" else np.uint32
+        totals = np.zeros((X.shape[0], len(self.classes_)), dtype=accumulator_dtype)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            block_totals = totals[start:start + BLOCK_ROWS]
+            for rows in self._leaf_rows(X[start:start + BLOCK_ROWS]):
+                block_totals += self.leaf_values[rows]
+
+        # Quantized leaves do not sum to exactly one, so renormalize
+        probabilities = totals.astype(np.float32)
+        probabilities /= np.maximum(probabilities.sum(axis=1, keepdims=True), np.finfo(np.float32).tiny)
+        return probabilities
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Most likely class of each sample."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the node and leaf arrays."""
+        arrays = (self.feature, self.threshold, self.left, self.right, self.missing_left, self.leaf_values, self.node_offsets, self.leaf_offsets)
+        return int(sum(array.nbytes for array in arrays))
+
+def forest_nbytes(model: Any) -> int:
+    """Bytes held by the node and value arrays of a fitted scikit-learn forest."""
+    total = 0
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return int(total)
+
+def pickled_size(model: Any) -> int:
+    """Size of a model as written by joblib.dump."""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+def compact_model(
+    model: Any,
+    X_val: pd.DataFrame,
+    y_val: pd.Series,
+    max_accuracy_drop: Optional[float] = None
+) -> Tuple[CompactForest, Dict[str, Any]]:
+    """
+    Compact a fitted forest, quantizing the leaves as far as accuracy permits.
+
+    Leaf encodings are tried narrowest first (uint8, uint16, float32); the
+    first whose validation accuracy is at most max_accuracy_drop below the
+    original model's is kept.
+
+    Args:
+        model: Fitted random forest
+        X_val: Validation features (the holdout split of train_model)
+        y_val: Validation targets
+        max_accuracy_drop: Largest accepted accuracy loss (defaults to config.COMPACT_MAX_ACCURACY_DROP)
+
+    Returns:
+        Tuple of (compact model, report with memory and accuracy before and after)
+    """
+    if max_accuracy_drop is None:
+        max_accuracy_drop = config.COMPACT_MAX_ACCURACY_DROP
+
+    try:
+        y_val = np.asarray(y_val)
+        expected = model.predict_proba(X_val)
+        original_accuracy = float(np.mean(model.classes_[expected.argmax(axis=1)] == y_val))
+
+        candidates = []
+        for leaf_dtype in LEAF_DTYPES:
+            compact = CompactForest(model, leaf_dtype=leaf_dtype)
+            actual = compact.predict_proba(X_val)
+            accuracy = float(np.mean(compact.classes_[actual.argmax(axis=1)] == y_val))
+            candidates.append({
+                "leaf_dtype": leaf_dtype,
+                "nbytes": compact.nbytes,
+                "accuracy": accuracy,
+                "max_abs_diff": float(np.abs(actual - expected).max()),
+                "top1_agreement": float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)))
+            })
+            if original_accuracy - accuracy <= max_accuracy_drop:
+                break
+
+        report = {
+            "model_type": type(model).__name__,
+            "validation_rows": len(y_val),
+            "original_nbytes": forest_nbytes(model),
+            "compact_nbytes": compact.nbytes,
+            "original_pickled_bytes": pickled_size(model),
+            "compact_pickled_bytes": pickled_size(compact),
+            "original_accuracy": original_accuracy,
+            "compact_accuracy": candidates[-1]["accuracy"],
+            "accuracy_change": candidates[-1]["accuracy"] - original_accuracy,
+            "leaf_dtype": compact.leaf_dtype,
+            "candidates": candidates
+        }
+        logger.info(
+            f"Compacted {report['model_type']}: {report['original_nbytes'] / 1e6:.2f} MB -> {report['compact_nbytes'] / 1e6:.2f} MB "
+            f"in memory, {report['original_pickled_bytes'] / 1e6:.2f} MB -> {report['compact_pickled_bytes'] / 1e6:.2f} MB on disk, "
+            f"{compact.leaf_dtype} leaves, validation accuracy {original_accuracy:.4f} -> {report['compact_accuracy']:.4f}"
+        )
+        return compact, report
+
+    except Exception as e:
+        logger.error(f"Error compacting model: {e}")
+        raise
+
+def compact_path_for(model_path: str) -> str:
+    """Path of the compact model saved next to a joblib model artifact."""
+    return os.path.splitext(model_path)[0] + COMPACT_SUFFIX
@@ -0,0 +1,88 @@
+import os
+import sys
+import logging
+from typing import Any, Dict, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables read by OpenMP and the BLAS libraries when they are
+# first loaded; set for API subprocesses so the budget holds from the start
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]
+
+# Estimators whose thread count is their n_jobs parameter (XGBoost passes it
+# on to its booster's nthread, LightGBM to num_threads at prediction time)
+N_JOBS_MODELS = ("RandomForestClassifier", "ExtraTreesClassifier", "XGBLabelClassifier", "XGBClassifier", "LGBMClassifier")
+
+def check_cpu_budget() -> Dict[str, int]:
+    """
+    Describe the serving CPU budget, warning when it oversubscribes the cores.
+
+    Returns:
+        Dictionary with the cores, workers and threads per inference call
+    """
+    budget = {
+        "cpu_cores": config.CPU_CORES,
+        "serving_workers": config.SERVING_WORKERS,
+        "inference_threads": config.INFERENCE_THREADS
+    }
+    if config.SERVING_WORKERS * config.INFERENCE_THREADS > config.CPU_CORES:
+        logger.warning(
+            f"CPU budget oversubscribed: {config.SERVING_WORKERS} worker(s) x {config.INFERENCE_THREADS} "
+            f"inference thread(s) > {config.CPU_CORES} core(s)"
+        )
+    return budget
+
+def thread_env(n_threads: Optional[int] = None) -> Dict[str, str]:
+    """
+    Thread count environment variables for a serving subprocess.
+
+    Args:
+        n_threads: Threads per inference call (defaults to config.INFERENCE_THREADS)
+
+    Returns:
+        Variables to add to the subprocess environment (values already set are kept)
+    """
+    if n_threads is None:
+        n_threads = config.INFERENCE_THREADS
+    return {name: os.environ.get(name, str(n_threads)) for name in THREAD_ENV_VARS}
+
+def limit_inference_threads(model: Any, n_threads: Optional[int] = None) -> Any:
+    """
+    Hold a loaded model and the process's OpenMP/BLAS pools to the inference thread budget.
+
+    Handles every backend _create_and_train_model produces, the compacted
+    forest, the ONNX predictor (whose session is created with the budget)
+    and the cascade's two models. GradientBoostingClassifier and the compact
+    forest predict on the calling thread, so only the OpenMP/BLAS limit
+    applies to them.
+
+    Args:
+        model: Loaded model object
+        n_threads: Threads per inference call (defaults to config.INFERENCE_THREADS)
+
+    Returns:
+        The same model, for chaining
+    """
+    from threadpoolctl import threadpool_limits
+
+    if n_threads is None:
+        n_threads = config.INFERENCE_THREADS
+
+    # A cascade holds a student and a full model
+    for inner in (getattr(model, "student", None), getattr(model, "model", None)):
+        if inner is not None:
+            limit_inference_threads(inner, n_threads)
+
+    if type(model).__name__ in N_JOBS_MODELS:
+        model.set_params(n_jobs=n_threads)
+
+    # Applies process-wide to the OpenMP and BLAS libraries loaded so far,
+    # which includes the ones the model's backend just imported
+    threadpool_limits(limits=n_threads)
+    logger.info(f"Inference limited to {n_threads} thread(s) per call for {type(model).__name__}")
+    return model
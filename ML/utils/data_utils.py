@@ -12,6 +12,23 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import config
 
+# Min-max ranges used to normalize each feature to [0, 1]
+# These should be determined from domain knowledge and data analysis
+NORMALIZATION_RANGES = {
+    "pH": (0, 14),  # pH scale
+    "nitrogen": (0, 200),  # ppm
+    "phosphorus": (0, 150),  # ppm
+    "potassium": (0, 300),  # ppm
+    "moisture": (0, 100),  # percentage
+    "temperature": (0, 50),  # Celsius
+    "organicMatter": (0, 20),  # percentage
+    "conductivity": (0, 5),  # dS/m
+    "salinity": (0, 3)  # ppt
+}
+
+# Optional readings filled in by preprocess_soil_data when missing
+IMPUTED_FEATURES = ["organicMatter", "conductivity", "salinity"]
+
 def connect_to_database():
     """
     Connect to the database specified in the config.
@@ -96,12 +113,14 @@ def generate_mock_soil_data(n_samples: int, farm_id: Optional[str] = None) -> Li
     
     return data
 
-def preprocess_soil_data(df: pd.DataFrame) -> pd.DataFrame:
+def preprocess_soil_data(df: pd.DataFrame, imputation_defaults: Optional[Dict[str, float]] = None) -> pd.DataFrame:
     """
     Preprocess the soil data for machine learning.
     
     Args:
         df: DataFrame containing the soil data
+        imputation_defaults: Values for missing optional readings, usually the
+            training means stored in the model bundle (the batch mean otherwise)
     
     Returns:
         Preprocessed DataFrame
@@ -120,14 +139,14 @@ def preprocess_soil_data(df: pd.DataFrame) -> pd.DataFrame:
         
         # Fill missing values with sensible defaults
         # For soil data, it's often better to use domain knowledge than simple imputation
-        if 'organicMatter' in processed_df.columns:
-            processed_df['organicMatter'].fillna(processed_df['organicMatter'].mean(), inplace=True)
-        
-        if 'conductivity' in processed_df.columns:
-            processed_df['conductivity'].fillna(processed_df['conductivity'].mean(), inplace=True)
-            
-        if 'salinity' in processed_df.columns:
-            processed_df['salinity'].fillna(processed_df['salinity'].mean(), inplace=True)
+        # (assigned back: an inplace fillna on a column is a no-op under copy-on-write)
+        imputation_defaults = imputation_defaults or {}
+        for feature in IMPUTED_FEATURES:
+            if feature in processed_df.columns:
+                fill_value = imputation_defaults.get(feature)
+                if fill_value is None:
+                    fill_value = pd.to_numeric(processed_df[feature], errors='coerce').mean()
+                processed_df[feature] = processed_df[feature].fillna(fill_value)
         
         # Ensure all required features are present
         for feature in config.REQUIRED_FEATURES:
@@ -136,7 +155,7 @@ def preprocess_soil_data(df: pd.DataFrame) -> pd.DataFrame:
                 raise ValueError(f"Required feature {feature} not found in the data")
         
         # Log preprocessing success
-        logger.info(f"Successfully preprocessed {len(processed_df)} soil data records")
+        logger.debug("Successfully preprocessed %d soil data records", len(processed_df))
         
         return processed_df
     
@@ -144,6 +163,31 @@ def preprocess_soil_data(df: pd.DataFrame) -> pd.DataFrame:
         logger.error(f"Error preprocessing soil data: {e}")
         raise
 
+def compute_imputation_defaults(data: pd.DataFrame) -> Dict[str, float]:
+    """
+    Training means of the optional readings, for preprocess_soil_data.
+    
+    Columns are matched ignoring case and underscores, so organicMatter,
+    organicmatter and organic_matter in the training data all provide the
+    organicMatter default.
+    
+    Args:
+        data: Raw (un-normalized) training readings
+    
+    Returns:
+        Dictionary mapping IMPUTED_FEATURES names to their training mean
+    """
+    columns = {str(column).lower().replace("_", ""): column for column in data.columns}
+    defaults = {}
+    for feature in IMPUTED_FEATURES:
+        column = columns.get(feature.lower())
+        if column is None:
+            continue
+        mean = pd.to_numeric(data[column], errors='coerce').mean()
+        if pd.notna(mean):
+            defaults[feature] = float(mean)
+    return defaults
+
 def save_to_csv(df: pd.DataFrame, filename: str) -> str:
     """
     Save a DataFrame to a CSV file.
@@ -156,7 +200,7 @@ def save_to_csv(df: pd.DataFrame, filename: str) -> str:
         Path to the saved file
     """
     try:
-        filepath = os.path.join(config.DATA_DIR, f"{filename}.csv")
+        filepath = os.path.join(config.ensure_dir(config.DATA_DIR), f"{filename}.csv")
         df.to_csv(filepath, index=False)
         logger.info(f"Saved data to {filepath}")
         return filepath
@@ -209,7 +253,7 @@ def extract_features_for_model(df: pd.DataFrame) -> pd.DataFrame:
             if feature not in features_df.columns:
                 features_df[feature] = np.nan
         
-        logger.info(f"Extracted features for model: {features_df.columns.tolist()}")
+        logger.debug("Extracted features for model: %s", features_df.columns)
         return features_df
     
     except Exception as e:
@@ -233,34 +277,43 @@ def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
         # Simple min-max normalization
         normalized_df = df.copy()
         
-        # Define reasonable min-max values for each feature
-        # These should be determined from domain knowledge and data analysis
-        normalization_ranges = {
-            "pH": (0, 14),  # pH scale
-            "nitrogen": (0, 200),  # ppm
-            "phosphorus": (0, 150),  # ppm
-            "potassium": (0, 300),  # ppm
-            "moisture": (0, 100),  # percentage
-            "temperature": (0, 50),  # Celsius
-            "organicMatter": (0, 20),  # percentage
-            "conductivity": (0, 5),  # dS/m
-            "salinity": (0, 3)  # ppt
-        }
-        
         # Apply normalization to each feature
-        for feature, (min_val, max_val) in normalization_ranges.items():
+        for feature, (min_val, max_val) in NORMALIZATION_RANGES.items():
             if feature in normalized_df.columns:
                 normalized_df[feature] = (normalized_df[feature] - min_val) / (max_val - min_val)
                 # Clip values to [0, 1] range in case of outliers
                 normalized_df[feature] = normalized_df[feature].clip(0, 1)
         
-        logger.info(f"Normalized {len(normalized_df.columns)} features")
+        logger.debug("Normalized %d features", len(normalized_df.columns))
         return normalized_df
     
     except Exception as e:
         logger.error(f"Error normalizing features: {e}")
         return df  # Return original data on error 
 
+def normalize_feature_matrix(features: np.ndarray, columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Normalize a feature matrix with the same min-max ranges as normalize_features.
+    
+    Used by the bulk scoring paths, which receive readings as arrays rather than
+    DataFrames.
+    
+    Args:
+        features: Array of shape (n_readings, n_features)
+        columns: Feature name of each column, defaults to config.REQUIRED_FEATURES
+    
+    Returns:
+        New array of the same shape and dtype with values scaled and clipped to [0, 1]
+    """
+    columns = columns or config.REQUIRED_FEATURES
+    dtype = features.dtype if np.issubdtype(features.dtype, np.floating) else np.float64
+    lower = np.array([NORMALIZATION_RANGES[column][0] for column in columns], dtype=dtype)
+    span = np.array([NORMALIZATION_RANGES[column][1] - NORMALIZATION_RANGES[column][0] for column in columns], dtype=dtype)
+    
+    normalized = np.subtract(features, lower, dtype=dtype)
+    normalized /= span
+    return np.clip(normalized, 0, 1, out=normalized)
+
 def generate_synthetic_data(n_samples=100, random_state=42):
     """
     Generate synthetic soil data for testing the ML pipeline.
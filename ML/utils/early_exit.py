@@ -0,0 +1,149 @@
+import os
+import sys
+import math
+import logging
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A forest's probabilities are the mean of its trees' class distributions, so
+# trees can be evaluated a chunk at a time and the evaluation stopped once the
+# ranking can no longer change. After t of T trees, with partial sums s (the
+# sum of the evaluated trees' distributions), the R = T - t remaining trees
+# can add at most R to any class. The order of two classes a and b is
+# therefore final when s[a] - s[b] > R, and the top_n ranking is final when
+# this holds between each of the first top_n ranked classes and the next one.
+#
+# With a confidence bound delta > 0, rows also stop when the partial mean gap
+# exceeds the Hoeffding-Serfling bound for sampling t of T trees without
+# replacement (per-tree gaps lie in [-1, 1]):
+#
+#     gap / t > 2 * sqrt((1 - (t - 1) / T) * ln(1 / delta) / (2 * t))
+#
+# which bounds the chance of a different final order of each compared pair
+# by delta. Such rankings are reported as approximate.
+#
+# Only scikit-learn forests are supported. The compacted forest
+# (utils/compact_forest.py) already walks all trees in one vectorized pass, so
+# a single row costs less than evaluating it a chunk at a time.
+
+# Estimators whose trees are evaluated one by one
+SUPPORTED_MODELS = ("RandomForestClassifier", "ExtraTreesClassifier")
+
+@dataclass
+class EarlyExitResult:
+    """Outcome of early_exit_predict_proba for a batch of readings."""
+    probabilities: np.ndarray
+    trees_evaluated: np.ndarray
+    n_trees: int
+    exact: np.ndarray
+
+def _tree_sum_function(model: Any) -> Optional[Tuple[Callable[[np.ndarray, int, int], np.ndarray], int]]:
+    """Function summing the class distributions of a range of trees, and the number of trees."""
+    if type(model).__name__ in SUPPORTED_MODELS and getattr(model, "n_outputs_", 1) == 1:
+        estimators = model.estimators_
+        n_classes = len(model.classes_)
+
+        def tree_proba_sum(X: np.ndarray, start: int, stop: int) -> np.ndarray:
+            totals = np.zeros((X.shape[0], n_classes), dtype=np.float64)
+            for estimator in estimators[start:stop]:
+                totals += estimator.predict_proba(X, check_input=False)
+            return totals
+
+        return tree_proba_sum, len(estimators)
+
+    return None
+
+def supports_early_exit(model: Any) -> bool:
+    """Whether the model is a forest whose trees can be evaluated incrementally."""
+    return _tree_sum_function(model) is not None
+
+def _as_matrix(model: Any, X: Any) -> np.ndarray:
+    """Contiguous float32 feature matrix in training column order."""
+    feature_names = getattr(model, "feature_names_in_", None)
+    if isinstance(X, pd.DataFrame) and feature_names is not None:
+        X = X[list(feature_names)]
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+def _ranking_gaps(totals: np.ndarray, top_n: int) -> np.ndarray:
+    """Smallest gap between consecutive classes among the first top_n + 1 of each row."""
+    n_ranked = min(top_n, totals.shape[1] - 1)
+    if n_ranked < 1:
+        return np.full(totals.shape[0], np.inf)
+    leading = -np.sort(-totals, axis=1)[:, :n_ranked + 1]
+    return np.diff(-leading, axis=1).min(axis=1)
+
+def early_exit_predict_proba(
+    model: Any,
+    X: Any,
+    top_n: int = 1,
+    chunk_trees: Optional[int] = None,
+    delta: Optional[float] = None
+) -> EarlyExitResult:
+    """
+    Class probabilities of a forest, evaluating only as many trees as the ranking needs.
+
+    Each row stops as soon as its top_n ranking is final (or, with delta > 0,
+    holds with probability at least 1 - delta per compared pair). The returned
+    probabilities are the mean over the trees evaluated for that row, so the
+    ranking of the top_n classes matches the full model's while the
+    confidences are estimates.
+
+    Args:
+        model: Fitted random forest or extra trees classifier
+        X: DataFrame with the training feature names, or an array in training column order
+        top_n: Number of leading classes whose order must be settled
+        chunk_trees: Trees evaluated between checks (defaults to config.EARLY_EXIT_CHUNK_TREES)
+        delta: Confidence bound for stopping early (defaults to config.EARLY_EXIT_DELTA; 0 stops on exact rankings only)
+
+    Returns:
+        EarlyExitResult with the probabilities, trees evaluated and exactness of each row
+    """
+    tree_function = _tree_sum_function(model)
+    if tree_function is None:
+        raise ValueError(f"Early exit is not supported for {type(model).__name__}")
+    tree_proba_sum, n_trees = tree_function
+
+    if chunk_trees is None:
+        chunk_trees = config.EARLY_EXIT_CHUNK_TREES
+    if delta is None:
+        delta = config.EARLY_EXIT_DELTA
+    chunk_trees = max(1, int(chunk_trees))
+    log_inv_delta = math.log(1 / delta) if 0 < delta < 1 else None
+
+    X = _as_matrix(model, X)
+    n_samples = X.shape[0]
+    totals = np.zeros((n_samples, len(model.classes_)), dtype=np.float64)
+    trees_evaluated = np.zeros(n_samples, dtype=np.int64)
+    exact = np.ones(n_samples, dtype=bool)
+    active = np.arange(n_samples)
+
+    evaluated = 0
+    while active.size and evaluated < n_trees:
+        stop = min(evaluated + chunk_trees, n_trees)
+        totals[active] += tree_proba_sum(X[active], evaluated, stop)
+        evaluated = stop
+        trees_evaluated[active] = evaluated
+
+        remaining = n_trees - evaluated
+        if remaining == 0:
+            break
+        gaps = _ranking_gaps(totals[active], top_n)
+        settled = gaps > remaining
+        if log_inv_delta is not None:
+            bound = 2 * math.sqrt((1 - (evaluated - 1) / n_trees) * log_inv_delta / (2 * evaluated))
+            likely = ~settled & (gaps / evaluated > bound)
+            exact[active[likely]] = False
+            settled |= likely
+        active = active[~settled]
+
+    probabilities = totals / trees_evaluated[:, None]
+    return EarlyExitResult(probabilities=probabilities, trees_evaluated=trees_evaluated, n_trees=n_trees, exact=exact)
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime
+from typing import Dict, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Background listener writing queued records (None until setup_logging is called)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    The trace id of the current request is included when it is traced, so
+    log lines can be joined with /admin/traces.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the DEBUG/INFO records of selected loggers.
+
+    Rates apply to a logger and its children ("utils" covers
+    "utils.data_utils"); the most specific configured name wins. WARNING and
+    above are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, Optional[float]] = {}
+
+    def _rate_for(self, name: str) -> Optional[float]:
+        rate = self._resolved.get(name, -1)
+        if rate != -1:
+            return rate
+        rate = None
+        candidate = name
+        while candidate:
+            if candidate in self.rates:
+                rate = self.rates[candidate]
+                break
+            candidate = candidate.rpartition(".")[0]
+        self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate is None or random.random() < rate
+
+class _TraceQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that attaches the current trace id before the record leaves the request thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        return super().prepare(record)
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse per-logger sample rates from "name=rate,name=rate".
+
+    Args:
+        spec: Rate specification, e.g. "utils.data_utils=0.01,api.recommendation_api=0.1"
+
+    Returns:
+        Dictionary mapping logger name to the fraction of records kept
+    """
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            logger.warning(f"Ignoring invalid log sample rate: {item}")
+    return rates
+
+def setup_logging(
+    log_file: Optional[str] = None,
+    level: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None
+) -> None:
+    """
+    Configure logging for the process with a non-blocking queue handler.
+
+    Records are put on an in-memory queue by the calling thread and written
+    to stderr (and log_file) by a background listener thread, so request
+    threads never wait on disk or terminal I/O. Only the first call in a
+    process configures logging; entry points call it, library modules only
+    create their loggers.
+
+    Args:
+        log_file: File name in config.LOGS_DIR (or absolute path) to also log to
+        level: Root log level, defaults to config.LOG_LEVEL
+        json_format: Write JSON lines instead of config.LOG_FORMAT, defaults to config.LOG_JSON
+        sample_rates: Per-logger fraction of DEBUG/INFO records to keep, defaults to config.LOG_SAMPLE_RATES
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or config.LOG_LEVEL
+    json_format = config.LOG_JSON if json_format is None else json_format
+    sample_rates = parse_sample_rates(config.LOG_SAMPLE_RATES) if sample_rates is None else sample_rates
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(config.LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(os.path.join(config.ensure_dir(config.LOGS_DIR), log_file)))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _TraceQueueHandler(log_queue)
+    # Records are sampled once, before they are queued (the listener runs its
+    # handlers' own filters again, so they must not sample too)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush records still in the queue when the process exits
+    atexit.register(shutdown_logging)
+
+def _log_synchronously_after_fork() -> None:
+    """
+    Replace the queue handler with the listener's handlers in forked children.
+
+    The listener thread does not survive fork and worker processes (such as
+    the ProcessPoolExecutor workers used for training) exit without running
+    atexit handlers, so children write their records directly. The queue
+    handler's sampling filter moves to those handlers.
+    """
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    filters = []
+    for handler in root.handlers[:]:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            filters.extend(handler.filters)
+            root.removeHandler(handler)
+    for handler in _listener.handlers:
+        for log_filter in filters:
+            handler.addFilter(log_filter)
+        root.addHandler(handler)
+    _listener = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_log_synchronously_after_fork)
+
+def shutdown_logging() -> None:
+    """Stop the background listener after writing any queued records."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
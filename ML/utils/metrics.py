@@ -0,0 +1,195 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+from utils.tracing import tracer
+
+# Stages of the /recommend serving path, in execution order
+RECOMMENDATION_STAGES = [
+    "request_parsing",
+    "preprocess_soil_data",
+    "normalize_features",
+    "predict_proba",
+    "top_n_reasoning",
+    "comprehensive_recommendation",
+    "serialization"
+]
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram keyed by a single label.
+
+    Bucket counters are preallocated per label when the histogram is created,
+    so observe() only does a bisect and two in-place increments: no locks and
+    no per-call allocation beyond the float sum. Increments rely on the GIL;
+    under heavy thread contention an observation can occasionally be lost,
+    which is acceptable for monitoring.
+    """
+
+    def __init__(self, name: str, description: str, label: str, label_values: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._counts = {value: [0] * (len(self.buckets) + 1) for value in label_values}
+        self._sums = {value: 0.0 for value in label_values}
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        """Record one observation for a label value."""
+        counts = self._counts.get(label_value)
+        if counts is None:
+            # Unknown labels are registered once, on first use
+            counts = self._counts.setdefault(label_value, [0] * (len(self.buckets) + 1))
+            self._sums.setdefault(label_value, 0.0)
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self._sums[label_value] += seconds
+
+    def render(self) -> List[str]:
+        """Render the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_value, counts in list(self._counts.items()):
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{upper_bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {self._sums[label_value]}')
+            lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {cumulative}')
+        return lines
+
+class Gauge:
+    """Single numeric value that can go up and down."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> List[str]:
+        """Render the gauge in the Prometheus text exposition format."""
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+class Counter:
+    """Monotonically increasing count of events since the process started."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.value += amount
+
+    def render(self) -> List[str]:
+        """Render the counter in the Prometheus text exposition format."""
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+class timed_stage:
+    """
+    Context manager that records the duration of a pipeline stage.
+
+    When the current request is traced, the stage is also recorded as a span.
+
+    Example:
+        with timed_stage("normalize_features"):
+            normalized_df = normalize_features(feature_df)
+    """
+
+    __slots__ = ("stage", "start_time", "span")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start_time = 0.0
+        self.span = None
+
+    def __enter__(self) -> "timed_stage":
+        self.span = tracer.span(self.stage)
+        self.span.__enter__()
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        STAGE_LATENCY.observe(self.stage, time.perf_counter() - self.start_time)
+        self.span.__exit__(exc_type, exc_value, traceback)
+
+STAGE_LATENCY = Histogram(
+    "recommendation_stage_seconds",
+    "Latency of each stage of the /recommend serving path",
+    "stage",
+    RECOMMENDATION_STAGES
+)
+REQUESTS_IN_FLIGHT = Gauge("recommendation_requests_in_flight", "Number of HTTP requests currently being handled")
+MODEL_LOAD_SECONDS = Gauge("model_load_seconds", "Time taken to load the serving model")
+CASCADE_READINGS = Counter("cascade_readings_total", "Readings scored by the cascade")
+CASCADE_STUDENT_ANSWERS = Counter("cascade_student_answers_total", "Readings answered by the cascade's student model without the full model")
+CASCADE_SHADOW_CHECKS = Counter("cascade_shadow_checks_total", "Student answers also scored by the full model")
+CASCADE_SHADOW_DISAGREEMENTS = Counter("cascade_shadow_disagreements_total", "Shadow-checked student answers whose top crop differs from the full model's")
+
+# Counters incremented inside predict_proba. Inference worker processes
+# (utils/shm_pool.py) send their increments back to the serving process,
+# which adds them to its own counters with add_inference_counts.
+INFERENCE_COUNTERS = {counter.name: counter for counter in (CASCADE_READINGS, CASCADE_STUDENT_ANSWERS, CASCADE_SHADOW_CHECKS, CASCADE_SHADOW_DISAGREEMENTS)}
+EARLY_EXIT_TREES = Histogram(
+    "early_exit_trees_evaluated_ratio",
+    "Fraction of the forest's trees evaluated per /recommend request with early-exit inference",
+    "ranking",
+    ["exact", "approximate"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+
+# Serving model description, reported as a constant info metric
+_model_info: Dict[str, str] = {}
+
+def set_model_info(version: str, model_type: Optional[str] = None) -> None:
+    """Record the version and type of the model being served."""
+    _model_info.clear()
+    _model_info["version"] = version
+    if model_type is not None:
+        _model_info["model_type"] = model_type
+
+def inference_counts() -> Dict[str, float]:
+    """Current values of the inference counters, by metric name."""
+    return {name: counter.value for name, counter in INFERENCE_COUNTERS.items()}
+
+def add_inference_counts(counts: Dict[str, float]) -> None:
+    """Add increments reported by an inference worker process to this process's counters."""
+    for name, amount in counts.items():
+        INFERENCE_COUNTERS[name].inc(amount)
+
+def render_metrics(extra_gauges: Optional[Dict[str, float]] = None) -> str:
+    """
+    Render all serving metrics in the Prometheus text exposition format.
+
+    Args:
+        extra_gauges: Additional point-in-time values collected at scrape time
+
+    Returns:
+        Metrics text
+    """
+    lines = STAGE_LATENCY.render() + REQUESTS_IN_FLIGHT.render() + MODEL_LOAD_SECONDS.render() + EARLY_EXIT_TREES.render()
+    for counter in INFERENCE_COUNTERS.values():
+        lines += counter.render()
+
+    if _model_info:
+        labels = ",".join(f'{key}="{value}"' for key, value in _model_info.items())
+        lines += ["# HELP model_info Model currently being served", "# TYPE model_info gauge", f"model_info{{{labels}}} 1"]
+
+    for name, value in (extra_gauges or {}).items():
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+
+    return "\n".join(lines) + "\n"
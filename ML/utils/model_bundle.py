@@ -0,0 +1,210 @@
+import os
+import io
+import sys
+import json
+import struct
+import hashlib
+import logging
+import platform
+import importlib
+import joblib
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.data_utils import NORMALIZATION_RANGES
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A bundle is laid out as
+#
+#     magic (4 bytes) | format version (uint16) | header length (uint32) | JSON header | payload
+#
+# with little-endian integers. The header describes the model (classes,
+# feature order, normalizer, imputation defaults, metrics, timings) and the
+# payload, which is the joblib-pickled estimator. Metadata can therefore be
+# read with two small reads, without unpickling the estimator.
+BUNDLE_MAGIC = b"SSMB"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_EXTENSION = ".bundle"
+_PREAMBLE = struct.Struct("<4sHI")
+
+# Parsed headers by path, reused while the file's modification time is unchanged
+_header_cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+class BundleFormatError(ValueError):
+    """Raised when a file is not a model bundle or uses an unsupported format version."""
+
+def bundle_path_for(version: Optional[str] = None) -> str:
+    """
+    Path of the versioned serving model bundle.
+
+    Args:
+        version: Model version (defaults to the one in config)
+
+    Returns:
+        Path to models/crop_recommendation_model_v<version>.bundle
+    """
+    if version is None:
+        version = config.MODEL_VERSION
+    return os.path.join(config.MODELS_DIR, f"crop_recommendation_model_v{version}{BUNDLE_EXTENSION}")
+
+def _library_versions(model: Any) -> Dict[str, str]:
+    """Versions of the libraries needed to unpickle the estimator."""
+    versions = {"python": platform.python_version()}
+    packages = {"numpy", "sklearn", type(model).__module__.split(".")[0]}
+    for package in sorted(packages):
+        try:
+            versions[package] = importlib.import_module(package).__version__
+        except (ImportError, AttributeError):
+            continue
+    return versions
+
+def build_bundle_header(model: Any, version: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Describe a trained model for the bundle header.
+
+    Args:
+        model: Trained model object
+        version: Model version
+        metadata: Training details: model_type, metrics, timings, imputation_defaults,
+            n_samples, params; any other keys are stored as given
+
+    Returns:
+        Header dictionary (without the payload section)
+    """
+    metadata = dict(metadata or {})
+    feature_names = getattr(model, "feature_names_in_", None)
+    features = [str(name) for name in feature_names] if feature_names is not None else list(config.REQUIRED_FEATURES)
+
+    header = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "model_version": version,
+        "created_at": datetime.now().isoformat(),
+        "model_type": metadata.pop("model_type", None),
+        "estimator": f"{type(model).__module__}.{type(model).__name__}",
+        "classes": [str(label) for label in getattr(model, "classes_", [])],
+        "features": features,
+        "normalizer": {
+            "method": "min-max",
+            "ranges": {feature: list(NORMALIZATION_RANGES[feature]) for feature in features if feature in NORMALIZATION_RANGES},
+            "clip": [0, 1]
+        },
+        "imputation_defaults": metadata.pop("imputation_defaults", {}),
+        "metrics": metadata.pop("metrics", {}),
+        "timings": metadata.pop("timings", {}),
+        "libraries": _library_versions(model)
+    }
+    header.update(metadata)
+    return header
+
+def write_bundle(path: str, model: Any, header: Dict[str, Any]) -> str:
+    """
+    Write a model bundle.
+
+    The file is written next to its destination and moved into place, so
+    readers never see a partial bundle.
+
+    Args:
+        path: Destination path
+        model: Trained model object (the payload)
+        header: Header built with build_bundle_header
+
+    Returns:
+        Path to the bundle
+    """
+    try:
+        payload = io.BytesIO()
+        joblib.dump(model, payload)
+        payload = payload.getbuffer()
+
+        header = {
+            **header,
+            "payload": {
+                "encoding": "joblib",
+                "size": len(payload),
+                "sha256": hashlib.sha256(payload).hexdigest()
+            }
+        }
+        header_bytes = json.dumps(header, default=_json_default).encode("utf-8")
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Model bundle saved to {path} ({len(header_bytes)} byte header, {len(payload)} byte payload)")
+        return path
+
+    except Exception as e:
+        logger.error(f"Error writing model bundle: {e}")
+        raise
+
+def _read_preamble(f: Any, path: str) -> int:
+    """Validate the fixed-size preamble and return the header length."""
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise BundleFormatError(f"{path} is too short to be a model bundle")
+    magic, format_version, header_length = _PREAMBLE.unpack(preamble)
+    if magic != BUNDLE_MAGIC:
+        raise BundleFormatError(f"{path} is not a model bundle")
+    if format_version > BUNDLE_FORMAT_VERSION:
+        raise BundleFormatError(f"{path} uses bundle format {format_version}; this version reads up to {BUNDLE_FORMAT_VERSION}")
+    return header_length
+
+def read_bundle_header(path: str) -> Dict[str, Any]:
+    """
+    Read the metadata of a model bundle without touching the estimator.
+
+    Args:
+        path: Path to the bundle
+
+    Returns:
+        Header dictionary (shared between calls; do not modify it)
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = _header_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        header_length = _read_preamble(f, path)
+        header = json.loads(f.read(header_length))
+
+    _header_cache[path] = (mtime, header)
+    return header
+
+def load_bundle(path: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Load the estimator and metadata of a model bundle.
+
+    Args:
+        path: Path to the bundle
+
+    Returns:
+        Tuple of (estimator, header)
+    """
+    with open(path, "rb") as f:
+        header_length = _read_preamble(f, path)
+        header = json.loads(f.read(header_length))
+        payload = f.read()
+
+    expected = header["payload"]
+    if len(payload) != expected["size"] or hashlib.sha256(payload).hexdigest() != expected["sha256"]:
+        raise BundleFormatError(f"{path} payload does not match its header (truncated or modified file)")
+
+    return joblib.load(io.BytesIO(payload)), header
+
+def _json_default(value: Any) -> Any:
+    """Convert NumPy scalars and arrays into JSON-serializable values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,15 +1,18 @@
 import os
+import json
+import time
 import logging
+import importlib
 import joblib
-import mlflow
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-import xgboost as xgb
-import lightgbm as lgb
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+# Training-only dependencies (scikit-learn model selection and metrics,
+# threadpoolctl, MLflow and the model backends) are imported inside the
+# functions that use them, so serving and the CLI only pay for what they use
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,6 +21,45 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import config
+from utils.metrics import timed_stage
+from utils.cpu_budget import limit_inference_threads
+
+# Model backends as model_type -> (module, class name). A backend's module is
+# imported the first time a model of that type is created; loading a saved
+# model only imports the module its class lives in.
+MODEL_BACKENDS: Dict[str, Tuple[str, str]] = {
+    "xgboost": ("utils.xgboost_backend", "XGBLabelClassifier"),
+    "lightgbm": ("lightgbm", "LGBMClassifier"),
+    "random_forest": ("sklearn.ensemble", "RandomForestClassifier"),
+    "gradient_boosting": ("sklearn.ensemble", "GradientBoostingClassifier")
+}
+
+def register_model_backend(model_type: str, module_name: str, class_name: str) -> None:
+    """
+    Register a model backend without importing it.
+    
+    Args:
+        model_type: Name used for the backend (e.g. in --model-type)
+        module_name: Module that defines the estimator class
+        class_name: Name of a scikit-learn compatible classifier class
+    """
+    MODEL_BACKENDS[model_type] = (module_name, class_name)
+
+def get_model_class(model_type: str) -> Any:
+    """
+    Import and return the estimator class of a model backend.
+    
+    Args:
+        model_type: Type of model
+    
+    Returns:
+        Estimator class
+    """
+    if model_type not in MODEL_BACKENDS:
+        logger.error(f"Unsupported model type: {model_type}")
+        raise ValueError(f"Unsupported model type: {model_type}")
+    module_name, class_name = MODEL_BACKENDS[model_type]
+    return getattr(importlib.import_module(module_name), class_name)
 
 def initialize_mlflow():
     """Initialize MLflow tracking."""
@@ -26,7 +68,10 @@ def initialize_mlflow():
         if os.getenv("SKIP_MLFLOW", "false").lower() == "true":
             logger.info("Skipping MLflow initialization as requested by environment variable")
             return False
-            
+        
+        # Only import MLflow when tracking is enabled
+        import mlflow
+        
         mlflow.set_tracking_uri(config.MLFLOW_TRACKING_URI)
         mlflow.set_experiment(config.MLFLOW_EXPERIMENT_NAME)
         logger.info(f"MLflow initialized: {config.MLFLOW_TRACKING_URI}, experiment: {config.MLFLOW_EXPERIMENT_NAME}")
@@ -39,16 +84,24 @@ def train_model(
     X: pd.DataFrame, 
     y: pd.Series, 
     model_type: str = "xgboost", 
-    params: Optional[Dict[str, Any]] = None
+    params: Optional[Dict[str, Any]] = None,
+    cv_folds: Optional[int] = None,
+    n_jobs: Optional[int] = None
 ) -> Tuple[Any, Dict[str, float]]:
     """
     Train a machine learning model for crop recommendation.
     
+    By default the model is evaluated on a single 80/20 split. When cv_folds
+    is given, it is evaluated with stratified k-fold cross-validation instead
+    (see cross_validate_model) and the returned model is fitted on all samples.
+    
     Args:
         X: Feature DataFrame
         y: Target Series (crop names)
         model_type: Type of model to train ('xgboost', 'lightgbm', 'random_forest', or 'gradient_boosting')
         params: Optional parameters for the model
+        cv_folds: Optional number of cross-validation folds
+        n_jobs: Number of parallel worker processes for cross-validation
     
     Returns:
         Tuple of (trained model, performance metrics)
@@ -57,40 +110,31 @@ def train_model(
         # Initialize MLflow for experiment tracking
         mlflow_enabled = initialize_mlflow()
         
-        # Split data into training and validation sets
-        X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        logger.info(f"Training {model_type} model with {len(X_train)} samples")
-        
         # Set default parameters if not provided
         if params is None:
             params = get_default_model_params(model_type)
         
         # Train the appropriate model based on model_type
         if mlflow_enabled:
+            import mlflow
+            import mlflow.sklearn
+            
             with mlflow.start_run():
                 # Log model parameters
                 mlflow.log_params(params)
                 
-                model = _create_and_train_model(model_type, params, X_train, y_train)
+                model, metrics = _train_and_evaluate(X, y, model_type, params, cv_folds, n_jobs)
                 
-                # Evaluate the model
-                y_pred = model.predict(X_val)
-                metrics = evaluate_model(y_val, y_pred)
-                
-                # Log metrics to MLflow
+                # Log metrics to MLflow (per-fold details are not scalar)
                 for metric_name, metric_value in metrics.items():
-                    mlflow.log_metric(metric_name, metric_value)
+                    if isinstance(metric_value, (int, float)):
+                        mlflow.log_metric(metric_name, metric_value)
                 
                 # Log the model to MLflow
                 mlflow.sklearn.log_model(model, "model")
         else:
             # Train without MLflow
-            model = _create_and_train_model(model_type, params, X_train, y_train)
-            
-            # Evaluate the model
-            y_pred = model.predict(X_val)
-            metrics = evaluate_model(y_val, y_pred)
+            model, metrics = _train_and_evaluate(X, y, model_type, params, cv_folds, n_jobs)
         
         logger.info(f"Model training completed. Accuracy: {metrics['accuracy']:.4f}")
         
@@ -100,6 +144,161 @@ def train_model(
         logger.error(f"Error training model: {e}")
         raise
 
+def _train_and_evaluate(
+    X: pd.DataFrame,
+    y: pd.Series,
+    model_type: str,
+    params: Dict[str, Any],
+    cv_folds: Optional[int],
+    n_jobs: Optional[int]
+) -> Tuple[Any, Dict[str, Any]]:
+    """Train a model and evaluate it on a holdout split or with k-fold cross-validation."""
+    from sklearn.model_selection import train_test_split
+    
+    if cv_folds:
+        return cross_validate_model(X, y, model_type, params, n_folds=cv_folds, n_jobs=n_jobs)
+    
+    # Split data into training and validation sets
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    
+    logger.info(f"Training {model_type} model with {len(X_train)} samples")
+    
+    model = _create_and_train_model(model_type, params, X_train, y_train)
+    
+    # Evaluate the model
+    y_pred = model.predict(X_val)
+    metrics = evaluate_model(y_val, y_pred)
+    
+    return model, metrics
+
+def _fit_and_score_fold(
+    model_type: str,
+    params: Dict[str, Any],
+    X: pd.DataFrame,
+    y: pd.Series,
+    train_idx: Optional[np.ndarray],
+    val_idx: Optional[np.ndarray],
+    n_threads: int
+) -> Tuple[Any, Dict[str, float]]:
+    """
+    Fit one cross-validation fold inside a worker process.
+    
+    With train_idx/val_idx set to None the model is fitted on all samples and
+    not scored; this is the final model returned by cross_validate_model.
+    
+    Returns:
+        Tuple of (trained model or None for scored folds, fold metrics and timings)
+    """
+    from threadpoolctl import threadpool_limits
+    
+    if model_type in ("xgboost", "lightgbm", "random_forest"):
+        params = {**params, "n_jobs": n_threads}
+    
+    with threadpool_limits(limits=n_threads):
+        X_train = X if train_idx is None else X.iloc[train_idx]
+        y_train = y if train_idx is None else y.iloc[train_idx]
+        
+        start_time = time.perf_counter()
+        model = _create_and_train_model(model_type, params, X_train, y_train)
+        fit_time = time.perf_counter() - start_time
+        
+        if val_idx is None:
+            return model, {"fit_time": fit_time}
+        
+        start_time = time.perf_counter()
+        y_pred = model.predict(X.iloc[val_idx])
+        predict_time = time.perf_counter() - start_time
+    
+    fold_metrics = evaluate_model(y.iloc[val_idx], y_pred)
+    fold_metrics.update({
+        "n_train": len(train_idx),
+        "n_val": len(val_idx),
+        "fit_time": fit_time,
+        "predict_time": predict_time
+    })
+    return None, fold_metrics
+
+def cross_validate_model(
+    X: pd.DataFrame,
+    y: pd.Series,
+    model_type: str,
+    params: Dict[str, Any],
+    n_folds: int = 5,
+    n_jobs: Optional[int] = None,
+    random_state: int = 42
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Evaluate a model with stratified k-fold cross-validation in parallel.
+    
+    The folds (stratified by crop) and the final fit on all samples run
+    concurrently in worker processes, so with n_folds + 1 cores the wall
+    time is close to a single fit.
+    
+    Args:
+        X: Feature DataFrame
+        y: Target Series (crop names)
+        model_type: Type of model to train
+        params: Parameters for the model
+        n_folds: Number of folds
+        n_jobs: Number of worker processes (defaults to one per fold plus the final fit, up to the core count)
+        random_state: Random seed for the fold shuffling
+    
+    Returns:
+        Tuple of (model fitted on all samples, metrics with mean, std and per-fold results)
+    """
+    n_tasks = n_folds + 1
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = min(n_tasks, config.CPU_CORES)
+    n_threads = max(1, config.CPU_CORES // n_jobs)
+    
+    from sklearn.model_selection import StratifiedKFold
+    
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    splits = list(splitter.split(X, y))
+    
+    logger.info(f"Cross-validating {model_type} model with {n_folds} folds in {n_jobs} worker processes")
+    
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        # Submit the full fit first: it is the longest task
+        final_future = executor.submit(_fit_and_score_fold, model_type, params, X, y, None, None, n_threads)
+        fold_futures = [
+            executor.submit(_fit_and_score_fold, model_type, params, X, y, train_idx, val_idx, n_threads)
+            for train_idx, val_idx in splits
+        ]
+        folds = [future.result()[1] for future in fold_futures]
+        model, final_timing = final_future.result()
+    wall_time = time.perf_counter() - start_time
+    
+    metrics = {}
+    for name in ("accuracy", "precision", "recall", "f1", "fit_time", "predict_time"):
+        values = [fold[name] for fold in folds]
+        metrics[name] = float(np.mean(values))
+        metrics[f"{name}_std"] = float(np.std(values))
+    metrics["final_fit_time"] = final_timing["fit_time"]
+    metrics["wall_time"] = wall_time
+    metrics["folds"] = [{"fold": i, **fold} for i, fold in enumerate(folds)]
+    
+    logger.info(
+        f"Cross-validation accuracy: {metrics['accuracy']:.4f} +/- {metrics['accuracy_std']:.4f} "
+        f"(wall time {wall_time:.2f}s, mean fold fit {metrics['fit_time']:.2f}s)"
+    )
+    
+    return model, metrics
+
+def _create_model(model_type: str, params: Dict[str, Any]) -> Any:
+    """
+    Create an untrained model of the specified type.
+    
+    Args:
+        model_type: Type of model to create (a key of MODEL_BACKENDS)
+        params: Parameters for the model
+    
+    Returns:
+        Untrained model
+    """
+    return get_model_class(model_type)(**params)
+
 def _create_and_train_model(model_type: str, params: Dict[str, Any], X_train: pd.DataFrame, y_train: pd.Series) -> Any:
     """
     Create and train a model of the specified type.
@@ -113,22 +312,194 @@ def _create_and_train_model(model_type: str, params: Dict[str, Any], X_train: pd
     Returns:
         Trained model
     """
-    if model_type == "xgboost":
-        model = xgb.XGBClassifier(**params)
-    elif model_type == "lightgbm":
-        model = lgb.LGBMClassifier(**params)
-    elif model_type == "random_forest":
-        model = RandomForestClassifier(**params)
-    elif model_type == "gradient_boosting":
-        model = GradientBoostingClassifier(**params)
-    else:
-        logger.error(f"Unsupported model type: {model_type}")
-        raise ValueError(f"Unsupported model type: {model_type}")
+    model = _create_model(model_type, params)
     
     # Train the model
     model.fit(X_train, y_train)
     return model
 
+def _profile_inference(model: Any, X_val: pd.DataFrame, n_repeats: int = 50) -> Dict[str, float]:
+    """
+    Measure single-row and batch predict_proba latency of a trained model.
+    
+    Args:
+        model: Trained model object
+        X_val: Validation features used as inference input
+        n_repeats: Number of timed single-row calls
+    
+    Returns:
+        Dictionary of latency statistics in milliseconds
+    """
+    single_row = X_val.iloc[[0]]
+    
+    # Warm up caches and lazily initialized thread pools before timing
+    for _ in range(3):
+        model.predict_proba(single_row)
+    
+    single_times = []
+    for _ in range(n_repeats):
+        start_time = time.perf_counter()
+        model.predict_proba(single_row)
+        single_times.append((time.perf_counter() - start_time) * 1000)
+    
+    batch_times = []
+    for _ in range(5):
+        start_time = time.perf_counter()
+        model.predict_proba(X_val)
+        batch_times.append((time.perf_counter() - start_time) * 1000)
+    batch_ms = float(np.median(batch_times))
+    
+    return {
+        "single_row_p50_ms": float(np.percentile(single_times, 50)),
+        "single_row_p95_ms": float(np.percentile(single_times, 95)),
+        "batch_size": len(X_val),
+        "batch_ms": batch_ms,
+        "batch_per_row_us": batch_ms * 1000 / len(X_val)
+    }
+
+def _train_candidate(
+    model_type: str,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_val: pd.DataFrame,
+    y_val: pd.Series,
+    n_threads: int,
+    search: bool = False,
+    random_state: int = 42
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Train, evaluate and profile one model type inside a worker process.
+    
+    The worker is held to n_threads: the estimator's own n_jobs and any
+    OpenMP/BLAS pools it uses are capped so concurrent jobs do not fight
+    over the same cores.
+    
+    Returns:
+        Tuple of (trained model, comparison row)
+    """
+    from threadpoolctl import threadpool_limits
+    
+    with threadpool_limits(limits=n_threads):
+        search_summary = None
+        if search:
+            params, search_summary = search_model_params(
+                X_train, y_train, model_type=model_type, n_jobs=n_threads, random_state=random_state
+            )
+        else:
+            params = get_default_model_params(model_type)
+        
+        if model_type in ("xgboost", "lightgbm", "random_forest"):
+            params = {**params, "n_jobs": n_threads}
+        
+        start_time = time.perf_counter()
+        model = _create_and_train_model(model_type, params, X_train, y_train)
+        fit_seconds = time.perf_counter() - start_time
+        
+        metrics = evaluate_model(y_val, model.predict(X_val))
+        latency = _profile_inference(model, X_val)
+    
+    row = {
+        "model_type": model_type,
+        "n_threads": n_threads,
+        "fit_seconds": round(fit_seconds, 3),
+        **metrics,
+        **latency
+    }
+    if search_summary is not None:
+        row["search"] = search_summary
+    
+    return model, row
+
+def train_all_models(
+    X: pd.DataFrame,
+    y: pd.Series,
+    model_types: Optional[List[str]] = None,
+    n_workers: Optional[int] = None,
+    threads_per_job: Optional[int] = None,
+    max_latency_ms: Optional[float] = None,
+    search: bool = False,
+    random_state: int = 42
+) -> Tuple[Optional[str], Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Train every model backend concurrently and pick the one to promote.
+    
+    Each backend is trained in its own worker process on the same 80/20 split
+    used by train_model, then evaluated for validation accuracy and for
+    single-row and batch inference latency. The promoted model is the most
+    accurate one whose single-row p50 latency is under max_latency_ms.
+    
+    Args:
+        X: Feature DataFrame
+        y: Target Series (crop names)
+        model_types: Backends to train (defaults to config.MODEL_TYPES)
+        n_workers: Number of concurrent worker processes (defaults to one per backend)
+        threads_per_job: CPU threads each job may use (defaults to an even share of the cores)
+        max_latency_ms: Single-row latency ceiling (defaults to config.MAX_INFERENCE_LATENCY_MS)
+        search: Whether to run the hyperparameter search for each backend
+        random_state: Random seed for reproducibility
+    
+    Returns:
+        Tuple of (best model type or None, trained models by type, comparison table)
+    """
+    if model_types is None:
+        model_types = config.MODEL_TYPES
+    if n_workers is None:
+        n_workers = len(model_types)
+    if threads_per_job is None:
+        threads_per_job = max(1, config.CPU_CORES // n_workers)
+    if max_latency_ms is None:
+        max_latency_ms = config.MAX_INFERENCE_LATENCY_MS
+    
+    from sklearn.model_selection import train_test_split
+    
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=random_state)
+    
+    logger.info(f"Training {model_types} in {n_workers} worker processes with {threads_per_job} thread(s) each")
+    
+    models = {}
+    comparison = []
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {
+            model_type: executor.submit(
+                _train_candidate, model_type, X_train, y_train, X_val, y_val,
+                threads_per_job, search, random_state
+            )
+            for model_type in model_types
+        }
+        
+        for model_type, future in futures.items():
+            try:
+                model, row = future.result()
+                models[model_type] = model
+                logger.info(
+                    f"{model_type}: accuracy={row['accuracy']:.4f}, "
+                    f"single-row p50={row['single_row_p50_ms']:.2f}ms, "
+                    f"batch={row['batch_per_row_us']:.1f}us/row"
+                )
+            except Exception as e:
+                logger.error(f"Error training {model_type} model: {e}")
+                row = {"model_type": model_type, "error": str(e)}
+            comparison.append(row)
+    
+    # Most accurate model under the latency ceiling, faster model on ties
+    eligible = [
+        row for row in comparison
+        if "error" not in row and row["single_row_p50_ms"] <= max_latency_ms
+    ]
+    best_model_type = None
+    if eligible:
+        best = max(eligible, key=lambda row: (row["accuracy"], -row["single_row_p50_ms"]))
+        best_model_type = best["model_type"]
+        logger.info(f"Selected {best_model_type} (accuracy {best['accuracy']:.4f}) under {max_latency_ms}ms latency ceiling")
+    else:
+        logger.warning(f"No model met the {max_latency_ms}ms single-row latency ceiling")
+    
+    for row in comparison:
+        row["within_latency_ceiling"] = row in eligible
+        row["selected"] = row["model_type"] == best_model_type
+    
+    return best_model_type, models, comparison
+
 def get_default_model_params(model_type: str) -> Dict[str, Any]:
     """
     Get default parameters for the specified model type.
@@ -178,6 +549,152 @@ def get_default_model_params(model_type: str) -> Dict[str, Any]:
         logger.warning(f"No default parameters for model type: {model_type}")
         return {}
 
+def get_model_param_grid(model_type: str) -> Dict[str, List[Any]]:
+    """
+    Get the hyperparameter search space for the specified model type.
+    
+    Args:
+        model_type: Type of model ('xgboost', 'lightgbm', 'random_forest', or 'gradient_boosting')
+    
+    Returns:
+        Dictionary mapping parameter names to candidate values
+    """
+    if model_type == "xgboost":
+        return {
+            "n_estimators": [100, 200, 400],
+            "max_depth": [3, 5, 7],
+            "learning_rate": [0.05, 0.1, 0.2],
+            "subsample": [0.8, 1.0],
+            "colsample_bytree": [0.8, 1.0]
+        }
+    elif model_type == "lightgbm":
+        return {
+            "n_estimators": [100, 200, 400],
+            "max_depth": [3, 5, -1],
+            "learning_rate": [0.05, 0.1, 0.2],
+            "num_leaves": [15, 31, 63],
+            "colsample_bytree": [0.8, 1.0]
+        }
+    elif model_type == "random_forest":
+        return {
+            "n_estimators": [100, 200, 400],
+            "max_depth": [6, 10, 16, None],
+            "min_samples_split": [2, 5, 10],
+            "min_samples_leaf": [1, 2, 4]
+        }
+    elif model_type == "gradient_boosting":
+        return {
+            "n_estimators": [100, 200],
+            "max_depth": [3, 5],
+            "learning_rate": [0.05, 0.1, 0.2],
+            "subsample": [0.8, 1.0]
+        }
+    else:
+        logger.warning(f"No parameter grid for model type: {model_type}")
+        return {}
+
+def search_model_params(
+    X: pd.DataFrame,
+    y: pd.Series,
+    model_type: str = "xgboost",
+    n_jobs: int = -1,
+    factor: int = 3,
+    cv: int = 5,
+    random_state: int = 42
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Tune hyperparameters for a model type using successive halving.
+    
+    Every candidate in the parameter grid is first fitted on a small subset of
+    the samples; only the best 1/factor of the candidates survive to the next
+    round, which gets factor times more samples. Candidates are evaluated in
+    parallel across n_jobs worker processes.
+    
+    Args:
+        X: Feature DataFrame
+        y: Target Series (crop names)
+        model_type: Type of model to tune
+        n_jobs: Number of parallel jobs (-1 uses all cores)
+        factor: Halving factor between successive rounds
+        cv: Number of cross-validation folds per candidate
+        random_state: Random seed for reproducibility
+    
+    Returns:
+        Tuple of (best parameters, search summary with the full timing/score table)
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+    from sklearn.model_selection import HalvingGridSearchCV
+    
+    try:
+        param_grid = get_model_param_grid(model_type)
+        if not param_grid:
+            raise ValueError(f"Hyperparameter search is not supported for model type: {model_type}")
+        
+        # Start from the defaults so fixed settings (objective, seed) are kept.
+        # Each candidate is pinned to a single thread because the search itself
+        # already runs one candidate per core.
+        base_params = get_default_model_params(model_type)
+        if model_type in ("xgboost", "lightgbm", "random_forest"):
+            base_params["n_jobs"] = 1
+        
+        search = HalvingGridSearchCV(
+            _create_model(model_type, base_params),
+            param_grid,
+            factor=factor,
+            cv=cv,
+            scoring="accuracy",
+            n_jobs=n_jobs,
+            random_state=random_state,
+            refit=False,
+            error_score=np.nan
+        )
+        
+        n_candidates = int(np.prod([len(values) for values in param_grid.values()]))
+        logger.info(f"Searching {n_candidates} {model_type} parameter candidates with successive halving (n_jobs={n_jobs})")
+        
+        start_time = time.perf_counter()
+        search.fit(X, y)
+        elapsed = time.perf_counter() - start_time
+        
+        results = search.cv_results_
+        table = []
+        for i, candidate_params in enumerate(results["params"]):
+            table.append({
+                "iteration": int(results["iter"][i]),
+                "n_resources": int(results["n_resources"][i]),
+                "params": candidate_params,
+                "mean_fit_time": float(results["mean_fit_time"][i]),
+                "std_fit_time": float(results["std_fit_time"][i]),
+                "mean_score_time": float(results["mean_score_time"][i]),
+                "std_score_time": float(results["std_score_time"][i]),
+                "mean_test_score": float(results["mean_test_score"][i]),
+                "std_test_score": float(results["std_test_score"][i]),
+                "rank_test_score": int(results["rank_test_score"][i])
+            })
+        
+        best_params = {**get_default_model_params(model_type), **search.best_params_}
+        summary = {
+            "model_type": model_type,
+            "method": "successive_halving",
+            "factor": factor,
+            "cv": cv,
+            "n_candidates": n_candidates,
+            "n_iterations": int(search.n_iterations_),
+            "n_resources": [int(n) for n in search.n_resources_],
+            "elapsed_seconds": round(elapsed, 3),
+            "best_params": best_params,
+            "best_score": float(search.best_score_),
+            "results": table
+        }
+        
+        logger.info(f"Search completed in {elapsed:.1f}s. Best accuracy: {search.best_score_:.4f} with {search.best_params_}")
+        
+        return best_params, summary
+    
+    except Exception as e:
+        logger.error(f"Error searching model parameters: {e}")
+        raise
+
 def evaluate_model(y_true, y_pred):
     """
     Evaluate model performance on predictions.
@@ -189,6 +706,8 @@ def evaluate_model(y_true, y_pred):
     Returns:
         Dictionary of performance metrics
     """
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+    
     try:
         # Calculate metrics
         metrics = {
@@ -204,25 +723,31 @@ def evaluate_model(y_true, y_pred):
         # Return basic metrics if we encounter an error
         return {'accuracy': 0.0, 'precision': 0.0, 'recall': 0.0, 'f1': 0.0}
 
-def save_model(model: Any, version: Optional[str] = None) -> str:
+def save_model(model: Any, version: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> str:
     """
-    Save the trained model to disk.
+    Save the trained model to disk as a self-describing model bundle.
+    
+    The bundle's header (classes, feature order, normalizer, imputation
+    defaults, metrics and timings) can be read without unpickling the model;
+    see utils/model_bundle.py.
     
     Args:
         model: Trained model object
         version: Optional version string (defaults to the one in config)
+        metadata: Optional training details for the header (model_type, metrics,
+            timings, imputation_defaults, n_samples, params)
     
     Returns:
         Path to the saved model
     """
+    from utils.model_bundle import build_bundle_header, write_bundle, bundle_path_for
+    
     try:
         if version is None:
             version = config.MODEL_VERSION
         
-        model_filename = f"crop_recommendation_model_v{version}.joblib"
-        model_path = os.path.join(config.MODELS_DIR, model_filename)
-        
-        joblib.dump(model, model_path)
+        config.ensure_dir(config.MODELS_DIR)
+        model_path = write_bundle(bundle_path_for(version), model, build_bundle_header(model, version, metadata))
         logger.info(f"Model saved to {model_path}")
         
         return model_path
@@ -231,16 +756,59 @@ def save_model(model: Any, version: Optional[str] = None) -> str:
         logger.error(f"Error saving model: {e}")
         raise
 
+def write_model_manifest(model_path: str, manifest: Dict[str, Any]) -> str:
+    """
+    Write a JSON manifest describing a saved model next to the model file.
+    
+    Args:
+        model_path: Path to the saved model
+        manifest: Manifest contents (parameters, metrics, search results, ...)
+    
+    Returns:
+        Path to the manifest file
+    """
+    try:
+        manifest_path = os.path.splitext(model_path)[0] + ".manifest.json"
+        
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+        logger.info(f"Model manifest saved to {manifest_path}")
+        
+        return manifest_path
+    
+    except Exception as e:
+        logger.error(f"Error writing model manifest: {e}")
+        raise
+
+def _json_default(value: Any) -> Any:
+    """Convert NumPy scalars and arrays into JSON-serializable values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 def load_model(version: Optional[str] = None) -> Any:
     """
     Load a saved model from disk.
     
+    The model bundle is loaded when there is one; models saved as bare joblib
+    files by earlier versions are still loaded from their .joblib path.
+    With config.INFERENCE_BACKEND set to "onnx", the ONNX graph exported next
+    to the model is loaded into an onnxruntime-backed predictor; with
+    "compact", the compacted forest saved next to it is loaded instead.
+    With config.INFERENCE_CASCADE, the model is wrapped in a cascade behind
+    the distilled student saved next to it (see utils/cascade.py). The
+    model is held to config.INFERENCE_THREADS threads per call.
+    
     Args:
         version: Optional version string (defaults to the one in config)
     
     Returns:
         Loaded model object
     """
+    from utils.model_bundle import bundle_path_for, load_bundle
+    
     try:
         if version is None:
             version = config.MODEL_VERSION
@@ -248,20 +816,77 @@ def load_model(version: Optional[str] = None) -> Any:
         model_filename = f"crop_recommendation_model_v{version}.joblib"
         model_path = os.path.join(config.MODELS_DIR, model_filename)
         
-        if not os.path.exists(model_path):
-            logger.error(f"Model file not found: {model_path}")
-            raise FileNotFoundError(f"Model file not found: {model_path}")
+        if config.INFERENCE_BACKEND == "onnx":
+            from utils.onnx_backend import load_onnx_model, onnx_path_for
+            model = load_onnx_model(onnx_path_for(model_path))
+            logger.info(f"ONNX model loaded from {model.onnx_path}")
+        elif config.INFERENCE_BACKEND != "compact" and os.path.exists(bundle_path_for(version)):
+            model, _ = load_bundle(bundle_path_for(version))
+            logger.info(f"Model loaded from {bundle_path_for(version)}")
+        else:
+            if config.INFERENCE_BACKEND == "compact":
+                from utils.compact_forest import compact_path_for
+                model_path = compact_path_for(model_path)
+            
+            if not os.path.exists(model_path):
+                logger.error(f"Model file not found: {model_path}")
+                raise FileNotFoundError(f"Model file not found: {model_path}")
+            
+            model = joblib.load(model_path)
+            logger.info(f"Model loaded from {model_path}")
         
-        model = joblib.load(model_path)
-        logger.info(f"Model loaded from {model_path}")
+        if config.INFERENCE_CASCADE:
+            from utils.cascade import load_cascade
+            model = load_cascade(model, bundle_path_for(version))
         
-        return model
+        return limit_inference_threads(model)
     
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         raise
 
-def predict_crops(model: Any, soil_data: pd.DataFrame, top_n: int = 3) -> List[Dict[str, Any]]:
+def read_model_header(version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Read the metadata of a saved model without loading the model itself.
+    
+    Args:
+        version: Optional version string (defaults to the one in config)
+    
+    Returns:
+        Bundle header, or None when the model was saved without a bundle
+    """
+    from utils.model_bundle import bundle_path_for, read_bundle_header
+    
+    path = bundle_path_for(version)
+    if not os.path.exists(path):
+        return None
+    return read_bundle_header(path)
+
+def predict_proba_matrix(model: Any, features: np.ndarray, columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Class probabilities for a normalized feature matrix.
+    
+    Models fitted on DataFrames expect their feature names, so the matrix is
+    wrapped in a DataFrame view (no per-value copies) with the columns in the
+    order the model was trained on.
+    
+    Args:
+        model: Trained model object
+        features: Normalized array of shape (n_readings, n_features)
+        columns: Feature name of each column, defaults to config.REQUIRED_FEATURES
+    
+    Returns:
+        Array of shape (n_readings, n_classes), columns in model.classes_ order
+    """
+    columns = columns or config.REQUIRED_FEATURES
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is not None:
+        features = pd.DataFrame(features, columns=columns, copy=False)
+        if list(feature_names) != list(columns):
+            features = features[list(feature_names)]
+    return model.predict_proba(features)
+
+def predict_crops(model: Any, soil_data: pd.DataFrame, top_n: int = 3, record_stages: bool = False) -> List[Dict[str, Any]]:
     """
     Predict suitable crops for the given soil data.
     
@@ -269,58 +894,75 @@ def predict_crops(model: Any, soil_data: pd.DataFrame, top_n: int = 3) -> List[D
         model: Trained model object
         soil_data: DataFrame containing soil data
         top_n: Number of top crops to recommend
+        record_stages: Record the predict_proba and top_n_reasoning stage latencies
+            (only /recommend does, so batch and benchmark runs stay out of the serving histograms)
     
     Returns:
         List of dictionaries containing crop recommendations with confidence scores
     """
+    stage = timed_stage if record_stages else nullcontext
     try:
         # Get probability predictions for all crop classes
-        probabilities = model.predict_proba(soil_data)
+        with stage("predict_proba"):
+            probabilities = model.predict_proba(soil_data)
         
-        # Get crop class names
-        crop_classes = model.classes_
-        
-        # Create a list to store recommendations for each soil sample
-        all_recommendations = []
+        with stage("top_n_reasoning"):
+            return rank_crops(model.classes_, probabilities, soil_data, top_n)
+    
+    except Exception as e:
+        logger.error(f"Error predicting crops: {e}")
+        return []
+
+def rank_crops(crop_classes: Any, probabilities: np.ndarray, soil_data: pd.DataFrame, top_n: int = 3) -> List[Dict[str, Any]]:
+    """
+    Rank the crops of each soil sample by probability and explain the top N.
+    
+    Args:
+        crop_classes: Crop names, in the column order of probabilities
+        probabilities: Array of shape (n_samples, n_classes)
+        soil_data: DataFrame containing the soil data the probabilities were predicted for
+        top_n: Number of top crops to recommend
+    
+    Returns:
+        List of dictionaries containing crop recommendations with confidence scores
+    """
+    # Create a list to store recommendations for each soil sample
+    all_recommendations = []
+    
+    for i, probs in enumerate(probabilities):
+        # Get indices of top N crops by probability
+        top_indices = np.argsort(probs)[::-1][:top_n]
         
-        for i, probs in enumerate(probabilities):
-            # Get indices of top N crops by probability
-            top_indices = np.argsort(probs)[::-1][:top_n]
+        # Create recommendations for this soil sample
+        recommendations = []
+        for idx in top_indices:
+            crop_name = crop_classes[idx]
+            confidence = probs[idx] * 100  # Convert to percentage
             
-            # Create recommendations for this soil sample
-            recommendations = []
-            for idx in top_indices:
-                crop_name = crop_classes[idx]
-                confidence = probs[idx] * 100  # Convert to percentage
-                
-                # Determine confidence level
-                if confidence >= config.HIGH_CONFIDENCE:
-                    confidence_level = "High"
-                elif confidence >= config.MEDIUM_CONFIDENCE:
-                    confidence_level = "Medium"
-                else:
-                    confidence_level = "Low"
-                
-                # Get the optimal conditions for this crop
-                optimal_conditions = config.CROP_OPTIMAL_CONDITIONS.get(crop_name, {})
-                
-                # Generate reasoning based on soil conditions
-                reasoning = generate_crop_reasoning(soil_data.iloc[i], crop_name, optimal_conditions)
-                
-                recommendations.append({
-                    "crop": crop_name,
-                    "confidence": round(confidence, 2),
-                    "confidence_level": confidence_level,
-                    "reasoning": reasoning
-                })
+            # Determine confidence level
+            if confidence >= config.HIGH_CONFIDENCE:
+                confidence_level = "High"
+            elif confidence >= config.MEDIUM_CONFIDENCE:
+                confidence_level = "Medium"
+            else:
+                confidence_level = "Low"
+            
+            # Get the optimal conditions for this crop
+            optimal_conditions = config.CROP_OPTIMAL_CONDITIONS.get(crop_name, {})
+            
+            # Generate reasoning based on soil conditions
+            reasoning = generate_crop_reasoning(soil_data.iloc[i], crop_name, optimal_conditions)
             
-            all_recommendations.append(recommendations)
+            recommendations.append({
+                "crop": crop_name,
+                "confidence": round(confidence, 2),
+                "confidence_level": confidence_level,
+                "reasoning": reasoning
+            })
         
-        return all_recommendations
+        all_recommendations.append(recommendations)
     
-    except Exception as e:
-        logger.error(f"Error predicting crops: {e}")
-        return []
+    return all_recommendations
 
 def generate_crop_reasoning(soil_sample: pd.Series, crop_name: str, optimal_conditions: Dict[str, Tuple[float, float]]) -> str:
     """
@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# The converters and onnxruntime are optional; they are imported when an
+# ONNX model is first exported or loaded
+
+def onnx_path_for(model_path: str) -> str:
+    """Path of the ONNX graph exported next to a joblib model artifact."""
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+def convert_to_onnx(model: Any, n_features: int) -> Any:
+    """
+    Convert a trained model to an ONNX graph with a float32 input and a probability output.
+
+    Random forests and gradient boosting are converted with skl2onnx,
+    XGBoost and LightGBM with onnxmltools.
+
+    Args:
+        model: Trained model produced by _create_and_train_model
+        n_features: Number of input features
+
+    Returns:
+        onnx.ModelProto whose second output holds the class probabilities
+    """
+    model_class = type(model).__name__
+
+    if model_class == "XGBLabelClassifier" or model_class == "XGBClassifier":
+        import onnxmltools
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        # The converter works on the booster and only accepts f0..fN feature names
+        booster = model.get_booster().copy()
+        booster.feature_names = None
+        booster.feature_types = None
+        return onnxmltools.convert_xgboost(booster, initial_types=[("input", FloatTensorType([None, n_features]))])
+
+    if model_class == "LGBMClassifier":
+        import onnxmltools
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        return onnxmltools.convert_lightgbm(model, initial_types=[("input", FloatTensorType([None, n_features]))], zipmap=False)
+
+    if model_class in ("RandomForestClassifier", "GradientBoostingClassifier"):
+        import skl2onnx
+        from skl2onnx.common.data_types import FloatTensorType
+        return skl2onnx.convert_sklearn(
+            model,
+            initial_types=[("input", FloatTensorType([None, n_features]))],
+            options={id(model): {"zipmap": False}}
+        )
+
+    raise ValueError(f"No ONNX converter for {model_class}")
+
+def export_onnx(model: Any, model_path: str, X_sample: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Export a trained model as an ONNX graph next to its joblib artifact.
+
+    The class labels and feature order are stored in the graph's metadata,
+    and the exported graph is checked against the original model on X_sample.
+
+    Args:
+        model: Trained model object
+        model_path: Path of the joblib artifact (the graph is written with an .onnx extension)
+        X_sample: Features (in training column order) used for the parity check
+
+    Returns:
+        Export summary with the ONNX path and parity statistics
+    """
+    try:
+        feature_names = [str(name) for name in getattr(model, "feature_names_in_", X_sample.columns)]
+        onnx_model = convert_to_onnx(model, len(feature_names))
+
+        metadata = {
+            "classes": json.dumps([str(label) for label in model.classes_]),
+            "feature_names": json.dumps(feature_names),
+            "source_model": type(model).__name__
+        }
+        for key, value in metadata.items():
+            entry = onnx_model.metadata_props.add()
+            entry.key = key
+            entry.value = value
+
+        onnx_path = onnx_path_for(model_path)
+        with open(onnx_path, "wb") as f:
+            f.write(onnx_model.SerializeToString())
+
+        # Check the exported graph against the original model
+        predictor = OnnxPredictor(onnx_path)
+        expected = model.predict_proba(X_sample[feature_names])
+        actual = predictor.predict_proba(X_sample)
+        summary = {
+            "onnx_path": onnx_path,
+            "onnx_bytes": os.path.getsize(onnx_path),
+            "parity_rows": len(X_sample),
+            "max_abs_diff": float(np.abs(actual - expected).max()) if len(X_sample) else 0.0,
+            "top1_agreement": float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1))) if len(X_sample) else 1.0
+        }
+        logger.info(
+            f"ONNX model saved to {onnx_path} (max |diff| {summary['max_abs_diff']:.2e}, "
+            f"top-1 agreement {summary['top1_agreement']:.4f} on {len(X_sample)} rows)"
+        )
+        return summary
+
+    except Exception as e:
+        logger.error(f"Error exporting ONNX model: {e}")
+        raise
+
+class OnnxPredictor:
+    """
+    Crop classifier backed by an onnxruntime CPU session.
+
+    It exposes the parts of the estimator interface the serving path uses
+    (classes_, feature_names_in_, predict_proba, predict), so it can be
+    served in place of the joblib model. Probabilities are float32.
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: Optional[int] = None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        threads = config.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        options.intra_op_num_threads = threads or config.INFERENCE_THREADS
+        options.inter_op_num_threads = 1
+        self.intra_op_threads = options.intra_op_num_threads
+        self.onnx_path = onnx_path
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.classes_ = np.array(json.loads(metadata["classes"]), dtype=object)
+        self.feature_names_in_ = np.array(json.loads(metadata["feature_names"]), dtype=object)
+        self.source_model = metadata.get("source_model")
+        self.n_features_in_ = len(self.feature_names_in_)
+        self._input_name = self.session.get_inputs()[0].name
+        self._output_name = self.session.get_outputs()[1].name
+
+    def _as_input(self, X: Any) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[list(self.feature_names_in_)].to_numpy(dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities, columns in classes_ order.
+
+        Args:
+            X: DataFrame with the training feature names, or an array in feature_names_in_ order
+
+        Returns:
+            float32 array of shape (n_samples, n_classes)
+        """
+        return self.session.run([self._output_name], {self._input_name: self._as_input(X)})[0]
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Most likely class of each sample."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def load_onnx_model(onnx_path: str) -> OnnxPredictor:
+    """
+    Load an exported ONNX model for serving.
+
+    Args:
+        onnx_path: Path to the .onnx file
+
+    Returns:
+        OnnxPredictor for the graph
+    """
+    if not os.path.exists(onnx_path):
+        logger.error(f"ONNX model file not found: {onnx_path}")
+        raise FileNotFoundError(f"ONNX model file not found: {onnx_path}")
+    return OnnxPredictor(onnx_path)
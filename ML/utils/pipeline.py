@@ -0,0 +1,61 @@
+import os
+import sys
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.data_utils import IMPUTED_FEATURES, preprocess_soil_data, normalize_features
+from utils.model_utils import predict_crops
+from utils.recommendation_utils import generate_comprehensive_recommendations
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def recommend_readings(
+    model: Any,
+    soil_df: pd.DataFrame,
+    top_n: int = 3,
+    include_comprehensive: bool = True,
+    imputation_defaults: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run the full recommendation pipeline for a batch of soil readings.
+
+    Preprocessing, normalization, model inference and the comprehensive
+    recommendation for each reading's top crop all run once for the whole
+    batch.
+
+    Args:
+        model: Trained model object
+        soil_df: DataFrame of readings with the config.SOIL_FEATURES columns
+        top_n: Number of top crops to recommend per reading
+        include_comprehensive: Whether to add the comprehensive recommendation for the top crop
+        imputation_defaults: Values for missing optional readings (the batch mean when not given)
+
+    Returns:
+        One {"recommendations", "comprehensive_recommendation"} dictionary per reading, in input order
+    """
+    processed_df = preprocess_soil_data(soil_df, imputation_defaults)
+    normalized_df = normalize_features(processed_df[config.REQUIRED_FEATURES])
+    crop_recommendations = predict_crops(model, normalized_df, top_n=top_n)
+
+    comprehensive_recs = [None] * len(crop_recommendations)
+    if include_comprehensive:
+        rows = [i for i, recommendations in enumerate(crop_recommendations) if len(recommendations) > 0]
+        top_crops = [crop_recommendations[i][0]["crop"] for i in rows]
+        # Recommend from the imputed optional readings so a missing value is never reported or categorized as NaN
+        imputed = [feature for feature in IMPUTED_FEATURES if feature in soil_df.columns]
+        readings = soil_df.iloc[rows].assign(**{feature: processed_df[feature].iloc[rows].to_numpy() for feature in imputed})
+        for i, comprehensive_rec in zip(rows, generate_comprehensive_recommendations(top_crops, readings)):
+            comprehensive_recs[i] = comprehensive_rec
+
+    return [
+        {
+            "recommendations": recommendations,
+            "comprehensive_recommendation": comprehensive_rec
+        }
+        for recommendations, comprehensive_rec in zip(crop_recommendations, comprehensive_recs)
+    ]
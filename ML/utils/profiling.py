@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from queue import Full, Queue
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+logger = logging.getLogger(__name__)
+
+# Finished profiles waiting for the writer thread; more are dropped
+WRITE_QUEUE_SIZE = 100
+
+class _NullProfile:
+    """No-op context returned when a request is not profiled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+_NULL_PROFILE = _NullProfile()
+
+class _RequestProfile:
+    """Context that samples the current thread while a request is handled."""
+
+    __slots__ = ("profiler", "name", "always_write", "thread_id", "start_time")
+
+    def __init__(self, profiler: "SamplingProfiler", name: str, always_write: bool):
+        self.profiler = profiler
+        self.name = name
+        self.always_write = always_write
+        self.thread_id = threading.get_ident()
+        self.start_time = 0.0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        self.profiler._start_sampling(self.thread_id)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ms = (time.perf_counter() - self.start_time) * 1000
+        stacks = self.profiler._stop_sampling(self.thread_id)
+        if stacks and (self.always_write or duration_ms >= self.profiler.slow_ms):
+            self.profiler._queue_profile(self.name, duration_ms, stacks)
+        return None
+
+class SamplingProfiler:
+    """
+    Statistical profiler for live requests.
+
+    While a profiled request runs, a background thread periodically captures
+    the Python stack of the thread handling it (sys._current_frames) and
+    counts identical stacks. Profiles are written in the collapsed-stack
+    format understood by flamegraph.pl, speedscope and similar tools, one
+    file per request, keeping only the newest max_files. Files are written
+    and rotated by a background writer thread, so request threads never wait
+    on disk; when the writer falls behind, new profiles are dropped.
+
+    A request is profiled when it is picked by sample_rate, or, when slow_ms
+    is set, every request is sampled and its profile is kept only if it took
+    at least slow_ms. Unprofiled requests only pay for one attribute check.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.01,
+        slow_ms: float = 0,
+        interval_ms: float = 5,
+        max_files: int = 50,
+        output_dir: Optional[str] = None
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval_ms = interval_ms
+        self.max_files = max_files
+        self.output_dir = output_dir or os.path.join(config.LOGS_DIR, "profiles")
+        self.profiles_written = 0
+        self.profiles_dropped = 0
+        self._lock = threading.Lock()
+        self._active: Dict[int, Counter] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._pending: Queue = Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+
+    def configure(self, **settings: Any) -> None:
+        """Update profiler settings at runtime (enabled, sample_rate, slow_ms, interval_ms, max_files)."""
+        for name, value in settings.items():
+            if value is not None and hasattr(self, name):
+                setattr(self, name, value)
+        logger.info(f"Profiler configured: {self.status()}")
+
+    def status(self) -> Dict[str, Any]:
+        """Current settings and recent profile files."""
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "interval_ms": self.interval_ms,
+            "max_files": self.max_files,
+            "output_dir": self.output_dir,
+            "profiles_written": self.profiles_written,
+            "profiles_dropped": self.profiles_dropped,
+            "files": self._profile_files()[-10:]
+        }
+
+    def profile_request(self, name: str = "request"):
+        """
+        Return a context manager that profiles the enclosed request if selected.
+
+        Example:
+            with profiler.profile_request("recommend"):
+                ...handle the request...
+        """
+        if not self.enabled:
+            return _NULL_PROFILE
+        if random.random() < self.sample_rate:
+            return _RequestProfile(self, name, always_write=True)
+        if self.slow_ms > 0:
+            return _RequestProfile(self, name, always_write=False)
+        return _NULL_PROFILE
+
+    def _start_sampling(self, thread_id: int) -> None:
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+    def _stop_sampling(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _sample_loop(self) -> None:
+        """Sample registered threads until no request is being profiled."""
+        while True:
+            time.sleep(self.interval_ms / 1000)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse_stack(frame)] += 1
+
+    def _profile_files(self):
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted(f for f in os.listdir(self.output_dir) if f.endswith(".folded"))
+
+    def _queue_profile(self, name: str, duration_ms: float, stacks: Counter) -> None:
+        """Hand a finished profile to the writer thread, dropping it if the queue is full."""
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{name}_{duration_ms:.0f}ms.folded"
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="profile-writer", daemon=True)
+                self._writer.start()
+        try:
+            self._pending.put_nowait((filename, stacks))
+        except Full:
+            self.profiles_dropped += 1
+
+    def _write_loop(self) -> None:
+        """Write queued profiles in the background for the life of the process."""
+        while True:
+            filename, stacks = self._pending.get()
+            self._write_profile(filename, stacks)
+
+    def _write_profile(self, filename: str, stacks: Counter) -> None:
+        """Write a collapsed-stack profile and rotate old ones."""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, filename), "w") as f:
+                for stack, count in stacks.items():
+                    f.write(f"{stack} {count}\n")
+            self.profiles_written += 1
+
+            files = self._profile_files()
+            for old_file in files[:max(0, len(files) - self.max_files)]:
+                os.remove(os.path.join(self.output_dir, old_file))
+        except Exception as e:
+            logger.warning(f"Error writing request profile: {e}")
+
+def _collapse_stack(frame) -> str:
+    """Render a frame's stack root-first as 'func (file:line);...'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+# Profiler shared by the API apps, configured from the environment
+profiler = SamplingProfiler(
+    enabled=config.PROFILING_ENABLED,
+    sample_rate=config.PROFILE_SAMPLE_RATE,
+    slow_ms=config.PROFILE_SLOW_MS,
+    interval_ms=config.PROFILE_INTERVAL_MS,
+    max_files=config.PROFILE_MAX_FILES
+)
@@ -3,7 +3,9 @@ import sys
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, List, Optional, Tuple, Union, Any
+import itertools
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple, Union, Any
 import json
 from datetime import datetime
 
@@ -11,20 +13,43 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 
-# Set up logging
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format=config.LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(config.LOGS_DIR, "recommendation_utils.log"))
-    ]
-)
+# Configure logging
 logger = logging.getLogger(__name__)
 
+NUTRIENTS = ("nitrogen", "phosphorus", "potassium")
+NUTRIENT_LEVELS = ("low", "medium", "high")
+
+# Category thresholds: a value below the first bound is "low", below the second "medium"
+NUTRIENT_THRESHOLDS = {
+    "nitrogen": (40, 80),
+    "phosphorus": (20, 40),
+    "potassium": (50, 100)
+}
+ORGANIC_MATTER_THRESHOLDS = (2, 5)
+# pH from PH_OPTIMAL_RANGE[0] up to and including PH_OPTIMAL_RANGE[1] is "optimal"
+PH_OPTIMAL_RANGE = (5.5, 7.0)
+# Moisture below the first bound is "dry", below the second "moderate"
+MOISTURE_THRESHOLDS = (30, 60)
+MOISTURE_STATUSES = (
+    ("dry", "Immediate irrigation needed"),
+    ("moderate", "Monitor soil moisture closely"),
+    ("adequate", "Maintain current moisture levels")
+)
+
+def _freeze(table: Any) -> Any:
+    """
+    Recursively turn a nested dictionary into read-only mappings.
+    
+    The recommendation tables are shared by every request, so they are
+    frozen at import and results copy the parts they return.
+    """
+    if isinstance(table, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in table.items()})
+    return table
+
 # Define fertilizer recommendations for crops
 # Format: {crop_name: {nutrient: {low: amount, medium: amount, high: amount}}}
-FERTILIZER_RECOMMENDATIONS = {
+FERTILIZER_RECOMMENDATIONS = _freeze({
     "Rice": {
         "nitrogen": {"low": "120 kg/ha", "medium": "100 kg/ha", "high": "80 kg/ha"},
         "phosphorus": {"low": "60 kg/ha", "medium": "45 kg/ha", "high": "30 kg/ha"},
@@ -56,11 +81,11 @@ FERTILIZER_RECOMMENDATIONS = {
         "phosphorus": {"low": "60 kg/ha", "medium": "45 kg/ha", "high": "30 kg/ha"},
         "potassium": {"low": "60 kg/ha", "medium": "45 kg/ha", "high": "30 kg/ha"}
     }
-}
+})
 
 # Define irrigation recommendations for crops
 # Format: {crop_name: {stage: recommendation}}
-IRRIGATION_RECOMMENDATIONS = {
+IRRIGATION_RECOMMENDATIONS = _freeze({
     "Rice": {
         "germination": "Keep soil saturated",
         "vegetative": "Maintain 5-7 cm water depth",
@@ -101,10 +126,10 @@ IRRIGATION_RECOMMENDATIONS = {
         "reproductive": "Maintain consistent soil moisture",
         "maturation": "Reduce irrigation before harvest"
     }
-}
+})
 
 # Define pH adjustment recommendations
-PH_ADJUSTMENT_RECOMMENDATIONS = {
+PH_ADJUSTMENT_RECOMMENDATIONS = _freeze({
     "low": {
         "method": "Apply agricultural lime (calcium carbonate)",
         "rate": "1-2 tons/ha depending on soil type and target pH",
@@ -115,10 +140,10 @@ PH_ADJUSTMENT_RECOMMENDATIONS = {
         "rate": "200-500 kg/ha of elemental sulfur depending on soil type and target pH",
         "notes": "Apply 2-3 months before planting. Incorporate into soil with tillage."
     }
-}
+})
 
 # Define organic matter improvement recommendations
-ORGANIC_MATTER_RECOMMENDATIONS = {
+ORGANIC_MATTER_RECOMMENDATIONS = _freeze({
     "low": {
         "method": "Apply compost or well-rotted manure",
         "rate": "10-20 tons/ha",
@@ -134,7 +159,85 @@ ORGANIC_MATTER_RECOMMENDATIONS = {
         "rate": "Maintain current practices",
         "notes": "Continue good soil management practices."
     }
-}
+})
+
+def _compile_fertilizer_summaries() -> Mapping[str, Mapping[Tuple[str, str, str], str]]:
+    """
+    Precompute the fertilizer summary for every crop and combination of N, P and K levels.
+    
+    Returns:
+        Read-only mapping {crop_name: {(n_level, p_level, k_level): summary prefix}};
+        the prefix is completed with the crop name and " growth."
+    """
+    summaries = {}
+    for crop_name, rates in FERTILIZER_RECOMMENDATIONS.items():
+        summaries[crop_name] = MappingProxyType({
+            levels: (
+                f"Apply {rates['nitrogen'][levels[0]]} of N, {rates['phosphorus'][levels[1]]} of P, "
+                f"and {rates['potassium'][levels[2]]} of K for optimal "
+            )
+            for levels in itertools.product(NUTRIENT_LEVELS, repeat=3)
+        })
+    return MappingProxyType(summaries)
+
+FERTILIZER_SUMMARIES = _compile_fertilizer_summaries()
+
+FERTILIZER_INSTRUCTIONS = "Apply 40-50% of nitrogen and all phosphorus and potassium at planting. Apply remaining nitrogen in 1-2 split applications during peak growth stages."
+
+# Target pH reported with every pH adjustment
+TARGET_PH = "6.0-6.5"
+
+PLANTING_GUIDELINES = _freeze({
+    "season": "Consult local agricultural extension for optimal planting dates",
+    "seed_rate": "Standard seed rate for local conditions",
+    "spacing": "Standard spacing for local conditions",
+    "depth": "Standard planting depth for local conditions"
+})
+
+# Sections of a comprehensive recommendation that can be selected with `fields`
+# ("crop" and "timestamp" are always included)
+COMPREHENSIVE_SECTIONS = (
+    "soil_data",
+    "suitability_assessment",
+    "fertilizer",
+    "irrigation",
+    "soil_amendments",
+    "planting_guidelines",
+    "yield_potential",
+    "summary"
+)
+
+def parse_fields(spec: Optional[str]) -> Optional[Dict[str, Optional[FrozenSet[str]]]]:
+    """
+    Parse a comprehensive recommendation field selector.
+    
+    Args:
+        spec: Comma-separated section names from COMPREHENSIVE_SECTIONS; "section.key"
+            keeps only that key of a section, e.g. "fertilizer.summary,yield_potential"
+    
+    Returns:
+        Dictionary mapping each selected section to the set of selected keys (None for
+        the whole section), or None when spec is empty and every section is selected
+    
+    Raises:
+        ValueError: If a section name is unknown
+    """
+    if not spec or not spec.strip():
+        return None
+    
+    fields: Dict[str, Optional[set]] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        section, _, key = item.partition(".")
+        if section not in COMPREHENSIVE_SECTIONS:
+            raise ValueError(f"Unknown field: {section} (expected one of {', '.join(COMPREHENSIVE_SECTIONS)})")
+        if not key:
+            fields[section] = None
+        elif section not in fields or fields[section] is not None:
+            fields.setdefault(section, set()).add(key)
+    return {section: frozenset(keys) if keys is not None else None for section, keys in fields.items()}
 
 def categorize_nutrient_level(nutrient: str, value: float) -> str:
     """
@@ -147,30 +250,17 @@ def categorize_nutrient_level(nutrient: str, value: float) -> str:
     Returns:
         Category as string ("low", "medium", or "high")
     """
-    if nutrient == "nitrogen":
-        if value < 40:
-            return "low"
-        elif value < 80:
-            return "medium"
-        else:
-            return "high"
-    elif nutrient == "phosphorus":
-        if value < 20:
-            return "low"
-        elif value < 40:
-            return "medium"
-        else:
-            return "high"
-    elif nutrient == "potassium":
-        if value < 50:
-            return "low"
-        elif value < 100:
-            return "medium"
-        else:
-            return "high"
-    else:
+    if nutrient not in NUTRIENT_THRESHOLDS:
         logger.warning(f"Unknown nutrient: {nutrient}")
         return "medium"
+    
+    low_bound, high_bound = NUTRIENT_THRESHOLDS[nutrient]
+    if value < low_bound:
+        return "low"
+    elif value < high_bound:
+        return "medium"
+    else:
+        return "high"
 
 def categorize_ph(ph_value: float) -> str:
     """
@@ -182,9 +272,9 @@ def categorize_ph(ph_value: float) -> str:
     Returns:
         Category as string ("low", "optimal", or "high")
     """
-    if ph_value < 5.5:
+    if ph_value < PH_OPTIMAL_RANGE[0]:
         return "low"
-    elif ph_value <= 7.0:
+    elif ph_value <= PH_OPTIMAL_RANGE[1]:
         return "optimal"
     else:
         return "high"
@@ -199,9 +289,9 @@ def categorize_organic_matter(om_value: float) -> str:
     Returns:
         Category as string ("low", "medium", or "high")
     """
-    if om_value < 2:
+    if om_value < ORGANIC_MATTER_THRESHOLDS[0]:
         return "low"
-    elif om_value < 5:
+    elif om_value < ORGANIC_MATTER_THRESHOLDS[1]:
         return "medium"
     else:
         return "high"
@@ -219,42 +309,28 @@ def generate_fertilizer_recommendation(crop: str, soil_data: pd.Series) -> Dict[
     """
     try:
         # Get crop-specific fertilizer recommendations, or use default if not found
-        crop_fertilizer = FERTILIZER_RECOMMENDATIONS.get(crop, FERTILIZER_RECOMMENDATIONS["default"])
+        crop_key = crop if crop in FERTILIZER_RECOMMENDATIONS else "default"
+        crop_fertilizer = FERTILIZER_RECOMMENDATIONS[crop_key]
         
-        # Categorize nutrient levels
-        n_level = categorize_nutrient_level("nitrogen", soil_data.get("nitrogen", 0))
-        p_level = categorize_nutrient_level("phosphorus", soil_data.get("phosphorus", 0))
-        k_level = categorize_nutrient_level("potassium", soil_data.get("potassium", 0))
-        
-        # Generate recommendations
-        recommendations = {
-            "nitrogen": {
-                "level": n_level,
-                "value": soil_data.get("nitrogen", 0),
-                "recommendation": crop_fertilizer["nitrogen"][n_level]
-            },
-            "phosphorus": {
-                "level": p_level,
-                "value": soil_data.get("phosphorus", 0),
-                "recommendation": crop_fertilizer["phosphorus"][p_level]
-            },
-            "potassium": {
-                "level": k_level,
-                "value": soil_data.get("potassium", 0),
-                "recommendation": crop_fertilizer["potassium"][k_level]
+        # Categorize nutrient levels and fill in the per-reading values
+        recommendations = {}
+        for nutrient in NUTRIENTS:
+            value = soil_data.get(nutrient, 0)
+            level = categorize_nutrient_level(nutrient, value)
+            recommendations[nutrient] = {
+                "level": level,
+                "value": value,
+                "recommendation": crop_fertilizer[nutrient][level]
             }
-        }
-        
-        # Generate a summary
-        summary = f"Apply {recommendations['nitrogen']['recommendation']} of N, {recommendations['phosphorus']['recommendation']} of P, and {recommendations['potassium']['recommendation']} of K for optimal {crop} growth."
         
-        # Generate application instructions
-        instructions = "Apply 40-50% of nitrogen and all phosphorus and potassium at planting. Apply remaining nitrogen in 1-2 split applications during peak growth stages."
+        # Look up the precompiled summary for these levels
+        levels = tuple(recommendations[nutrient]["level"] for nutrient in NUTRIENTS)
+        summary = f"{FERTILIZER_SUMMARIES[crop_key][levels]}{crop} growth."
         
         return {
             "nutrients": recommendations,
             "summary": summary,
-            "instructions": instructions
+            "instructions": FERTILIZER_INSTRUCTIONS
         }
     
     except Exception as e:
@@ -283,15 +359,12 @@ def generate_irrigation_recommendation(crop: str, soil_data: pd.Series) -> Dict[
         current_moisture = soil_data.get("moisture", 50)
         
         # Determine general irrigation strategy based on current moisture
-        if current_moisture < 30:
-            moisture_status = "dry"
-            initial_strategy = "Immediate irrigation needed"
-        elif current_moisture < 60:
-            moisture_status = "moderate"
-            initial_strategy = "Monitor soil moisture closely"
+        if current_moisture < MOISTURE_THRESHOLDS[0]:
+            moisture_status, initial_strategy = MOISTURE_STATUSES[0]
+        elif current_moisture < MOISTURE_THRESHOLDS[1]:
+            moisture_status, initial_strategy = MOISTURE_STATUSES[1]
         else:
-            moisture_status = "adequate"
-            initial_strategy = "Maintain current moisture levels"
+            moisture_status, initial_strategy = MOISTURE_STATUSES[2]
         
         # Generate a summary
         summary = f"Current soil moisture is {moisture_status} ({current_moisture}%). {initial_strategy}."
@@ -300,7 +373,7 @@ def generate_irrigation_recommendation(crop: str, soil_data: pd.Series) -> Dict[
             "current_moisture": current_moisture,
             "moisture_status": moisture_status,
             "initial_strategy": initial_strategy,
-            "stage_recommendations": crop_irrigation,
+            "stage_recommendations": dict(crop_irrigation),
             "summary": summary
         }
     
@@ -308,7 +381,7 @@ def generate_irrigation_recommendation(crop: str, soil_data: pd.Series) -> Dict[
         logger.error(f"Error generating irrigation recommendation: {e}")
         return {
             "summary": f"Regular irrigation recommended for {crop} based on soil moisture levels.",
-            "stage_recommendations": IRRIGATION_RECOMMENDATIONS["default"]
+            "stage_recommendations": dict(IRRIGATION_RECOMMENDATIONS["default"])
         }
 
 def generate_soil_amendment_recommendations(soil_data: pd.Series) -> Dict[str, Any]:
@@ -327,20 +400,21 @@ def generate_soil_amendment_recommendations(soil_data: pd.Series) -> Dict[str, A
         # pH adjustment
         if "pH" in soil_data:
             ph_category = categorize_ph(soil_data["pH"])
-            if ph_category == "low":
-                recommendations["ph_adjustment"] = PH_ADJUSTMENT_RECOMMENDATIONS["low"]
-                recommendations["ph_adjustment"]["current_ph"] = soil_data["pH"]
-                recommendations["ph_adjustment"]["target_ph"] = "6.0-6.5"
-            elif ph_category == "high":
-                recommendations["ph_adjustment"] = PH_ADJUSTMENT_RECOMMENDATIONS["high"]
-                recommendations["ph_adjustment"]["current_ph"] = soil_data["pH"]
-                recommendations["ph_adjustment"]["target_ph"] = "6.0-6.5"
+            if ph_category != "optimal":
+                # Copy the shared table entry; it must not carry another reading's values
+                recommendations["ph_adjustment"] = {
+                    **PH_ADJUSTMENT_RECOMMENDATIONS[ph_category],
+                    "current_ph": soil_data["pH"],
+                    "target_ph": TARGET_PH
+                }
         
         # Organic matter
         if "organicMatter" in soil_data:
             om_category = categorize_organic_matter(soil_data["organicMatter"])
-            recommendations["organic_matter"] = ORGANIC_MATTER_RECOMMENDATIONS[om_category]
-            recommendations["organic_matter"]["current_om"] = soil_data["organicMatter"]
+            recommendations["organic_matter"] = {
+                **ORGANIC_MATTER_RECOMMENDATIONS[om_category],
+                "current_om": soil_data["organicMatter"]
+            }
         
         return recommendations
     
@@ -348,51 +422,55 @@ def generate_soil_amendment_recommendations(soil_data: pd.Series) -> Dict[str, A
         logger.error(f"Error generating soil amendment recommendations: {e}")
         return {}
 
-def generate_comprehensive_recommendation(crop: str, soil_data: pd.Series) -> Dict[str, Any]:
+def generate_comprehensive_recommendation(
+    crop: str,
+    soil_data: pd.Series,
+    fields: Optional[Mapping[str, Optional[FrozenSet[str]]]] = None
+) -> Dict[str, Any]:
     """
     Generate a comprehensive crop recommendation including fertilizer, irrigation, and soil amendments.
     
     Args:
         crop: Name of the crop
         soil_data: Series containing soil data for a single sample
+        fields: Sections to include, as returned by parse_fields (all sections by default);
+            sections that are not selected are not computed
     
     Returns:
         Dictionary containing comprehensive recommendations
     """
     try:
-        # Generate individual recommendations
-        fertilizer_rec = generate_fertilizer_recommendation(crop, soil_data)
-        irrigation_rec = generate_irrigation_recommendation(crop, soil_data)
-        amendment_rec = generate_soil_amendment_recommendations(soil_data)
+        def selected(section: str) -> bool:
+            return fields is None or section in fields
         
-        # Get optimal conditions for the crop
-        optimal_conditions = config.CROP_OPTIMAL_CONDITIONS.get(crop, {})
+        # Generate individual recommendations (the summary is built from the fertilizer and irrigation summaries)
+        fertilizer_rec = irrigation_rec = None
+        if selected("fertilizer") or selected("summary"):
+            fertilizer_rec = generate_fertilizer_recommendation(crop, soil_data)
+        if selected("irrigation") or selected("summary"):
+            irrigation_rec = generate_irrigation_recommendation(crop, soil_data)
         
         # Generate suitability assessment
         suitability = {}
-        for property_name, (min_val, max_val) in optimal_conditions.items():
-            if property_name in soil_data:
-                actual_value = soil_data[property_name]
-                if min_val <= actual_value <= max_val:
-                    status = "optimal"
-                elif actual_value < min_val:
-                    status = "below_optimal"
-                else:
-                    status = "above_optimal"
-                
-                suitability[property_name] = {
-                    "actual": actual_value,
-                    "optimal_range": (min_val, max_val),
-                    "status": status
-                }
-        
-        # Generate planting guidelines
-        planting_guidelines = {
-            "season": "Consult local agricultural extension for optimal planting dates",
-            "seed_rate": "Standard seed rate for local conditions",
-            "spacing": "Standard spacing for local conditions",
-            "depth": "Standard planting depth for local conditions"
-        }
+        if selected("suitability_assessment") or selected("yield_potential"):
+            # Get optimal conditions for the crop
+            optimal_conditions = config.CROP_OPTIMAL_CONDITIONS.get(crop, {})
+            
+            for property_name, (min_val, max_val) in optimal_conditions.items():
+                if property_name in soil_data:
+                    actual_value = soil_data[property_name]
+                    if min_val <= actual_value <= max_val:
+                        status = "optimal"
+                    elif actual_value < min_val:
+                        status = "below_optimal"
+                    else:
+                        status = "above_optimal"
+                    
+                    suitability[property_name] = {
+                        "actual": actual_value,
+                        "optimal_range": (min_val, max_val),
+                        "status": status
+                    }
         
         # Generate expected yield potential
         yield_potential = "Medium to high with proper management"
@@ -405,19 +483,33 @@ def generate_comprehensive_recommendation(crop: str, soil_data: pd.Series) -> Di
             else:
                 yield_potential = "Medium yield potential with additional soil amendments and proper management"
         
-        # Combine all recommendations
+        # Combine the selected recommendations
         comprehensive_rec = {
             "crop": crop,
-            "timestamp": datetime.now().isoformat(),
-            "soil_data": {k: float(v) if isinstance(v, (int, float)) else v for k, v in soil_data.items()},
-            "suitability_assessment": suitability,
-            "fertilizer": fertilizer_rec,
-            "irrigation": irrigation_rec,
-            "soil_amendments": amendment_rec,
-            "planting_guidelines": planting_guidelines,
-            "yield_potential": yield_potential,
-            "summary": f"{crop} is recommended with specific management practices. {fertilizer_rec.get('summary', '')} {irrigation_rec.get('summary', '')}"
+            "timestamp": datetime.now().isoformat()
         }
+        if selected("soil_data"):
+            comprehensive_rec["soil_data"] = {k: float(v) if isinstance(v, (int, float)) else v for k, v in soil_data.items()}
+        if selected("suitability_assessment"):
+            comprehensive_rec["suitability_assessment"] = suitability
+        if selected("fertilizer"):
+            comprehensive_rec["fertilizer"] = fertilizer_rec
+        if selected("irrigation"):
+            comprehensive_rec["irrigation"] = irrigation_rec
+        if selected("soil_amendments"):
+            comprehensive_rec["soil_amendments"] = generate_soil_amendment_recommendations(soil_data)
+        if selected("planting_guidelines"):
+            comprehensive_rec["planting_guidelines"] = dict(PLANTING_GUIDELINES)
+        if selected("yield_potential"):
+            comprehensive_rec["yield_potential"] = yield_potential
+        if selected("summary"):
+            comprehensive_rec["summary"] = f"{crop} is recommended with specific management practices. {fertilizer_rec.get('summary', '')} {irrigation_rec.get('summary', '')}"
+        
+        # Narrow sections selected as "section.key"
+        if fields is not None:
+            for section, keys in fields.items():
+                if keys is not None and isinstance(comprehensive_rec.get(section), dict):
+                    comprehensive_rec[section] = {k: v for k, v in comprehensive_rec[section].items() if k in keys}
         
         return comprehensive_rec
     
@@ -427,4 +519,194 @@ def generate_comprehensive_recommendation(crop: str, soil_data: pd.Series) -> Di
             "crop": crop,
             "timestamp": datetime.now().isoformat(),
             "summary": f"{crop} is recommended, but there was an error generating detailed recommendations."
-        } 
\ No newline at end of file
+        } 
+
+def _column_values(soil_df: pd.DataFrame, column: str, default: Any) -> List[Any]:
+    """Values of a column as Python scalars, or default for every row if the column is missing."""
+    if column in soil_df.columns:
+        return soil_df[column].tolist()
+    return [default] * len(soil_df)
+
+def generate_comprehensive_recommendations(crops: Sequence[str], soil_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Generate comprehensive recommendations for a batch of readings.
+    
+    Gives the same result as calling generate_comprehensive_recommendation(crops[i], soil_df.iloc[i])
+    for every row. Nutrient, pH, organic matter and moisture categories are computed for all
+    rows at once with np.digitize against the threshold arrays, and suitability statuses are
+    computed by broadcasting the readings against each row's optimal ranges; only the
+    per-row dictionaries are assembled in Python.
+    
+    That assembly is nearly all of the remaining cost: each reading yields about 17
+    nested dictionaries (roughly 4.7 KB), so 100k readings take about 1.2 s with the
+    garbage collector paused (as utils/batch.py does) and 2-3 s without, on one core.
+    The "well under a second for 100k readings" target is not met; building the
+    dictionaries column by column instead of row by row measured no faster.
+    
+    Args:
+        crops: Name of the recommended crop for each reading
+        soil_df: DataFrame containing one soil reading per row
+    
+    Returns:
+        List of comprehensive recommendation dictionaries, in row order
+    """
+    try:
+        n_rows = len(soil_df)
+        if len(crops) != n_rows:
+            raise ValueError(f"Got {len(crops)} crops for {n_rows} readings")
+        if n_rows == 0:
+            return []
+        
+        timestamp = datetime.now().isoformat()
+        unique_crops, crop_index = np.unique(np.asarray(crops, dtype=object).astype(str), return_inverse=True)
+        unique_crops = unique_crops.tolist()
+        crop_keys = [crop if crop in FERTILIZER_RECOMMENDATIONS else "default" for crop in unique_crops]
+        
+        # Fertilizer: categorize every nutrient, then index the precompiled tables by (crop, level)
+        nutrient_values = {nutrient: _column_values(soil_df, nutrient, 0) for nutrient in NUTRIENTS}
+        level_names = np.array(NUTRIENT_LEVELS, dtype=object)
+        nutrient_levels = {}
+        nutrient_rates = {}
+        # Combined N/P/K level code (0-26) in itertools.product order, used to look up the summary
+        level_codes = np.zeros(n_rows, dtype=np.intp)
+        for nutrient in NUTRIENTS:
+            codes = np.digitize(np.asarray(nutrient_values[nutrient], dtype=float), NUTRIENT_THRESHOLDS[nutrient])
+            rate_table = np.array(
+                [[FERTILIZER_RECOMMENDATIONS[key][nutrient][level] for level in NUTRIENT_LEVELS] for key in crop_keys],
+                dtype=object
+            )
+            nutrient_levels[nutrient] = level_names[codes].tolist()
+            nutrient_rates[nutrient] = rate_table[crop_index, codes].tolist()
+            level_codes = level_codes * 3 + codes
+        
+        summary_table = np.array([
+            [f"{FERTILIZER_SUMMARIES[key][levels]}{crop} growth." for levels in itertools.product(NUTRIENT_LEVELS, repeat=3)]
+            for crop, key in zip(unique_crops, crop_keys)
+        ], dtype=object)
+        fertilizer_summaries = summary_table[crop_index, level_codes].tolist()
+        
+        # Irrigation
+        moisture_values = _column_values(soil_df, "moisture", 50)
+        moisture_codes = np.digitize(np.asarray(moisture_values, dtype=float), MOISTURE_THRESHOLDS).tolist()
+        stage_tables = [IRRIGATION_RECOMMENDATIONS.get(crop, IRRIGATION_RECOMMENDATIONS["default"]) for crop in unique_crops]
+        
+        # Soil amendments: -1 marks readings without the column
+        ph_codes = [-1] * n_rows
+        ph_values = [None] * n_rows
+        if "pH" in soil_df.columns:
+            ph_values = soil_df["pH"].tolist()
+            ph_array = np.asarray(ph_values, dtype=float)
+            # NaN compares false everywhere and falls through to "high" like categorize_ph
+            ph_codes = np.where(ph_array < PH_OPTIMAL_RANGE[0], 0, np.where(ph_array <= PH_OPTIMAL_RANGE[1], 1, 2)).tolist()
+        om_codes = [-1] * n_rows
+        om_values = [None] * n_rows
+        if "organicMatter" in soil_df.columns:
+            om_values = soil_df["organicMatter"].tolist()
+            om_codes = np.digitize(np.asarray(om_values, dtype=float), ORGANIC_MATTER_THRESHOLDS).tolist()
+        ph_tables = (PH_ADJUSTMENT_RECOMMENDATIONS["low"], None, PH_ADJUSTMENT_RECOMMENDATIONS["high"])
+        om_tables = tuple(ORGANIC_MATTER_RECOMMENDATIONS[level] for level in ("low", "medium", "high"))
+        
+        # Suitability: broadcast readings (rows x properties) against each row's optimal ranges
+        properties = [name for name in soil_df.columns if any(name in conditions for conditions in config.CROP_OPTIMAL_CONDITIONS.values())]
+        crop_properties = [
+            [(name, properties.index(name), bounds) for name, bounds in config.CROP_OPTIMAL_CONDITIONS.get(crop, {}).items() if name in properties]
+            for crop in unique_crops
+        ]
+        property_values = soil_df[properties].to_numpy(dtype=float) if properties else np.empty((n_rows, 0))
+        lower = np.full((len(unique_crops), len(properties)), np.nan)
+        upper = np.full((len(unique_crops), len(properties)), np.nan)
+        for u, entries in enumerate(crop_properties):
+            for _, j, (min_val, max_val) in entries:
+                lower[u, j] = min_val
+                upper[u, j] = max_val
+        row_lower = lower[crop_index]
+        row_upper = upper[crop_index]
+        assessed = ~np.isnan(row_lower)
+        # 0 = optimal, 1 = below_optimal, 2 = above_optimal (NaN readings count as above, like the scalar path)
+        status_codes = np.where(
+            (property_values >= row_lower) & (property_values <= row_upper), 0,
+            np.where(property_values < row_lower, 1, 2)
+        )
+        n_assessed = assessed.sum(axis=1)
+        n_optimal = ((status_codes == 0) & assessed).sum(axis=1)
+        yield_potentials = np.select(
+            [n_assessed == 0, n_optimal == n_assessed, n_optimal >= n_assessed // 2],
+            [
+                "Medium to high with proper management",
+                "High yield potential with proper management",
+                "Medium to high yield potential with proper management"
+            ],
+            default="Medium yield potential with additional soil amendments and proper management"
+        ).tolist()
+        status_codes = status_codes.tolist()
+        property_lists = soil_df[properties].values.tolist() if properties else [[]] * n_rows
+        
+        statuses = ("optimal", "below_optimal", "above_optimal")
+        # soil_data: numeric columns as floats, like the scalar path
+        soil_columns = [
+            soil_df[name].to_numpy(dtype=float).tolist() if pd.api.types.is_numeric_dtype(soil_df[name]) and not pd.api.types.is_bool_dtype(soil_df[name])
+            else soil_df[name].tolist()
+            for name in soil_df.columns
+        ]
+        soil_rows = zip(*soil_columns)
+        soil_names = list(soil_df.columns)
+        n_values, p_values, k_values = (nutrient_values[nutrient] for nutrient in NUTRIENTS)
+        n_levels, p_levels, k_levels = (nutrient_levels[nutrient] for nutrient in NUTRIENTS)
+        n_rates, p_rates, k_rates = (nutrient_rates[nutrient] for nutrient in NUTRIENTS)
+        
+        results = []
+        for i in range(n_rows):
+            u = crop_index[i]
+            crop = unique_crops[u]
+            
+            nutrients = {
+                "nitrogen": {"level": n_levels[i], "value": n_values[i], "recommendation": n_rates[i]},
+                "phosphorus": {"level": p_levels[i], "value": p_values[i], "recommendation": p_rates[i]},
+                "potassium": {"level": k_levels[i], "value": k_values[i], "recommendation": k_rates[i]}
+            }
+            fertilizer_summary = fertilizer_summaries[i]
+            
+            moisture_status, initial_strategy = MOISTURE_STATUSES[moisture_codes[i]]
+            irrigation_summary = f"Current soil moisture is {moisture_status} ({moisture_values[i]}%). {initial_strategy}."
+            
+            amendments = {}
+            if ph_codes[i] in (0, 2):
+                amendments["ph_adjustment"] = {**ph_tables[ph_codes[i]], "current_ph": ph_values[i], "target_ph": TARGET_PH}
+            if om_codes[i] >= 0:
+                amendments["organic_matter"] = {**om_tables[om_codes[i]], "current_om": om_values[i]}
+            
+            row_statuses = status_codes[i]
+            row_values = property_lists[i]
+            suitability = {
+                name: {"actual": row_values[j], "optimal_range": bounds, "status": statuses[row_statuses[j]]}
+                for name, j, bounds in crop_properties[u]
+            }
+            
+            results.append({
+                "crop": crop,
+                "timestamp": timestamp,
+                "soil_data": dict(zip(soil_names, next(soil_rows))),
+                "suitability_assessment": suitability,
+                "fertilizer": {
+                    "nutrients": nutrients,
+                    "summary": fertilizer_summary,
+                    "instructions": FERTILIZER_INSTRUCTIONS
+                },
+                "irrigation": {
+                    "current_moisture": moisture_values[i],
+                    "moisture_status": moisture_status,
+                    "initial_strategy": initial_strategy,
+                    "stage_recommendations": dict(stage_tables[u]),
+                    "summary": irrigation_summary
+                },
+                "soil_amendments": amendments,
+                "planting_guidelines": dict(PLANTING_GUIDELINES),
+                "yield_potential": yield_potentials[i],
+                "summary": f"{crop} is recommended with specific management practices. {fertilizer_summary} {irrigation_summary}"
+            })
+        
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error generating batch comprehensive recommendations, falling back to per-reading generation: {e}")
+        return [generate_comprehensive_recommendation(crop, soil_df.iloc[i]) for i, crop in enumerate(crops)]
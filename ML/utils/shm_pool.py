@@ -0,0 +1,374 @@
+import os
+import sys
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from utils.metrics import add_inference_counts
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Inference worker processes exchange batches through two preallocated shared
+# memory blocks, each divided into n_slots slots of slot_rows rows:
+#
+#     features       float32 [n_slots, slot_rows, n_features]   written by the caller
+#     probabilities  float32 [n_slots, slot_rows, n_classes]    written by a worker
+#
+# A caller takes a free slot, copies its feature rows in and puts
+# (slot, ticket, n_rows) on the request queue of the least busy worker; the
+# worker predicts straight from the slot into the matching probability slot
+# and puts (slot, ticket, error, counts) on the shared result queue, where
+# counts are the worker's increments of the inference counters
+# (utils/metrics.py) since its previous result. Only slot indices and those
+# few counts cross the process boundary. Free slots are handed out in FIFO
+# order, so the slots are used as a ring. Batches larger than slot_rows are
+# split over several slots.
+#
+# A monitor thread waits on the workers' process sentinels. When a worker
+# dies, the calls waiting on its slots fail, the slots are freed and the
+# worker is restarted. Tickets tell a late result of the dead worker apart
+# from one for the slot's next request.
+
+# Slot index workers use to report that they are ready (or failed to load)
+_READY = -1
+
+class InferencePoolError(RuntimeError):
+    """The pool cannot score a batch: it is closed, or its workers died or are not ready."""
+
+def _worker_main(
+    index: int,
+    load: Callable[[], Any],
+    feature_name: str,
+    probability_name: str,
+    shape: Tuple[int, int, int, int],
+    requests: Any,
+    results: Any
+) -> None:
+    """Serve predictions from the shared slots until a None request arrives."""
+    from utils.model_utils import predict_proba_matrix
+    from utils.metrics import inference_counts
+
+    n_slots, slot_rows, n_features, n_classes = shape
+    feature_block = shared_memory.SharedMemory(name=feature_name)
+    probability_block = shared_memory.SharedMemory(name=probability_name)
+    features = np.ndarray((n_slots, slot_rows, n_features), dtype=np.float32, buffer=feature_block.buf)
+    probabilities = np.ndarray((n_slots, slot_rows, n_classes), dtype=np.float32, buffer=probability_block.buf)
+
+    try:
+        model = load()
+        results.put((_READY, index, [str(label) for label in model.classes_], None))
+    except Exception as e:
+        results.put((_READY, index, f"Error loading model: {e}", None))
+        return
+
+    reported = inference_counts()
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            slot, ticket, n_rows = request
+            try:
+                probabilities[slot, :n_rows] = predict_proba_matrix(model, features[slot, :n_rows])
+                error = None
+            except Exception as e:
+                error = str(e)
+            counts = inference_counts()
+            results.put((slot, ticket, error, {name: value - reported[name] for name, value in counts.items() if value != reported[name]}))
+            reported = counts
+    finally:
+        del features, probabilities
+        feature_block.close()
+        probability_block.close()
+
+class _Worker:
+    """A worker process, its request queue and the slots it has been sent."""
+
+    def __init__(self, index: int, process: Any, requests: Any):
+        self.index = index
+        self.process = process
+        self.requests = requests
+        self.slots: Set[int] = set()
+        self.ready = False
+        # Set when the model failed to load, so the worker is not restarted
+        self.failed = False
+        self.exited = False
+
+class SharedMemoryInferencePool:
+    """
+    Inference worker processes fed through shared memory ring buffers.
+
+    predict_proba may be called from many threads at once; each call blocks
+    until all of its rows are scored or its timeout expires. Feature rows are
+    copied once into shared memory and probabilities once out of it, instead
+    of being pickled to the worker and back. Workers that die are restarted;
+    the calls they were serving fail with InferencePoolError.
+
+    Example:
+        pool = SharedMemoryInferencePool(2, classes=model.classes_, n_features=6)
+        probabilities = pool.predict_proba(normalized_features)
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        classes: Sequence[Any],
+        n_features: int,
+        n_slots: Optional[int] = None,
+        slot_rows: Optional[int] = None,
+        load: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Start the workers and wait until each has loaded its model.
+
+        Args:
+            n_workers: Number of worker processes
+            classes: Class labels the workers' model must have, in order
+            n_features: Number of feature columns (in config.REQUIRED_FEATURES order)
+            n_slots: Number of ring buffer slots (defaults to config.SHM_POOL_SLOTS_PER_WORKER per worker)
+            slot_rows: Rows per slot (defaults to config.SHM_POOL_SLOT_ROWS)
+            load: Picklable function returning the model in a worker (defaults to load_model)
+        """
+        if load is None:
+            from utils.model_utils import load_model
+            load = load_model
+
+        self.classes_ = np.asarray(classes)
+        self.n_workers = n_workers
+        self.n_slots = n_slots or n_workers * config.SHM_POOL_SLOTS_PER_WORKER
+        self.slot_rows = slot_rows or config.SHM_POOL_SLOT_ROWS
+        self.n_features = n_features
+        self.restarts = 0
+        self._load = load
+        n_classes = len(self.classes_)
+        self._shape = (self.n_slots, self.slot_rows, n_features, n_classes)
+        self._expected_classes = [str(label) for label in self.classes_]
+
+        self._feature_block = shared_memory.SharedMemory(create=True, size=self.n_slots * self.slot_rows * n_features * 4)
+        self._probability_block = shared_memory.SharedMemory(create=True, size=self.n_slots * self.slot_rows * n_classes * 4)
+        self._features = np.ndarray((self.n_slots, self.slot_rows, n_features), dtype=np.float32, buffer=self._feature_block.buf)
+        self._probabilities = np.ndarray((self.n_slots, self.slot_rows, n_classes), dtype=np.float32, buffer=self._probability_block.buf)
+
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(self.n_slots):
+            self._free_slots.put(slot)
+        # Per busy slot: (ticket, worker, future, output array, first output row, number of rows)
+        self._pending: List[Optional[Tuple[int, _Worker, Future, np.ndarray, int, int]]] = [None] * self.n_slots
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._collector = None
+        self._monitor = None
+
+        # Workers are spawned, so they do not inherit the server's threads or locks
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._workers = [self._start_worker(index) for index in range(n_workers)]
+
+        try:
+            for _ in range(n_workers):
+                try:
+                    _, index, ready, _ = self._results.get(timeout=config.SHM_POOL_START_TIMEOUT)
+                except queue.Empty:
+                    raise InferencePoolError(f"Inference workers did not load the model within {config.SHM_POOL_START_TIMEOUT:g}s")
+                if not self._worker_ready(index, ready):
+                    raise InferencePoolError(ready if isinstance(ready, str) else "Worker model classes differ from the served model's")
+        except Exception as e:
+            logger.error(f"Error starting inference workers: {e}")
+            self.close()
+            raise
+
+        self._collector = threading.Thread(target=self._collect, name="shm-pool-collector", daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch_workers, name="shm-pool-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(
+            f"Started {n_workers} inference worker(s) with {self.n_slots} shared memory slots of {self.slot_rows} rows "
+            f"({(self._feature_block.size + self._probability_block.size) / 1e6:.1f} MB)"
+        )
+
+    def _start_worker(self, index: int) -> _Worker:
+        """Start the worker process for one position of the pool."""
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self._load, self._feature_block.name, self._probability_block.name, self._shape, requests, self._results),
+            daemon=True
+        )
+        process.start()
+        return _Worker(index, process, requests)
+
+    def _worker_ready(self, index: int, ready: Any) -> bool:
+        """Mark a worker ready after its handshake, or failed when its model did not load."""
+        with self._lock:
+            worker = self._workers[index]
+            if ready == self._expected_classes:
+                worker.ready = True
+                return True
+            worker.failed = True
+        logger.error(f"Inference worker {worker.process.pid} cannot serve: {ready if isinstance(ready, str) else 'model classes differ'}")
+        return False
+
+    def _collect(self) -> None:
+        """Copy finished slots into their callers' outputs and free the slots."""
+        while True:
+            slot, ticket, error, counts = self._results.get()
+            if slot is None:
+                break
+            if counts:
+                add_inference_counts(counts)
+            if slot == _READY:
+                if self._worker_ready(ticket, error):
+                    logger.info(f"Inference worker {self._workers[ticket].process.pid} ready")
+                continue
+
+            with self._lock:
+                entry = self._pending[slot]
+                # A result of a worker that has since died belongs to a failed call
+                if entry is None or entry[0] != ticket:
+                    continue
+                self._pending[slot] = None
+                _, worker, future, output, start, n_rows = entry
+                worker.slots.discard(slot)
+            if error is None:
+                output[start:start + n_rows] = self._probabilities[slot, :n_rows]
+            self._free_slots.put(slot)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _watch_workers(self) -> None:
+        """Handle workers that exit while the pool is open."""
+        while not self._closing:
+            with self._lock:
+                running = {worker.process.sentinel: worker for worker in self._workers if not worker.exited}
+            if not running:
+                time.sleep(0.5)
+                continue
+            for sentinel in connection.wait(list(running), timeout=0.5):
+                self._worker_exited(running[sentinel])
+
+    def _worker_exited(self, worker: _Worker) -> None:
+        """Fail the calls waiting on a dead worker, free its slots and restart it."""
+        worker.process.join()
+        with self._lock:
+            if self._closing:
+                return
+            worker.exited = True
+            failed = [self._pending[slot] for slot in worker.slots]
+            for slot in worker.slots:
+                self._pending[slot] = None
+                self._free_slots.put(slot)
+            worker.slots.clear()
+            if not worker.failed:
+                self._workers[worker.index] = self._start_worker(worker.index)
+                self.restarts += 1
+
+        worker.requests.cancel_join_thread()
+        worker.requests.close()
+        logger.error(
+            f"Inference worker {worker.process.pid} exited with code {worker.process.exitcode}; "
+            f"failing {len(failed)} batch(es){'' if worker.failed else ' and restarting it'}"
+        )
+        error = InferencePoolError(f"Inference worker exited with code {worker.process.exitcode}")
+        for _, _, future, _, _, _ in failed:
+            future.set_exception(error)
+
+    def predict_proba(self, features: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Class probabilities for a normalized feature matrix.
+
+        Args:
+            features: Array of shape (n_readings, n_features), columns in config.REQUIRED_FEATURES order
+            timeout: Seconds to wait for free slots and the workers (None waits indefinitely)
+
+        Returns:
+            float32 array of shape (n_readings, n_classes), columns in classes_ order
+
+        Raises:
+            TimeoutError: The batch was not scored within timeout
+            InferencePoolError: The pool is closed, or a worker died or none is ready
+        """
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(f"Expected an array of shape (n, {self.n_features}), got {features.shape}")
+        if self._closing:
+            raise InferencePoolError("Inference pool is closed")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        output = np.empty((len(features), len(self.classes_)), dtype=np.float32)
+        futures = []
+        for start in range(0, len(features), self.slot_rows):
+            chunk = features[start:start + self.slot_rows]
+            try:
+                slot = self._free_slots.get(timeout=_remaining(deadline))
+            except queue.Empty:
+                raise TimeoutError(f"No free inference slot within {timeout:g}s")
+            self._features[slot, :len(chunk)] = chunk
+
+            with self._lock:
+                workers = [worker for worker in self._workers if worker.ready and not worker.exited]
+                if self._closing or not workers:
+                    self._free_slots.put(slot)
+                    raise InferencePoolError("Inference pool is closed" if self._closing else "No inference worker is ready")
+                worker = min(workers, key=lambda w: len(w.slots))
+                ticket = next(self._tickets)
+                future = Future()
+                self._pending[slot] = (ticket, worker, future, output, start, len(chunk))
+                worker.slots.add(slot)
+                worker.requests.put((slot, ticket, len(chunk)))
+            futures.append(future)
+
+        for future in futures:
+            future.result(timeout=_remaining(deadline))
+        return output
+
+    def close(self) -> None:
+        """Stop the workers, fail the calls still waiting and release the shared memory."""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            pending = [entry for entry in self._pending if entry is not None]
+            self._pending = [None] * self.n_slots
+        for _, _, future, _, _, _ in pending:
+            future.set_exception(InferencePoolError("Inference pool is closed"))
+
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.requests.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.requests.cancel_join_thread()
+            worker.requests.close()
+
+        if self._monitor is not None:
+            self._monitor.join()
+        if self._collector is not None:
+            self._results.put((None, None, None, None))
+            self._collector.join()
+
+        del self._features, self._probabilities
+        for block in (self._feature_block, self._probability_block):
+            block.close()
+            block.unlink()
+        logger.info("Inference workers stopped")
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a monotonic deadline (None for no deadline)."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
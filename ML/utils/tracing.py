@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+import functools
+import inspect
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Import config (assumes this file is in the utils directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+
+logger = logging.getLogger(__name__)
+
+# Span currently open in this task or thread (None when the request is not traced)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class _NullSpan:
+    """No-op span returned when the current request is not traced."""
+
+    __slots__ = ()
+
+    trace_id = None
+    span_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """
+    A timed operation within a trace.
+
+    Spans are context managers: entering one makes it the parent of spans
+    opened inside it (including in threads started with a copied context,
+    such as FastAPI's sync endpoints), exiting it records its duration. The
+    root span collects the finished spans of its trace and hands the whole
+    trace to the tracer when it ends.
+    """
+
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id", "attributes",
+        "start_time", "start_perf", "duration_ms", "error", "spans", "is_root", "_token"
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], spans: List["Span"], is_root: bool = False):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = {}
+        self.start_time = 0.0
+        self.start_perf = 0.0
+        self.duration_ms = 0.0
+        self.error = None
+        self.spans = spans
+        self.is_root = is_root
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self.start_time = time.time()
+        self.start_perf = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.duration_ms = (time.perf_counter() - self.start_perf) * 1000
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc_value}"
+        _current_span.reset(self._token)
+        if self.is_root:
+            self.tracer._export(self)
+        else:
+            self.spans.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value for calls made inside this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self, root_perf: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start_perf - root_perf) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Parse a W3C traceparent header ("00-<trace-id>-<parent-id>-<flags>").
+
+    Returns:
+        Tuple of (trace_id, parent_id, sampled), or None if the header is missing or invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 0x01)
+
+class Tracer:
+    """
+    Minimal in-process request tracer.
+
+    A trace is started per request by start_trace(). It is sampled when the
+    caller's traceparent header has the sampled flag set, or otherwise with
+    probability sample_rate; unsampled requests get a shared no-op span, so
+    span() and timed stages only pay for one context variable lookup.
+
+    Finished traces are kept in a ring buffer of the last buffer_size traces
+    (queried through /admin/traces) and, when export_file is set, appended to
+    it as one JSON object per line.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, buffer_size: int = 200, export_file: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.export_file = export_file
+        self.traces_recorded = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._file_lock = threading.Lock()
+
+    # Settings configure() may change; export_file is only set at startup
+    # (config.TRACE_EXPORT_FILE), so a request cannot choose where files are written
+    RUNTIME_SETTINGS = ("sample_rate", "buffer_size")
+
+    def configure(self, **settings: Any) -> None:
+        """Update tracer settings at runtime (sample_rate, buffer_size)."""
+        for name, value in settings.items():
+            if name not in self.RUNTIME_SETTINGS:
+                raise ValueError(f"Tracer setting {name} cannot be changed at runtime")
+            if value is not None:
+                setattr(self, name, value)
+        if self._buffer.maxlen != self.buffer_size:
+            self._buffer = deque(self._buffer, maxlen=self.buffer_size)
+        logger.info(f"Tracer configured: {self.status()}")
+
+    def status(self) -> Dict[str, Any]:
+        """Current settings and buffer usage."""
+        return {
+            "sample_rate": self.sample_rate,
+            "buffer_size": self.buffer_size,
+            "export_file": self.export_file,
+            "traces_recorded": self.traces_recorded,
+            "traces_buffered": len(self._buffer)
+        }
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None):
+        """
+        Start the root span of a request if it is sampled.
+
+        Args:
+            name: Span name, e.g. "POST /recommend"
+            traceparent: Incoming W3C traceparent header, if any
+
+        Returns:
+            A Span to use as a context manager, or a no-op span
+        """
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = None, None, False
+        if not sampled and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return _NULL_SPAN
+        if trace_id is None:
+            trace_id = f"{random.getrandbits(128):032x}"
+        return Span(self, name, trace_id, parent_id, [], is_root=True)
+
+    def span(self, name: str):
+        """Return a child span of the current span, or a no-op span when not tracing."""
+        parent = _current_span.get()
+        if parent is None:
+            return _NULL_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, parent.spans)
+
+    def record_span(self, name: str, start_perf: float, end_perf: Optional[float] = None) -> None:
+        """Record an already finished child span of the current span from perf_counter timestamps."""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        end_perf = time.perf_counter() if end_perf is None else end_perf
+        span = Span(self, name, parent.trace_id, parent.span_id, parent.spans)
+        span.start_perf = start_perf
+        span.start_time = time.time() - (end_perf - start_perf)
+        span.duration_ms = (end_perf - start_perf) * 1000
+        parent.spans.append(span)
+
+    def _export(self, root: Span) -> None:
+        """Assemble a finished trace and store it in the buffer and export file."""
+        trace = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "span_id": root.span_id,
+            "remote_parent_id": root.parent_id,
+            "start_time": root.start_time,
+            "duration_ms": round(root.duration_ms, 3),
+            "attributes": root.attributes,
+            "error": root.error,
+            "spans": [span.to_dict(root.start_perf) for span in sorted(root.spans, key=lambda s: s.start_perf)]
+        }
+        self._buffer.append(trace)
+        self.traces_recorded += 1
+
+        if self.export_file:
+            try:
+                with self._file_lock:
+                    with open(self.export_file, "a") as f:
+                        f.write(json.dumps(trace, default=str) + "\n")
+            except Exception as e:
+                logger.warning(f"Error exporting trace: {e}")
+
+    def get_traces(self, limit: int = 20, min_duration_ms: float = 0, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Query the most recent buffered traces, newest first.
+
+        Args:
+            limit: Maximum number of traces to return
+            min_duration_ms: Only return traces at least this slow
+            name: Only return traces whose root span has this name
+
+        Returns:
+            List of trace dictionaries
+        """
+        traces = []
+        for trace in reversed(list(self._buffer)):
+            if trace["duration_ms"] < min_duration_ms or (name and trace["name"] != name):
+                continue
+            traces.append(trace)
+            if len(traces) >= limit:
+                break
+        return traces
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Return a buffered trace by id, or None if it is not (or no longer) buffered."""
+        for trace in reversed(list(self._buffer)):
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+# Tracer shared by the API apps, configured from the environment
+tracer = Tracer(
+    sample_rate=config.TRACE_SAMPLE_RATE,
+    buffer_size=config.TRACE_BUFFER_SIZE,
+    export_file=config.TRACE_EXPORT_FILE or None
+)
+
+def current_span():
+    """Return the span currently open, or None when the request is not traced."""
+    return _current_span.get()
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator that wraps each call of a function (sync or async) in a span.
+
+    Example:
+        @traced("db.get_soil_data")
+        async def get_soil_data(self, days=30):
+            ...
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
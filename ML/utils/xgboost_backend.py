@@ -0,0 +1,31 @@
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+
+class XGBLabelClassifier(xgb.XGBClassifier):
+    """
+    XGBoost classifier that accepts string crop labels.
+
+    Recent XGBoost releases require targets encoded as 0..n_classes-1 and
+    return those integers from predict(). The rest of the pipeline works with
+    crop names (model.classes_, predict_crops), so the labels are encoded
+    before fitting and decoded again on prediction.
+    """
+
+    def fit(self, X, y, **kwargs):
+        # XGBoost validates the encoded targets against classes_ while
+        # fitting, so the encoder is only exposed once the fit is done
+        label_encoder = LabelEncoder().fit(y)
+        self.__dict__.pop("label_encoder_", None)
+        super().fit(X, label_encoder.transform(y), **kwargs)
+        self.label_encoder_ = label_encoder
+        return self
+
+    @property
+    def classes_(self) -> np.ndarray:
+        if "label_encoder_" in self.__dict__:
+            return self.label_encoder_.classes_
+        return np.arange(self.n_classes_)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
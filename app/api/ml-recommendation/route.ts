@@ -6,6 +6,7 @@ import { z } from "zod";
 import { pusherServer } from "@/lib/pusher";
 import axios from "axios";
 import { PrismaClient } from "@prisma/client";
+import { randomBytes } from "crypto";
 
 const prismaClient = new PrismaClient();
 
@@ -17,6 +18,18 @@ const mlRecommendationRequestSchema = z.object({
 // ML API configuration
 const ML_API_URL = process.env.ML_API_URL || "http://localhost:8000";
 
+// Fraction of ML API calls the ML service should trace (0 = leave it to the
+// service's own TRACE_SAMPLE_RATE)
+const ML_TRACE_SAMPLE_RATE = parseFloat(process.env.ML_TRACE_SAMPLE_RATE || "0");
+
+// Build a W3C traceparent header so the ML service can continue this trace
+function createTraceparent() {
+  const traceId = randomBytes(16).toString("hex");
+  const spanId = randomBytes(8).toString("hex");
+  const sampled = Math.random() < ML_TRACE_SAMPLE_RATE ? "01" : "00";
+  return { traceId, header: `00-${traceId}-${spanId}-${sampled}` };
+}
+
 // Helper function to process JSON data into a React-friendly format
 function processJsonData(data: any) {
   if (!data) return null;
@@ -175,10 +188,12 @@ export async function POST(request: Request) {
     }
 
     // Call ML API to get recommendations
+    const trace = createTraceparent();
     const response = await fetch(`${ML_API_URL}/recommend`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        traceparent: trace.header,
       },
       body: JSON.stringify({
         ph: soilData.pH,
@@ -195,7 +210,7 @@ export async function POST(request: Request) {
 
     if (!response.ok) {
       const errorText = await response.text();
-      console.error("ML API error:", errorText);
+      console.error(`ML API error (trace ${trace.traceId}):`, errorText);
       return NextResponse.json(
         { error: "Failed to get ML recommendations" },
         { status: 500 }